@@ -11,7 +11,7 @@ from common.config import Config
 from common.exceptions import (
     ConnectionError, AuthenticationError, FileTransferError, QueueError
 )
-from common.utils import format_size, get_file_md5, get_file_crc32
+from common.utils import format_size, get_file_crc32, get_file_checksum
 from common.protocol import TransferMode, ConnectionMode
 from client.ftp_client import FTPClient
 from client.transfer_queue import (
@@ -183,7 +183,7 @@ class FTPClientPool:
 class FTPQueueManager(TransferQueue):
     """FTP队列管理器，处理FTP任务队列"""
     
-    def __init__(self, client_pool, max_concurrent_tasks=3, auto_retry=True):
+    def __init__(self, client_pool, max_concurrent_tasks=3, auto_retry=True, checksum_algo='blake3'):
         """
         初始化FTP队列管理器
         
@@ -191,9 +191,32 @@ class FTPQueueManager(TransferQueue):
             client_pool: FTP客户端连接池
             max_concurrent_tasks: 最大并发任务数
             auto_retry: 是否自动重试
+            checksum_algo: 验证文件完整性时使用的校验算法
         """
         super().__init__(max_concurrent_tasks=max_concurrent_tasks, auto_retry=auto_retry)
         self.client_pool = client_pool
+        self.checksum_algo = checksum_algo
+    
+    def _local_checksums(self, local_path):
+        """
+        计算本地文件的校验值
+        
+        Args:
+            local_path: 本地文件路径
+            
+        Returns:
+            dict: 校验算法、校验值和CRC32
+        """
+        algorithm, checksum = get_file_checksum(local_path, self.checksum_algo)
+        checksums = {
+            'checksum_algo': algorithm,
+            'local_checksum': checksum,
+            'local_crc32': get_file_crc32(local_path),
+        }
+        # 保留旧字段，兼容依赖MD5的调用方
+        if algorithm == 'md5':
+            checksums['local_md5'] = checksum
+        return checksums
     
     def _get_task_handler(self, task_type):
         """
@@ -257,10 +280,7 @@ class FTPQueueManager(TransferQueue):
             
             # 如果要验证，计算并存储校验和
             if verify:
-                local_md5 = get_file_md5(local_path)
-                local_crc32 = get_file_crc32(local_path)
-                result['local_md5'] = local_md5
-                result['local_crc32'] = local_crc32
+                result.update(self._local_checksums(local_path))
                 # 服务器可能不支持MD5/CRC32命令，所以这里不获取远程校验和
                 
             return result
@@ -305,10 +325,7 @@ class FTPQueueManager(TransferQueue):
             
             # 如果要验证，计算并存储校验和
             if verify and os.path.exists(local_path):
-                local_md5 = get_file_md5(local_path)
-                local_crc32 = get_file_crc32(local_path)
-                result['local_md5'] = local_md5
-                result['local_crc32'] = local_crc32
+                result.update(self._local_checksums(local_path))
                 
             return result
             
@@ -473,7 +490,8 @@ class AdvancedFTPClient:
             self.queue_manager = FTPQueueManager(
                 client_pool=self.client_pool,
                 max_concurrent_tasks=self.max_concurrent_tasks,
-                auto_retry=self.config.get('auto_retry', True)
+                auto_retry=self.config.get('auto_retry', True),
+                checksum_algo=self.config.get('checksum_algo', 'blake3')
             )
             
             self.connected = True
@@ -834,10 +852,8 @@ class AdvancedFTPClient:
         
         start_time = time.time()
         while True:
-            tasks = self.get_all_tasks()
-            
-            # 检查是否还有活动或排队的任务
-            if not tasks['active'] and tasks['queue_size'] == 0:
+            # 检查是否还有活动或排队的任务，无需为每个任务生成字典
+            if not self.queue_manager.get_active_tasks() and self.queue_manager.queue_size == 0:
                 return True
                 
             # 检查超时
@@ -954,14 +970,19 @@ import os
 import time
 import uuid
 import queue
+import socket
+import posixpath
 import threading
 import logging
+import heapq
+import functools
+from collections import deque
 from enum import Enum, auto
 from datetime import datetime
 from pathlib import Path
 
-from common.exceptions import FTPError, ConnectionError
-from client.ftp_client import FTPClient
+from common.exceptions import FTPError, ConnectionError, CommandError
+from client.ftp_client import FTPClient, FTPConnectionPool
 
 # 设置日志记录器
 logger = logging.getLogger(__name__)
@@ -1013,6 +1034,8 @@ class Task:
         self.progress = 0
         self.retries = 0
         self.max_retries = 3
+        # 界面最后一次显示该任务状态的时间（time.monotonic），由界面维护
+        self.last_ui_update_ts = 0.0
         
         # 回调函数
         self.on_progress = None
@@ -1116,6 +1139,8 @@ class TransferQueue:
         self.lock = threading.RLock()
         self.workers = []
         self._shutdown_event = threading.Event()
+        # 任务状态变化（开始、完成、失败、重试、取消）时调用，参数为任务对象
+        self.task_listener = None
         
         logger.info(f"传输队列已初始化，最大并发任务数: {max_concurrent_tasks}, 自动重试: {auto_retry}")
     
@@ -1139,8 +1164,14 @@ class TransferQueue:
         
         logger.info(f"已启动 {self.max_concurrent_tasks} 个工作线程")
     
-    def stop(self):
-        """停止队列处理"""
+    def stop(self, timeout=None):
+        """
+        停止队列处理
+        
+        Args:
+            timeout (float, optional): 等待所有工作线程结束的总超时时间（秒），
+                None表示每个线程最多等待1秒
+        """
         if not self.running:
             return
         
@@ -1149,13 +1180,41 @@ class TransferQueue:
         self._shutdown_event.set()
         
         # 等待所有线程结束
+        deadline = None if timeout is None else time.monotonic() + timeout
         for worker in self.workers:
             if worker.is_alive():
-                worker.join(timeout=1.0)
+                if deadline is None:
+                    worker.join(timeout=1.0)
+                else:
+                    worker.join(timeout=max(0.0, deadline - time.monotonic()))
         
         self.workers = []
         logger.info("传输队列已停止")
     
+    def add_tasks(self, tasks):
+        """
+        批量添加任务到队列，只获取一次锁
+        
+        Args:
+            tasks (list): 要添加的任务列表
+            
+        Returns:
+            list: 任务ID列表
+        """
+        with self.lock:
+            for task in tasks:
+                self.task_queue.put(task)
+            logger.debug(f"已批量添加 {len(tasks)} 个任务到队列")
+        return [task.id for task in tasks]
+    
+    def _notify(self, task):
+        """通知任务状态变化"""
+        if self.task_listener:
+            try:
+                self.task_listener(task)
+            except Exception as e:
+                logger.error(f"任务状态监听器执行错误: {str(e)}")
+    
     def add_task(self, task):
         """
         添加任务到队列
@@ -1182,19 +1241,45 @@ class TransferQueue:
             bool: 是否成功取消
         """
         with self.lock:
-            # 检查活动任务
-            if task_id in self.active_tasks:
-                task = self.active_tasks[task_id]
-                task.cancel()
-                self.failed_tasks[task_id] = task
-                del self.active_tasks[task_id]
-                logger.info(f"已取消活动任务: {task_id}")
-                return True
+            return self._cancel_locked(task_id)
+    
+    def cancel_tasks(self, task_ids):
+        """
+        批量取消任务，只获取一次锁
+        
+        Args:
+            task_ids (list): 任务ID列表
             
-            # 无法取消已完成或失败的任务
-            if task_id in self.completed_tasks or task_id in self.failed_tasks:
-                logger.warning(f"无法取消已完成或失败的任务: {task_id}")
-                return False
+        Returns:
+            list: 成功取消的任务ID
+        """
+        with self.lock:
+            return [task_id for task_id in task_ids if self._cancel_locked(task_id)]
+    
+    def _cancel_locked(self, task_id):
+        """
+        取消单个任务，调用方需持有锁
+        
+        Args:
+            task_id (str): 任务ID
+            
+        Returns:
+            bool: 是否成功取消
+        """
+        # 检查活动任务
+        if task_id in self.active_tasks:
+            task = self.active_tasks[task_id]
+            task.cancel()
+            self.failed_tasks[task_id] = task
+            del self.active_tasks[task_id]
+            logger.info(f"已取消活动任务: {task_id}")
+            self._notify(task)
+            return True
+        
+        # 无法取消已完成或失败的任务
+        if task_id in self.completed_tasks or task_id in self.failed_tasks:
+            logger.warning(f"无法取消已完成或失败的任务: {task_id}")
+            return False
         
         # 如果是队列中的任务，需要遍历优先队列（较复杂）
         # 简单起见，这里不实现队列中任务的取消
@@ -1220,6 +1305,35 @@ class TransferQueue:
                 return self.failed_tasks[task_id]
         return None
     
+    def get_task_counts(self):
+        """
+        获取各状态的任务数量，不复制任务字典
+        
+        Returns:
+            dict: 活动、排队、完成和失败的任务数量
+        """
+        with self.lock:
+            return {
+                'active': len(self.active_tasks),
+                'queued': self.task_queue.qsize(),
+                'completed': len(self.completed_tasks),
+                'failed': len(self.failed_tasks)
+            }
+    
+    def get_stalest_active(self, limit):
+        """
+        获取界面最久未更新的若干活动任务，不复制任务字典
+        
+        Args:
+            limit (int): 最多返回的任务数
+            
+        Returns:
+            list: 按last_ui_update_ts从旧到新排列的任务列表
+        """
+        with self.lock:
+            return heapq.nsmallest(limit, self.active_tasks.values(),
+                                   key=lambda task: task.last_ui_update_ts)
+    
     def get_all_tasks(self):
         """
         获取所有任务状态
@@ -1257,6 +1371,7 @@ class TransferQueue:
                 with self.lock:
                     task.start()
                     self.active_tasks[task.id] = task
+                self._notify(task)
                 
                 logger.info(f"{thread_name} 开始执行任务: {task.id} 类型: {task.type.name}")
                 
@@ -1270,6 +1385,7 @@ class TransferQueue:
                         if task.id in self.active_tasks:
                             del self.active_tasks[task.id]
                         self.completed_tasks[task.id] = task
+                    self._notify(task)
                     
                     logger.info(f"{thread_name} 完成任务: {task.id}")
                     
@@ -1296,6 +1412,7 @@ class TransferQueue:
                             if task.id in self.active_tasks:
                                 del self.active_tasks[task.id]
                             self.failed_tasks[task.id] = task
+                    self._notify(task)
                 
                 # 标记任务完成
                 self.task_queue.task_done()
@@ -1309,8 +1426,14 @@ class TransferQueue:
 class AdvancedFTPClient:
     """
     高级FTP客户端，提供任务队列、批量传输等功能
+    
+    每个任务执行期间从连接池借出一条已登录的控制连接，
+    并发任务各自使用独立的连接，互不阻塞。
     """
     
+    # 空闲连接的最长保留时间（秒），超时的连接被关闭，需要时重新建立
+    POOL_IDLE_TIMEOUT = 300
+    
     def __init__(self, max_concurrent_tasks=5):
         """
         初始化高级FTP客户端
@@ -1318,21 +1441,31 @@ class AdvancedFTPClient:
         Args:
             max_concurrent_tasks (int): 最大并发任务数
         """
-        self.ftp_client = None
         self.transfer_queue = TransferQueue(max_concurrent_tasks)
         self.transfer_queue.start()
         self.connected = False
         self._connection_lock = threading.RLock()
         self._keep_alive_timer = None
-        self._keep_alive_interval = 60  # 默认60秒发送一次保活命令
+        self._keep_alive_interval = 60  # 默认60秒检查一次空闲连接
+        
+        # 控制连接池及登录信息，连接成功后创建
+        self._pool = None
+        self._login_info = None
+        # 登录后的初始目录；借出的连接不切换工作目录，相对路径都以此为基准
+        self._home_dir = None
+        # 当前工作线程正在使用的连接，以及所有已借出的连接
+        self._local = threading.local()
+        self._borrowed = set()
         
         # 连接选项
         self.retry_count = 3
         self.retry_delay = 5
         self.timeout = 30
         self.keep_alive = False
+        self.pool_size = max_concurrent_tasks
     
-    def set_connection_options(self, retry_count=3, retry_delay=5, timeout=30, keep_alive=False):
+    def set_connection_options(self, retry_count=3, retry_delay=5, timeout=30, keep_alive=False,
+                               pool_size=None):
         """
         设置连接选项
         
@@ -1341,11 +1474,17 @@ class AdvancedFTPClient:
             retry_delay (int): 重试延迟（秒）
             timeout (int): 超时时间（秒）
             keep_alive (bool): 是否启用保活机制
+            pool_size (int, optional): 控制连接池大小，默认等于最大并发任务数
         """
+        if pool_size is not None and pool_size < 1:
+            raise ValueError(f"无效的连接池大小: {pool_size}")
+        
         self.retry_count = retry_count
         self.retry_delay = retry_delay
         self.timeout = timeout
         self.keep_alive = keep_alive
+        if pool_size is not None:
+            self.pool_size = pool_size
     
     def _create_ftp_client(self, enable_ssl=False):
         """
@@ -1365,17 +1504,107 @@ class AdvancedFTPClient:
             logger.error(f"创建FTP客户端失败: {str(e)}")
             raise ConnectionError(f"创建FTP客户端连接失败: {str(e)}")
     
-    def _get_ftp_client(self):
+    def _acquire_client(self):
         """
-        获取FTP客户端实例，如果不存在则创建
+        从连接池借出一条已登录的控制连接，池满时等待其他任务释放
         
         Returns:
-            FTPClient: FTP客户端实例
+            tuple: (FTP客户端, 所属连接池)
         """
         with self._connection_lock:
-            if not self.ftp_client or not self.connected:
+            pool = self._pool
+            if not pool or not self.connected:
                 raise ConnectionError("未连接到FTP服务器")
-            return self.ftp_client
+            username, password, enable_ssl, passive_mode = self._login_info
+        
+        # 池满时排队等待，其他任务释放的连接按先进先出直接移交
+        client = pool.get_connection(wait_timeout=self.timeout, timeout=self.timeout,
+                                     enable_ssl=enable_ssl)
+        if not client:
+            raise ConnectionError(f"等待空闲连接超时，连接池大小: {pool.max_connections}")
+        
+        if not client.logged_in:
+            try:
+                client.set_connection_mode(
+                    ConnectionMode.PASSIVE if passive_mode else ConnectionMode.ACTIVE)
+                client.login(username, password)
+            except Exception:
+                pool.discard_connection(client)
+                raise
+        
+        with self._connection_lock:
+            self._borrowed.add(client)
+        return client, pool
+    
+    def _release_client(self, client, pool):
+        """
+        归还借出的连接，连接已断开或连接池已被替换时关闭该连接
+        
+        Args:
+            client (FTPClient): 借出的FTP客户端
+            pool (FTPConnectionPool): 借出时所属的连接池
+        """
+        with self._connection_lock:
+            self._borrowed.discard(client)
+        if client.connected and pool is self._pool:
+            pool.release_connection(client)
+        else:
+            pool.discard_connection(client)
+    
+    def _pooled(self, func):
+        """
+        包装任务函数，执行期间从连接池借出一条连接供_get_ftp_client返回
+        
+        Args:
+            func (callable): 任务函数
+            
+        Returns:
+            callable: 包装后的任务函数
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            client, pool = self._acquire_client()
+            self._local.client = client
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                # 失败的连接上可能还有未读取的迟到响应（如超时后的226/550），不能交给下一个任务
+                self._local.client = None
+                with self._connection_lock:
+                    self._borrowed.discard(client)
+                pool.discard_connection(client)
+                raise
+            self._local.client = None
+            self._release_client(client, pool)
+            return result
+        return wrapper
+    
+    def _remote_path(self, path=None):
+        """
+        将远程路径解析为绝对路径，相对路径以登录后的初始目录为基准
+        
+        Args:
+            path (str, optional): 远程路径，为空时返回初始目录
+            
+        Returns:
+            str: 远程绝对路径
+        """
+        home_dir = self._home_dir or '/'
+        if not path:
+            return home_dir
+        return posixpath.normpath(posixpath.join(home_dir, path))
+    
+    def _get_ftp_client(self):
+        """
+        获取当前任务借出的FTP客户端实例
+        
+        Returns:
+            FTPClient: FTP客户端实例
+        """
+        client = getattr(self._local, 'client', None)
+        if not client or not self.connected:
+            raise ConnectionError("未连接到FTP服务器")
+        return client
     
     def _start_keep_alive(self):
         """启动保活机制"""
@@ -1390,18 +1619,17 @@ class AdvancedFTPClient:
         self._keep_alive_timer.start()
     
     def _send_keep_alive(self):
-        """发送保活命令"""
+        """定期关闭空闲超时的连接，正在使用的连接不受影响，需要时由连接池重新建立"""
         try:
-            if self.connected and self.ftp_client:
-                # 发送无害的命令保持连接
-                with self._connection_lock:
-                    self.ftp_client._send_command("NOOP")
-                    self.ftp_client._read_response()
-            # 安排下一次保活
+            pool = self._pool
+            if self.connected and pool:
+                closed = pool.prune()
+                if closed:
+                    logger.debug(f"已关闭 {closed} 个空闲超时的连接")
+            # 安排下一次检查
             self._start_keep_alive()
         except Exception as e:
-            logger.debug(f"保活命令失败: {str(e)}")
-            # 如果保活失败，不重新安排，连接可能已断开
+            logger.debug(f"检查空闲连接失败: {str(e)}")
     
     def connect(self, host, port=21, username="anonymous", password="", enable_ssl=False, passive_mode=True):
         """
@@ -1420,13 +1648,8 @@ class AdvancedFTPClient:
         """
         with self._connection_lock:
             # 如果已经连接，先断开
-            if self.connected and self.ftp_client:
-                try:
-                    self.ftp_client.quit()
-                except Exception:
-                    pass
-                self.ftp_client = None
-                self.connected = False
+            if self.connected:
+                self.disconnect()
             
             # 创建新的FTP客户端连接
             retry_count = 0
@@ -1435,23 +1658,31 @@ class AdvancedFTPClient:
             while retry_count <= self.retry_count:
                 try:
                     # 创建FTP客户端
-                    self.ftp_client = self._create_ftp_client(enable_ssl)
+                    client = self._create_ftp_client(enable_ssl)
                     
                     # 设置连接参数
-                    self.ftp_client.host = host
-                    self.ftp_client.port = port
+                    client.host = host
+                    client.port = port
                     
                     # 连接服务器
-                    self.ftp_client.connect()
+                    client.connect()
                     
                     # 设置传输模式
                     if passive_mode:
-                        self.ftp_client.set_connection_mode(ConnectionMode.PASSIVE)
+                        client.set_connection_mode(ConnectionMode.PASSIVE)
                     else:
-                        self.ftp_client.set_connection_mode(ConnectionMode.ACTIVE)
+                        client.set_connection_mode(ConnectionMode.ACTIVE)
                     
                     # 登录
-                    self.ftp_client.login(username, password)
+                    client.login(username, password)
+                    home_dir = client.pwd()
+                    
+                    # 首条连接验证了登录信息，作为空闲连接放入连接池，其余连接按需建立
+                    self._pool = FTPConnectionPool(host, port, max_connections=self.pool_size,
+                                                   idle_timeout=self.POOL_IDLE_TIMEOUT)
+                    self._pool.add_connection(client)
+                    self._login_info = (username, password, enable_ssl, passive_mode)
+                    self._home_dir = home_dir
                     
                     # 连接成功
                     self.connected = True
@@ -1488,16 +1719,18 @@ class AdvancedFTPClient:
                 self._keep_alive_timer.cancel()
                 self._keep_alive_timer = None
             
-            # 断开连接
-            if self.connected and self.ftp_client:
+            # 关闭连接池中的空闲连接，正在使用的连接在任务结束归还时关闭
+            if self._pool:
                 try:
-                    self.ftp_client.quit()
+                    self._pool.close_all()
                     logger.info("已断开FTP连接")
                 except Exception as e:
                     logger.warning(f"断开连接时出错: {str(e)}")
                 finally:
-                    self.ftp_client = None
-                    self.connected = False
+                    self._pool = None
+                    self._login_info = None
+                    self._home_dir = None
+            self.connected = False
             
             return True
     
@@ -1506,6 +1739,54 @@ class AdvancedFTPClient:
         self.disconnect()
         self.transfer_queue.stop()
     
+    @staticmethod
+    def _shutdown_sockets(client):
+        """
+        立即关闭连接的套接字，使阻塞在该连接上的网络操作尽快返回
+        
+        Args:
+            client (FTPClient): FTP客户端
+        """
+        for sock in (client.data_socket, client.cmd_socket):
+            if sock:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+    
+    def shutdown_async(self, on_complete=None, join_timeout=2.0):
+        """
+        在后台线程中关闭客户端，不阻塞调用线程
+        
+        先标记为未连接，使后续任务不再借出连接；再强制关闭正在使用的连接，
+        中断阻塞的传输；最后关闭空闲连接并等待工作线程退出。
+        
+        Args:
+            on_complete (callable): 关闭完成后在后台线程中调用的回调函数
+            join_timeout (float): 等待工作线程退出的总超时时间（秒）
+            
+        Returns:
+            threading.Thread: 执行关闭的线程
+        """
+        def shutdown():
+            try:
+                with self._connection_lock:
+                    self.connected = False
+                    borrowed = list(self._borrowed)
+                for client in borrowed:
+                    self._shutdown_sockets(client)
+                self.disconnect()
+                self.transfer_queue.stop(timeout=join_timeout)
+            except Exception as e:
+                logger.warning(f"关闭客户端时出错: {str(e)}")
+            finally:
+                if on_complete:
+                    on_complete()
+        
+        thread = threading.Thread(target=shutdown, name="FTPClientShutdown", daemon=True)
+        thread.start()
+        return thread
+    
     def list_directory(self, remote_path=None, on_complete=None, on_error=None):
         """
         列出目录内容
@@ -1516,20 +1797,14 @@ class AdvancedFTPClient:
             on_error (callable): 错误回调函数
             
         Returns:
-            str: 任务ID
+            Task: 已加入队列的任务对象
         """
         def task_func(remote_path=None):
             client = self._get_ftp_client()
             
-            if remote_path:
-                # 切换到指定目录
-                client.cwd(remote_path)
-            else:
-                # 获取当前目录
-                remote_path = client.pwd()
-            
-            # 列出目录内容
-            items = client.list()
+            # 使用绝对路径列出，不切换借出连接的工作目录
+            remote_path = self._remote_path(remote_path)
+            items = client.list(remote_path)
             
             return {
                 'success': True,
@@ -1539,7 +1814,7 @@ class AdvancedFTPClient:
         
         task = Task(
             task_type=TaskType.LIST,
-            func=task_func,
+            func=self._pooled(task_func),
             args=[remote_path],
             priority=TaskPriority.HIGH
         )
@@ -1547,7 +1822,8 @@ class AdvancedFTPClient:
         task.on_complete = on_complete
         task.on_error = on_error
         
-        return self.transfer_queue.add_task(task)
+        self.transfer_queue.add_task(task)
+        return task
     
     def mkdir(self, remote_path, on_complete=None, on_error=None):
         """
@@ -1559,7 +1835,7 @@ class AdvancedFTPClient:
             on_error (callable): 错误回调函数
             
         Returns:
-            str: 任务ID
+            Task: 已加入队列的任务对象
         """
         def task_func(remote_path):
             client = self._get_ftp_client()
@@ -1586,7 +1862,7 @@ class AdvancedFTPClient:
         
         task = Task(
             task_type=TaskType.MKDIR,
-            func=task_func,
+            func=self._pooled(task_func),
             args=[remote_path],
             priority=TaskPriority.NORMAL
         )
@@ -1594,7 +1870,8 @@ class AdvancedFTPClient:
         task.on_complete = on_complete
         task.on_error = on_error
         
-        return self.transfer_queue.add_task(task)
+        self.transfer_queue.add_task(task)
+        return task
     
     def rmdir(self, remote_path, on_complete=None, on_error=None):
         """
@@ -1606,7 +1883,7 @@ class AdvancedFTPClient:
             on_error (callable): 错误回调函数
             
         Returns:
-            str: 任务ID
+            Task: 已加入队列的任务对象
         """
         def task_func(remote_path):
             client = self._get_ftp_client()
@@ -1622,7 +1899,7 @@ class AdvancedFTPClient:
         
         task = Task(
             task_type=TaskType.RMDIR,
-            func=task_func,
+            func=self._pooled(task_func),
             args=[remote_path],
             priority=TaskPriority.NORMAL
         )
@@ -1630,7 +1907,8 @@ class AdvancedFTPClient:
         task.on_complete = on_complete
         task.on_error = on_error
         
-        return self.transfer_queue.add_task(task)
+        self.transfer_queue.add_task(task)
+        return task
     
     def download(self, remote_path, local_path, priority=TaskPriority.NORMAL, 
                 verify=False, resume=False, on_progress=None, on_complete=None, on_error=None):
@@ -1648,7 +1926,7 @@ class AdvancedFTPClient:
             on_error (callable): 错误回调函数
             
         Returns:
-            str: 任务ID
+            Task: 已加入队列的任务对象
         """
         def task_func(remote_path, local_path, verify, resume):
             client = self._get_ftp_client()
@@ -1682,7 +1960,7 @@ class AdvancedFTPClient:
         
         task = Task(
             task_type=TaskType.DOWNLOAD,
-            func=task_func,
+            func=self._pooled(task_func),
             args=[remote_path, local_path, verify, resume],
             priority=priority
         )
@@ -1691,25 +1969,16 @@ class AdvancedFTPClient:
         task.on_complete = on_complete
         task.on_error = on_error
         
-        return self.transfer_queue.add_task(task)
+        self.transfer_queue.add_task(task)
+        return task
     
-    def upload(self, local_path, remote_path, priority=TaskPriority.NORMAL, 
-              verify=False, resume=False, on_progress=None, on_complete=None, on_error=None):
+    def _make_upload_task(self, local_path, remote_path, priority=TaskPriority.NORMAL,
+                          verify=False, resume=False, on_progress=None, on_complete=None, on_error=None):
         """
-        上传文件
+        创建上传任务，不加入队列
         
-        Args:
-            local_path (str): 本地文件路径
-            remote_path (str): 远程保存路径
-            priority (TaskPriority): 任务优先级
-            verify (bool): 是否验证文件完整性
-            resume (bool): 是否断点续传
-            on_progress (callable): 进度回调函数
-            on_complete (callable): 完成回调函数
-            on_error (callable): 错误回调函数
-            
         Returns:
-            str: 任务ID
+            Task: 上传任务
         """
         def task_func(local_path, remote_path, verify, resume):
             client = self._get_ftp_client()
@@ -1740,7 +2009,7 @@ class AdvancedFTPClient:
         
         task = Task(
             task_type=TaskType.UPLOAD,
-            func=task_func,
+            func=self._pooled(task_func),
             args=[local_path, remote_path, verify, resume],
             priority=priority
         )
@@ -1749,7 +2018,54 @@ class AdvancedFTPClient:
         task.on_complete = on_complete
         task.on_error = on_error
         
-        return self.transfer_queue.add_task(task)
+        return task
+    
+    def upload(self, local_path, remote_path, priority=TaskPriority.NORMAL, 
+              verify=False, resume=False, on_progress=None, on_complete=None, on_error=None):
+        """
+        上传文件
+        
+        Args:
+            local_path (str): 本地文件路径
+            remote_path (str): 远程保存路径
+            priority (TaskPriority): 任务优先级
+            verify (bool): 是否验证文件完整性
+            resume (bool): 是否断点续传
+            on_progress (callable): 进度回调函数
+            on_complete (callable): 完成回调函数
+            on_error (callable): 错误回调函数
+            
+        Returns:
+            Task: 已加入队列的任务对象
+        """
+        task = self._make_upload_task(local_path, remote_path, priority, verify, resume,
+                                      on_progress, on_complete, on_error)
+        self.transfer_queue.add_task(task)
+        return task
+    
+    def upload_many(self, pairs, priority=TaskPriority.NORMAL, on_progress=None,
+                    on_complete=None, on_error=None):
+        """
+        批量上传文件，所有任务一次性加入队列
+        
+        Args:
+            pairs (list): [(本地路径, 远程路径), ...]
+            priority (TaskPriority): 任务优先级
+            on_progress (callable): 进度回调函数
+            on_complete (callable): 完成回调函数
+            on_error (callable): 错误回调函数
+            
+        Returns:
+            list: 创建的任务对象列表
+        """
+        tasks = [
+            self._make_upload_task(local_path, remote_path, priority,
+                                   on_progress=on_progress, on_complete=on_complete,
+                                   on_error=on_error)
+            for local_path, remote_path in pairs
+        ]
+        self.transfer_queue.add_tasks(tasks)
+        return tasks
     
     def delete(self, remote_path, on_complete=None, on_error=None):
         """
@@ -1761,7 +2077,7 @@ class AdvancedFTPClient:
             on_error (callable): 错误回调函数
             
         Returns:
-            str: 任务ID
+            Task: 已加入队列的任务对象
         """
         def task_func(remote_path):
             client = self._get_ftp_client()
@@ -1777,7 +2093,7 @@ class AdvancedFTPClient:
         
         task = Task(
             task_type=TaskType.DELETE,
-            func=task_func,
+            func=self._pooled(task_func),
             args=[remote_path],
             priority=TaskPriority.NORMAL
         )
@@ -1785,7 +2101,8 @@ class AdvancedFTPClient:
         task.on_complete = on_complete
         task.on_error = on_error
         
-        return self.transfer_queue.add_task(task)
+        self.transfer_queue.add_task(task)
+        return task
     
     def rename(self, from_path, to_path, on_complete=None, on_error=None):
         """
@@ -1798,7 +2115,7 @@ class AdvancedFTPClient:
             on_error (callable): 错误回调函数
             
         Returns:
-            str: 任务ID
+            Task: 已加入队列的任务对象
         """
         def task_func(from_path, to_path):
             client = self._get_ftp_client()
@@ -1815,7 +2132,7 @@ class AdvancedFTPClient:
         
         task = Task(
             task_type=TaskType.RENAME,
-            func=task_func,
+            func=self._pooled(task_func),
             args=[from_path, to_path],
             priority=TaskPriority.NORMAL
         )
@@ -1823,7 +2140,8 @@ class AdvancedFTPClient:
         task.on_complete = on_complete
         task.on_error = on_error
         
-        return self.transfer_queue.add_task(task)
+        self.transfer_queue.add_task(task)
+        return task
     
     def download_directory(self, remote_dir, local_dir, on_progress=None, on_complete=None, on_error=None):
         """
@@ -1845,77 +2163,206 @@ class AdvancedFTPClient:
             # 首先确保本地目录存在
             os.makedirs(local_dir, exist_ok=True)
             
-            # 切换到远程目录
-            current_dir = client.pwd()
-            client.cwd(remote_dir)
+            # 使用绝对路径列出远程目录，不切换借出连接的工作目录
+            remote_dir = self._remote_path(remote_dir)
+            items = client.list(remote_dir)
             
-            try:
-                # 列出目录内容
-                items = client.list()
+            # 为每个项创建下载任务
+            task_ids = []
+            
+            for item in items:
+                name = item.get('name', '')
+                if name in ['.', '..']:
+                    continue
+                    
+                item_type = item.get('type', 'file')
+                remote_path = posixpath.join(remote_dir, name)
+                local_path = os.path.join(local_dir, name)
+                
+                if item_type == 'dir':
+                    # 递归下载子目录
+                    sub_ids = self.download_directory(
+                        remote_dir=remote_path,
+                        local_dir=local_path,
+                        on_progress=on_progress,
+                        on_complete=on_complete,
+                        on_error=on_error
+                    )
+                    task_ids.extend(sub_ids)
+                else:
+                    # 下载文件
+                    download_task = self.download(
+                        remote_path=remote_path,
+                        local_path=local_path,
+                        on_progress=on_progress,
+                        on_complete=on_complete,
+                        on_error=on_error
+                    )
+                    task_ids.append(download_task.id)
+            
+            return {
+                'success': True,
+                'remote_dir': remote_dir,
+                'local_dir': local_dir,
+                'task_ids': task_ids
+            }
+        
+        task = Task(
+            task_type=TaskType.LIST,
+            func=self._pooled(list_task_func),
+            args=[remote_dir, local_dir],
+            priority=TaskPriority.HIGH
+        )
+        
+        self.transfer_queue.add_task(task)
+        # 等待列表任务完成并返回创建的所有下载任务ID
+        result = self.wait_for_task(task)
+        if result and 'task_ids' in result:
+            return result['task_ids']
+        return []
+    
+    def download_directory_async(self, remote_dir, local_dir, on_progress=None, on_complete=None,
+                                 on_error=None, on_scan_progress=None, on_scan_complete=None):
+        """
+        异步下载整个目录，立即返回
+        
+        由一个扫描任务使用同一条连接逐层列出远程目录，每发现一个文件就提交下载任务，
+        扫描尚未结束时先发现的文件就已开始传输。扫描任务被取消时停止遍历。
+        
+        Args:
+            remote_dir (str): 远程目录路径
+            local_dir (str): 本地保存目录路径
+            on_progress (callable): 各下载任务的进度回调函数
+            on_complete (callable): 各下载任务的完成回调函数
+            on_error (callable): 错误回调函数
+            on_scan_progress (callable): 每扫描完一个目录调用，参数为(扫描任务, 已提交的文件数, 目录路径)
+            on_scan_complete (callable): 扫描完成回调函数，结果中的task_ids为所有下载任务ID
+            
+        Returns:
+            Task: 扫描任务
+        """
+        def scan_func(remote_dir, local_dir):
+            client = self._get_ftp_client()
+            task_ids = []
+            pending = deque([(remote_dir, local_dir)])
+            
+            while pending:
+                if scan_task.status == TaskStatus.CANCELLED:
+                    break
                 
-                # 为每个项创建下载任务
-                task_ids = []
+                current_remote, current_local = pending.popleft()
+                os.makedirs(current_local, exist_ok=True)
                 
-                for item in items:
+                for item in client.list(current_remote):
                     name = item.get('name', '')
-                    if name in ['.', '..']:
+                    if name in ('.', '..'):
                         continue
-                        
-                    item_type = item.get('type', 'file')
-                    remote_path = os.path.join(remote_dir, name).replace('\\', '/')
-                    local_path = os.path.join(local_dir, name)
                     
-                    if item_type == 'dir':
-                        # 递归下载子目录
-                        sub_ids = self.download_directory(
-                            remote_dir=remote_path,
-                            local_dir=local_path,
-                            on_progress=on_progress,
-                            on_complete=on_complete,
-                            on_error=on_error
-                        )
-                        task_ids.extend(sub_ids)
+                    remote_path = posixpath.join(current_remote, name)
+                    local_path = os.path.join(current_local, name)
+                    
+                    if item.get('type', 'file') == 'dir':
+                        pending.append((remote_path, local_path))
                     else:
-                        # 下载文件
-                        task_id = self.download(
+                        download_task = self.download(
                             remote_path=remote_path,
                             local_path=local_path,
                             on_progress=on_progress,
                             on_complete=on_complete,
                             on_error=on_error
                         )
-                        task_ids.append(task_id)
+                        task_ids.append(download_task.id)
                 
-                # 恢复原始目录
-                client.cwd(current_dir)
-                
-                return {
-                    'success': True,
-                    'remote_dir': remote_dir,
-                    'local_dir': local_dir,
-                    'task_ids': task_ids
-                }
-            except Exception as e:
-                # 发生错误，恢复原始目录
-                try:
-                    client.cwd(current_dir)
-                except Exception:
-                    pass
-                raise e
+                if on_scan_progress:
+                    on_scan_progress(scan_task, len(task_ids), current_remote)
+            
+            return {
+                'success': True,
+                'remote_dir': remote_dir,
+                'local_dir': local_dir,
+                'task_ids': task_ids
+            }
         
-        task = Task(
+        scan_task = Task(
             task_type=TaskType.LIST,
-            func=list_task_func,
+            func=self._pooled(scan_func),
             args=[remote_dir, local_dir],
             priority=TaskPriority.HIGH
         )
         
-        task_id = self.transfer_queue.add_task(task)
-        # 等待列表任务完成并返回创建的所有下载任务ID
-        result = self.wait_for_task(task_id)
-        if result and 'task_ids' in result:
-            return result['task_ids']
-        return []
+        scan_task.on_complete = on_scan_complete
+        scan_task.on_error = on_error
+        
+        self.transfer_queue.add_task(scan_task)
+        return scan_task
+    
+    def upload_tree(self, remote_dirs, files, on_progress=None, on_complete=None,
+                   on_error=None, on_queued=None):
+        """
+        上传已遍历好的目录树
+        
+        在同一个任务中按顺序创建所有远程目录，全部创建后才提交各文件的上传任务，
+        由任务顺序保证上传时目标目录已经存在。
+        
+        Args:
+            remote_dirs (list): 远程目录列表，父目录必须排在子目录之前
+            files (list): [(本地路径, 远程路径), ...]
+            on_progress (callable): 各上传任务的进度回调函数
+            on_complete (callable): 各上传任务的完成回调函数
+            on_error (callable): 错误回调函数
+            on_queued (callable): 目录创建完成、上传任务已提交时的回调函数
+            
+        Returns:
+            Task: 创建目录的任务，其结果中的tasks为上传任务列表
+        """
+        def task_func(remote_dirs, files):
+            client = self._get_ftp_client()
+            # 已列出的父目录 {父目录: 其中的子目录名集合}
+            listed_dirs = {}
+            
+            # 父目录排在子目录之前，逐个创建即可，不需要逐级回溯
+            for remote_dir in remote_dirs:
+                try:
+                    client.mkd(remote_dir)
+                except CommandError:
+                    # 只忽略目录已存在导致的550，通过列出父目录确认，其它错误使任务失败
+                    if client.last_response_code != client.FILE_UNAVAILABLE:
+                        raise
+                    parent, name = posixpath.split(remote_dir.rstrip('/'))
+                    if parent not in listed_dirs:
+                        listed_dirs[parent] = {
+                            item.get('name') for item in client.list(parent or None)
+                            if item.get('type') == 'dir'
+                        }
+                    if name not in listed_dirs[parent]:
+                        raise
+            
+            tasks = self.upload_many(
+                files,
+                on_progress=on_progress,
+                on_complete=on_complete,
+                on_error=on_error
+            )
+            
+            return {
+                'success': True,
+                'remote_dirs': remote_dirs,
+                'task_ids': [task.id for task in tasks],
+                'tasks': tasks
+            }
+        
+        task = Task(
+            task_type=TaskType.MKDIR,
+            func=self._pooled(task_func),
+            args=[remote_dirs, files],
+            priority=TaskPriority.NORMAL
+        )
+        
+        task.on_complete = on_queued
+        task.on_error = on_error
+        
+        self.transfer_queue.add_task(task)
+        return task
     
     def upload_directory(self, local_dir, remote_dir, on_progress=None, on_complete=None, on_error=None):
         """
@@ -1936,8 +2383,7 @@ class AdvancedFTPClient:
             raise FileNotFoundError(f"本地目录不存在: {local_dir}")
         
         # 先创建远程目录
-        mkdir_id = self.mkdir(remote_dir)
-        self.wait_for_task(mkdir_id)
+        self.wait_for_task(self.mkdir(remote_dir))
         
         # 遍历本地目录
         task_ids = []
@@ -1958,23 +2404,23 @@ class AdvancedFTPClient:
                 task_ids.extend(sub_ids)
             else:
                 # 上传文件
-                task_id = self.upload(
+                upload_task = self.upload(
                     local_path=local_path,
                     remote_path=remote_path,
                     on_progress=on_progress,
                     on_complete=on_complete,
                     on_error=on_error
                 )
-                task_ids.append(task_id)
+                task_ids.append(upload_task.id)
         
         return task_ids
     
-    def wait_for_task(self, task_id, timeout=None):
+    def wait_for_task(self, task, timeout=None):
         """
         等待任务完成
         
         Args:
-            task_id (str): 任务ID
+            task (Task|str): 任务对象或任务ID
             timeout (float): 超时时间（秒），None表示无限等待
             
         Returns:
@@ -1982,12 +2428,12 @@ class AdvancedFTPClient:
         """
         start_time = time.time()
         
+        if not isinstance(task, Task):
+            task = self.get_task_status(task)
+        if not task:
+            return None
+        
         while True:
-            task = self.get_task_status(task_id)
-            
-            if not task:
-                return None
-            
             if task.status == TaskStatus.COMPLETE:
                 return task.result
             
@@ -2048,6 +2494,38 @@ class AdvancedFTPClient:
         """
         return self.transfer_queue.get_all_tasks()
     
+    def get_task_counts(self):
+        """
+        获取各状态的任务数量
+        
+        Returns:
+            dict: 活动、排队、完成和失败的任务数量
+        """
+        return self.transfer_queue.get_task_counts()
+    
+    def iter_active_sorted_by_ui_age(self, limit):
+        """
+        按界面最后更新时间从旧到新遍历活动任务
+        
+        Args:
+            limit (int): 最多返回的任务数
+            
+        Returns:
+            Iterator[Task]: 活动任务迭代器
+        """
+        return iter(self.transfer_queue.get_stalest_active(limit))
+    
+    def set_task_listener(self, listener):
+        """
+        设置任务状态监听器，任务开始、完成、失败、重试或取消时调用
+        
+        监听器在工作线程中调用，GUI应通过队列连接的信号转发到主线程。
+        
+        Args:
+            listener (callable): 接收任务对象的回调函数，None表示取消监听
+        """
+        self.transfer_queue.task_listener = listener
+    
     def cancel_task(self, task_id):
         """
         取消任务
@@ -2059,6 +2537,18 @@ class AdvancedFTPClient:
             bool: 是否成功取消
         """
         return self.transfer_queue.cancel_task(task_id)
+    
+    def cancel_tasks(self, task_ids):
+        """
+        批量取消任务
+        
+        Args:
+            task_ids (list): 任务ID列表
+            
+        Returns:
+            list: 成功取消的任务ID
+        """
+        return self.transfer_queue.cancel_tasks(task_ids)
 
 # 用于方便导入的类型别名
 from client.ftp_client import ConnectionMode, TransferMode
@@ -1,5 +1,7 @@
 import os
 import re
+import posixpath
+import asyncio
 import socket
 import ssl
 import time
@@ -7,6 +9,10 @@ import logging
 import threading
 import queue
 import fnmatch
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, CancelledError
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
 from pathlib import Path
 
 from common.protocol import FTPProtocolMixin, TransferMode, ConnectionMode, ftp_command
@@ -14,14 +20,38 @@ from common.exceptions import (
     FTPError, AuthenticationError, ConnectionError, 
     FileTransferError, CommandError, TimeoutError
 )
-from common.utils import format_size, calculate_transfer_speed, TokenBucket, get_file_md5
+from common.utils import (
+    format_size, calculate_transfer_speed, TokenBucket, get_file_md5, permissions_to_str,
+    sendfile_transfer
+)
 
 logger = logging.getLogger(__name__)
 
+# 数据传输块大小（字节）
+DEFAULT_CHUNK_SIZE = 65536
+MIN_CHUNK_SIZE = 4096
+MAX_CHUNK_SIZE = 4 * 1024 * 1024
+
+# 数据连接套接字缓冲区大小（字节）
+DEFAULT_SOCKET_BUFFER_SIZE = 1024 * 1024
+
+# 传输进度回调的触发间隔（字节）
+DEFAULT_PROGRESS_REPORT_BYTES = 1024 * 1024
+
+# 控制连接单次接收的最大字节数，一次recv通常即可取得完整响应（含流水线的多条响应）
+CONTROL_RECV_SIZE = 65536
+
+# SIZE/MDTM结果缓存有效期（秒）
+DEFAULT_METADATA_CACHE_TTL = 5
+
 class FTPClient(FTPProtocolMixin):
     """FTP客户端基础类，提供与FTP服务器通信的核心功能"""
     
-    def __init__(self, host=None, port=21, timeout=30, enable_ssl=False):
+    def __init__(self, host=None, port=21, timeout=30, enable_ssl=False,
+                 upload_chunk_size=DEFAULT_CHUNK_SIZE,
+                 so_sndbuf=DEFAULT_SOCKET_BUFFER_SIZE,
+                 so_rcvbuf=DEFAULT_SOCKET_BUFFER_SIZE,
+                 tcp_nodelay=True):
         """
         初始化FTP客户端
         
@@ -30,31 +60,57 @@ class FTPClient(FTPProtocolMixin):
             port (int): FTP服务器端口
             timeout (int): 连接超时时间（秒）
             enable_ssl (bool): 是否启用SSL/TTLS加密
+            upload_chunk_size (int): 上传/下载时每次读写的块大小（字节）
+            so_sndbuf (int): 数据连接发送缓冲区大小（字节），None表示使用系统默认值
+            so_rcvbuf (int): 数据连接接收缓冲区大小（字节），None表示使用系统默认值
+            tcp_nodelay (bool): 数据连接是否禁用Nagle算法
         """
+        if not MIN_CHUNK_SIZE <= upload_chunk_size <= MAX_CHUNK_SIZE:
+            raise ValueError(
+                f"无效的传输块大小: {upload_chunk_size}，"
+                f"有效范围为 {MIN_CHUNK_SIZE} - {MAX_CHUNK_SIZE} 字节"
+            )
+        
         self.host = host
         self.port = port
         self.timeout = timeout
+        self.data_timeout = timeout  # 数据连接单次收发的超时时间（秒）
         self.enable_ssl = enable_ssl
         
         # 连接相关属性
         self.cmd_socket = None
+        self._recv_buffer = b''  # 控制连接中尚未消费的响应数据
         self.data_socket = None
         self.connected = False
         self.logged_in = False
         self.username = None
+        self._password = None  # 批量并行传输时用于登录额外的连接
         self.transfer_mode = TransferMode.BINARY
         self.connection_mode = ConnectionMode.PASSIVE
+        self.pipelining_enabled = False  # 是否在一次发送中合并多条控制命令
+        self._features = None  # FEAT声明的服务器扩展功能，首次使用时获取
         
         # 传输控制
         self.bandwidth_limit = None  # 带宽限制（字节/秒）
+        self.upload_chunk_size = upload_chunk_size  # 传输块大小（字节）
+        self.so_sndbuf = so_sndbuf  # 数据连接发送缓冲区大小
+        self.so_rcvbuf = so_rcvbuf  # 数据连接接收缓冲区大小
+        self.tcp_nodelay = tcp_nodelay  # 数据连接是否禁用Nagle算法
         self.token_bucket = None
         self.transfer_progress_callback = None
+        self.progress_report_bytes = DEFAULT_PROGRESS_REPORT_BYTES  # 进度回调间隔（字节）
         
         # 状态追踪
         self.last_response = None
         self.last_response_code = None
+        self.last_response_class = None  # 响应码首位（1-5），避免每次检查都做整除
         self.working_directory = None
         
+        # 远程文件元数据缓存 {路径: (值, 缓存时间)}
+        self.metadata_cache_ttl = DEFAULT_METADATA_CACHE_TTL
+        self._size_cache = {}
+        self._mdtm_cache = {}
+        
         # 初始化SSL上下文
         self.ssl_context = None
         if enable_ssl:
@@ -163,10 +219,12 @@ class FTPClient(FTPProtocolMixin):
         
         try:
             if self.cmd_socket:
-                self.close()
+                self._close_connection()
             
             # 创建套接字
             self.cmd_socket = socket.create_connection((host, port), timeout)
+            self._recv_buffer = b''
+            self._features = None
             
             # 应用SSL如果需要
             if self.enable_ssl:
@@ -176,18 +234,19 @@ class FTPClient(FTPProtocolMixin):
                 self.cmd_socket = context.wrap_socket(self.cmd_socket)
                 logger.info("已启用SSL加密连接")
             
-            # 获取欢迎消息
+            # 控制连接已建立，读取欢迎消息（_read_response要求connected为True，读取出错时会重置）
+            self.connected = True
             welcome = self._read_response()
             code, msg = self.parse_response(welcome)
             
             if code != self.READY_FOR_NEW_USER:
                 error_msg = f"FTP服务器返回意外代码: {code}, 消息: {msg}"
                 self.connection_errors.append((time.time(), error_msg))
+                self._close_connection()
                 raise ConnectionError(error_msg)
             
             self._current_directory = None
             self._welcome_message = welcome
-            self.connected = True
             
             logger.info(f"成功连接到FTP服务器: {welcome}")
             return True
@@ -266,7 +325,9 @@ class FTPClient(FTPProtocolMixin):
             # 检查是否登录成功
             if code == self.LOGGED_IN:
                 self.username = username
+                self._password = password
                 self.logged_in = True
+                self._features = None  # 部分服务器登录后声明的功能不同，重新获取
                 logger.info(f"用户 {username} 成功登录")
                 return True
                 
@@ -318,6 +379,8 @@ class FTPClient(FTPProtocolMixin):
                 pass
             self.cmd_socket = None
             
+        self._recv_buffer = b''
+        self._features = None
         self.connected = False
         self.logged_in = False
     
@@ -337,22 +400,79 @@ class FTPClient(FTPProtocolMixin):
         if not self.connected:
             raise ConnectionError("连接已关闭")
             
+        return self._send_raw(self._encode_command(command))
+    
+    def _encode_command(self, command):
+        """
+        将命令编码为字节并记录日志（过滤敏感信息）
+        
+        Args:
+            command (str): 要发送的命令
+            
+        Returns:
+            bytes: 以CRLF结尾的命令字节
+        """
         # 添加敏感信息过滤
         log_command = command
         if command.startswith("PASS "):
             log_command = "PASS ********"
             
-        cmd_bytes = (command + "\r\n").encode('utf-8')
         logger.debug(f"发送命令: {log_command}")
+        return (command + "\r\n").encode('utf-8')
+    
+    def _send_raw(self, data):
+        """
+        向控制连接发送原始字节
         
+        Args:
+            data (bytes): 要发送的数据
+        """
         try:
-            return self.cmd_socket.sendall(cmd_bytes)
+            return self.cmd_socket.sendall(data)
         except (socket.error, BrokenPipeError) as e:
             error_msg = f"发送命令失败: {str(e)}"
             logger.error(error_msg)
             self.connected = False  # 标记连接状态
             raise ConnectionError(error_msg)
     
+    def _send_commands_pipeline(self, commands):
+        """
+        在一次sendall()中发送多条命令，然后依次读取每条命令的响应
+        
+        即使中间某条命令失败，也会读完所有响应以保持控制连接同步。
+        
+        Args:
+            commands (list): 要发送的命令列表
+            
+        Returns:
+            list: 每条命令的(响应码, 响应)列表
+            
+        Raises:
+            CommandError: 任一命令返回5xx错误时，在读完所有响应后抛出第一个错误
+        """
+        if not self.cmd_socket:
+            raise ConnectionError("未连接到FTP服务器")
+            
+        if not self.connected:
+            raise ConnectionError("连接已关闭")
+            
+        self._send_raw(b''.join(self._encode_command(cmd) for cmd in commands))
+        
+        results = []
+        first_error = None
+        for _ in commands:
+            try:
+                response = self._read_response()
+            except CommandError as e:
+                if first_error is None:
+                    first_error = e
+                response = self.last_response
+            results.append((self.last_response_code, response))
+            
+        if first_error is not None:
+            raise first_error
+        return results
+    
     def _read_response(self):
         """
         读取FTP服务器响应，带超时处理
@@ -366,46 +486,80 @@ class FTPClient(FTPProtocolMixin):
         if not self.connected:
             raise ConnectionError("连接已关闭")
             
-        response = ""
-        start_time = time.time()
+        start_time = time.monotonic()
         
         while True:
             try:
+                # 缓冲区中已有完整响应时直接返回（流水线命令的后续响应）
+                raw_response = self._pop_buffered_response()
+                if raw_response is not None:
+                    break
+                    
                 # 检查是否已超时
-                if (time.time() - start_time) > self.timeout:
+                if (time.monotonic() - start_time) > self.timeout:
                     raise TimeoutError(f"读取响应超时 (>{self.timeout}秒)")
                     
-                line = self.cmd_socket.recv(1024).decode('utf-8')
-                if not line:
+                chunk = self.cmd_socket.recv(CONTROL_RECV_SIZE)
+                if not chunk:
                     self.connected = False
                     raise ConnectionError("连接已关闭")
                     
-                response += line
-                
-                # 检查是否为错误响应
-                if line.startswith('5') and line[3:4] == ' ':
-                    error_msg = line.strip()
-                    logger.error(f"服务器返回错误: {error_msg}")
-                    raise CommandError(error_msg)
-                    
-                # 检查响应是否完成 (如果响应码后跟空格，则为最后一行)
-                if len(line) > 3 and line[3:4] == ' ':
-                    break
+                self._recv_buffer += chunk
                     
             except socket.timeout:
-                elapsed = time.time() - start_time
+                elapsed = time.monotonic() - start_time
                 raise TimeoutError(f"读取响应超时 ({elapsed:.1f}秒)")
                 
             except (socket.error, ConnectionError) as e:
                 self.connected = False
                 raise ConnectionError(f"读取响应时出错: {str(e)}")
                 
+        response = raw_response.decode('utf-8', errors='replace')
         logger.debug(f"接收响应: {response.strip()}")
         self.last_response = response.strip()
         code, _ = self.parse_response(response)
         self.last_response_code = code
+        self.last_response_class = code // 100 if code is not None else None
+        
+        # 检查是否为错误响应
+        if self.last_response_class == self.NEGATIVE_PERMANENT:
+            error_msg = response.strip().splitlines()[-1]
+            logger.error(f"服务器返回错误: {error_msg}")
+            raise CommandError(error_msg)
+            
         return response
     
+    def _pop_buffered_response(self):
+        """
+        从接收缓冲区中取出一个完整的响应
+        
+        多行响应以"xyz-"开头，以"xyz "开头的行结束；单行响应以"xyz "开头。
+        
+        Returns:
+            bytes: 完整响应，缓冲区中没有完整响应时返回None
+        """
+        buffer = self._recv_buffer
+        pos = 0
+        code = None
+        
+        while True:
+            line_end = buffer.find(b'\n', pos)
+            if line_end < 0:
+                return None
+                
+            line = buffer[pos:line_end]
+            pos = line_end + 1
+            
+            if code is None:
+                code = line[:3]
+                if line[3:4] != b'-':
+                    break
+            elif line[:3] == code and line[3:4] == b' ':
+                break
+                
+        self._recv_buffer = buffer[pos:]
+        return buffer[:pos]
+    
     def __enter__(self):
         """上下文管理器入口点，允许使用with语句"""
         return self
@@ -451,7 +605,9 @@ class FTPClient(FTPProtocolMixin):
         try:
             # 创建数据连接
             data_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            data_sock.settimeout(self.timeout)
+            data_sock.settimeout(self.data_timeout)
+            # 在连接前设置缓冲区，以便TCP握手时协商窗口大小
+            self._tune_data_socket(data_sock)
             data_sock.connect((ip, port))
             
             # 如果使用TLS，加密数据连接
@@ -476,6 +632,8 @@ class FTPClient(FTPProtocolMixin):
         """
         server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         server_sock.settimeout(self.timeout)
+        # 监听套接字上的选项会被accept()返回的套接字继承
+        self._tune_data_socket(server_sock)
         server_sock.bind(('', 0))  # 绑定任意可用端口
         server_sock.listen(1)
         
@@ -495,6 +653,117 @@ class FTPClient(FTPProtocolMixin):
         logger.debug(f"已创建主动模式数据监听: {local_ip}:{local_port}")
         return server_sock
     
+    def _accept_data_connection(self, listen_sock):
+        """
+        接受主动模式的数据连接，并关闭监听套接字
+        
+        accept()返回的套接字不继承监听套接字的超时设置，需要重新设置，
+        否则服务器无响应时收发会无限期阻塞。
+        
+        Args:
+            listen_sock (socket): 监听套接字
+            
+        Returns:
+            socket: 数据套接字
+        """
+        try:
+            data_sock, _ = listen_sock.accept()
+        finally:
+            listen_sock.close()
+        data_sock.settimeout(self.data_timeout)
+        self._tune_data_socket(data_sock)
+        return data_sock
+    
+    def _tune_data_socket(self, sock):
+        """
+        设置数据连接的套接字选项（缓冲区大小和TCP_NODELAY）
+        
+        Args:
+            sock (socket): 数据套接字
+        """
+        try:
+            if self.so_sndbuf:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, self.so_sndbuf)
+            if self.so_rcvbuf:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.so_rcvbuf)
+            if self.tcp_nodelay:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError as e:
+            # 套接字选项只是性能优化，设置失败不影响传输
+            logger.debug(f"设置数据连接套接字选项失败: {str(e)}")
+    
+    def _can_use_sendfile(self, data_sock):
+        """
+        判断上传是否可以使用sendfile零拷贝发送
+        
+        带宽限制需要逐块消费令牌，TLS连接需要在用户态加密，这两种情况只能走分块发送。
+        
+        Args:
+            data_sock (socket): 数据套接字
+            
+        Returns:
+            bool: 是否可以使用sendfile
+        """
+        return (self.token_bucket is None
+                and not isinstance(data_sock, ssl.SSLSocket)
+                and hasattr(data_sock, 'sendfile'))
+    
+    def _can_use_sendmsg(self, data_sock):
+        """
+        判断是否可以使用sendmsg一次发送多个缓冲区
+        
+        sendmsg仅在POSIX平台提供，TLS套接字不支持。
+        
+        Args:
+            data_sock (socket): 数据套接字
+            
+        Returns:
+            bool: 是否可以使用sendmsg
+        """
+        return hasattr(data_sock, 'sendmsg') and not isinstance(data_sock, ssl.SSLSocket)
+    
+    def _sendmsg_all(self, data_sock, buffers):
+        """
+        使用sendmsg发送多个缓冲区，处理部分发送的情况
+        
+        Args:
+            data_sock (socket): 数据套接字
+            buffers (list): memoryview列表
+        """
+        while buffers:
+            sent = data_sock.sendmsg(buffers)
+            # 丢弃已完整发送的缓冲区，截去部分发送的缓冲区已发送的部分
+            while buffers and sent >= len(buffers[0]):
+                sent -= len(buffers[0])
+                buffers.pop(0)
+            if buffers and sent:
+                buffers[0] = buffers[0][sent:]
+    
+    def _sendfile_upload(self, data_sock, f, offset, count, start_time):
+        """
+        使用socket.sendfile()发送文件内容
+        
+        设置了进度回调时按progress_report_bytes分段发送，以便报告进度。
+        
+        Args:
+            data_sock (socket): 数据套接字
+            f (file): 以二进制模式打开的本地文件
+            offset (int): 文件起始偏移量
+            count (int): 要发送的字节数
+            start_time (float): 传输开始时间（time.monotonic()）
+            
+        Returns:
+            int: 已发送的字节数
+        """
+        if not self.transfer_progress_callback:
+            return sendfile_transfer(data_sock, f, offset, count)
+        
+        return sendfile_transfer(
+            data_sock, f, offset, count,
+            chunk_size=self.progress_report_bytes,
+            on_progress=lambda sent: self._report_progress(offset + sent, offset + count, start_time)
+        )
+    
     def set_transfer_mode(self, mode):
         """
         设置传输模式
@@ -545,14 +814,33 @@ class FTPClient(FTPProtocolMixin):
             self.token_bucket = None
         logger.debug(f"带宽限制已设置为: {limit_bytes_per_sec if limit_bytes_per_sec else '无限制'} 字节/秒")
     
-    def set_progress_callback(self, callback):
+    def set_progress_callback(self, callback, report_every_bytes=None):
         """
         设置传输进度回调函数
         
         Args:
             callback (callable): 回调函数，参数为(已传输字节数, 总字节数, 已用时间)
+            report_every_bytes (int, optional): 每传输多少字节触发一次回调，None表示保持当前设置
         """
         self.transfer_progress_callback = callback
+        if report_every_bytes:
+            self.progress_report_bytes = report_every_bytes
+    
+    def _report_progress(self, transferred, total, start_time):
+        """
+        触发传输进度回调
+        
+        Args:
+            transferred (int): 已传输字节数
+            total (int): 总字节数，未知时为0
+            start_time (float): 传输开始时间（time.monotonic()）
+        """
+        if not self.transfer_progress_callback:
+            return
+            
+        elapsed = time.monotonic() - start_time
+        if elapsed > 0:
+            self.transfer_progress_callback(transferred, total if total > 0 else transferred, elapsed)
     
     @ftp_command
     def pwd(self):
@@ -592,7 +880,7 @@ class FTPClient(FTPProtocolMixin):
         self._send_command(f"CWD {directory}")
         response = self._read_response()
         
-        if self.last_response_code // 100 != self.POSITIVE_COMPLETION:
+        if self.last_response_class != self.POSITIVE_COMPLETION:
             raise CommandError(f"更改工作目录失败: {response}")
             
         # 更新当前工作目录
@@ -610,7 +898,7 @@ class FTPClient(FTPProtocolMixin):
         self._send_command("CDUP")
         response = self._read_response()
         
-        if self.last_response_code // 100 != self.POSITIVE_COMPLETION:
+        if self.last_response_class != self.POSITIVE_COMPLETION:
             raise CommandError(f"返回上级目录失败: {response}")
             
         # 更新当前工作目录
@@ -655,22 +943,114 @@ class FTPClient(FTPProtocolMixin):
         self._send_command(f"RMD {directory}")
         response = self._read_response()
         
-        if self.last_response_code // 100 != self.POSITIVE_COMPLETION:
+        if self.last_response_class != self.POSITIVE_COMPLETION:
             raise CommandError(f"删除目录失败: {response}")
             
         return True
     
+    def features(self):
+        """
+        获取服务器通过FEAT声明的扩展功能，结果在会话内缓存
+        
+        Returns:
+            set: 大写的功能名称集合，同时包含完整行（如"REST STREAM"）和命令名（如"REST"）
+        """
+        if self._features is None:
+            features = set()
+            try:
+                self._send_command("FEAT")
+                response = self._read_response()
+                if self.last_response_code == self.SYSTEM_STATUS:
+                    # 首行和末行为状态行，中间每行一个功能
+                    for line in response.splitlines()[1:-1]:
+                        feature = line.strip().upper()
+                        if feature:
+                            features.add(feature)
+                            features.add(feature.split(' ', 1)[0])
+            except CommandError:
+                logger.debug("服务器不支持FEAT命令")
+            self._features = features
+            logger.debug(f"服务器功能: {sorted(features)}")
+        return self._features
+
+    def supports(self, feature):
+        """
+        判断服务器是否支持某项扩展功能
+        
+        服务器不支持FEAT或未声明任何功能时无法判断，按支持处理，由实际命令决定结果。
+        
+        Args:
+            feature (str): 功能名称，如"SIZE"、"MLSD"、"REST STREAM"
+            
+        Returns:
+            bool: 是否支持
+        """
+        features = self.features()
+        return not features or feature.upper() in features
+
+    def _mlsd_to_list_entry(self, facts):
+        """
+        将MLSD条目转换为与LIST解析结果相同的字段
+        
+        Args:
+            facts (dict): parse_mlsd_response返回的条目
+            
+        Returns:
+            dict: 文件信息，当前目录和父目录条目返回None
+        """
+        entry_type = facts.get('type', '').lower()
+        if entry_type in ('cdir', 'pdir'):
+            return None
+            
+        modify = facts.get('modify', '')
+        date = ''
+        if len(modify) >= 12:
+            date = f"{modify[0:4]}-{modify[4:6]}-{modify[6:8]} {modify[8:10]}:{modify[10:12]}"
+            
+        mode = facts.get('unix.mode')
+        try:
+            permissions = permissions_to_str(int(mode)) if mode else ''
+        except ValueError:
+            permissions = ''
+            
+        try:
+            size = int(facts.get('size', 0))
+        except ValueError:
+            size = 0
+            
+        return {
+            'type': 'dir' if entry_type == 'dir' else 'file',
+            'permissions': permissions,
+            'owner': facts.get('unix.owner', ''),
+            'group': facts.get('unix.group', ''),
+            'size': size,
+            'date': date,
+            'name': facts.get('name', '')
+        }
+
     @ftp_command
     def list(self, path=None):
         """
         列出目录内容
         
+        服务器支持MLSD时优先使用，类型和大小在一次往返中返回；
+        部分服务器虽然在FEAT中声明MLSD，但对某些目录或状态拒绝执行，此时回退到LIST。
+        
         Args:
             path (str, optional): 要列出的目录路径，默认为当前目录
             
         Returns:
             list: 目录列表内容
         """
+        if 'MLSD' in self.features():
+            try:
+                entries = (self._mlsd_to_list_entry(facts) for facts in self.mlsd(path))
+                return [entry for entry in entries if entry]
+            except CommandError as e:
+                if not self.connected:
+                    raise
+                logger.warning(f"MLSD失败，改用LIST: {str(e)}")
+            
         # 创建数据连接
         data_sock = None
         
@@ -691,9 +1071,7 @@ class FTPClient(FTPProtocolMixin):
             # 接收数据
             if self.connection_mode == ConnectionMode.ACTIVE:
                 # 主动模式需要接受连接
-                client_sock, _ = data_sock.accept()
-                data_sock.close()
-                data_sock = client_sock
+                data_sock = self._accept_data_connection(data_sock)
             
             # 读取目录列表数据
             directory_data = b''
@@ -755,9 +1133,7 @@ class FTPClient(FTPProtocolMixin):
             # 接收数据
             if self.connection_mode == ConnectionMode.ACTIVE:
                 # 主动模式需要接受连接
-                client_sock, _ = data_sock.accept()
-                data_sock.close()
-                data_sock = client_sock
+                data_sock = self._accept_data_connection(data_sock)
             
             # 读取目录列表数据
             directory_data = b''
@@ -778,9 +1154,8 @@ class FTPClient(FTPProtocolMixin):
             if self.last_response_code != self.TRANSFER_COMPLETE:
                 raise CommandError(f"读取目录列表完成响应失败: {response}")
                 
-            # 解码并解析
-            directory_lines = directory_data.decode('utf-8', errors='replace').splitlines()
-            return self.parse_mlsd_response(directory_lines)
+            # 直接解析字节，只解码文件名
+            return self.parse_mlsd_response_bytes(directory_data)
             
         except Exception as e:
             if data_sock:
@@ -821,13 +1196,14 @@ class FTPClient(FTPProtocolMixin):
         if not os.path.exists(local_dir):
             os.makedirs(local_dir, exist_ok=True)
         
-        # 获取远程文件大小
-        try:
-            remote_size = self.size(remote_path)
-            logger.debug(f"远程文件大小: {remote_size} 字节")
-        except CommandError:
-            remote_size = 0
-            logger.warning("无法获取远程文件大小")
+        # 获取远程文件大小（服务器不支持SIZE时跳过，省去一次往返）
+        remote_size = 0
+        if self.supports('SIZE'):
+            try:
+                remote_size = self.size(remote_path)
+                logger.debug(f"远程文件大小: {remote_size} 字节")
+            except CommandError:
+                logger.warning("无法获取远程文件大小")
         
         # 处理断点续传
         local_size = 0
@@ -839,73 +1215,65 @@ class FTPClient(FTPProtocolMixin):
             
             logger.info(f"从位置 {local_size} 继续下载")
         
-        # 创建数据连接
-        data_sock = self._create_data_connection()
-        
         try:
-            # 如果是续传，发送断点命令
-            if resume and local_size > 0:
-                self._send_command(f"REST {local_size}")
-                response = self._read_response()
-                if self.last_response_code // 100 != self.POSITIVE_INTERMEDIATE:
-                    raise CommandError(f"设置断点续传失败: {response}")
-            
-            # 发送RETR命令
-            self._send_command(f"RETR {remote_path}")
-            response = self._read_response()
-            
-            if self.last_response_code != self.FILE_STATUS_OK:
-                data_sock.close()
-                raise CommandError(f"下载文件失败: {response}")
-            
-            # 接收数据
-            if self.connection_mode == ConnectionMode.ACTIVE:
-                # 主动模式需要接受连接
-                client_sock, _ = data_sock.accept()
-                data_sock.close()
-                data_sock = client_sock
+            # 建立数据连接并发送RETR命令，续传时先发送REST
+            data_sock = self._open_transfer(f"RETR {remote_path}",
+                                            rest=local_size if resume else 0)
             
-            # 打开本地文件进行写入
-            file_mode = "ab" if resume else "wb"
-            with open(local_path, file_mode) as f:
-                start_time = time.time()
-                bytes_received = 0
-                
-                # 接收数据
-                while True:
-                    try:
-                        # 带宽限制
-                        if self.token_bucket:
-                            wait_time = self.token_bucket.consume(8192)
-                            if wait_time > 0:
-                                time.sleep(wait_time)
-                        
-                        # 接收数据块
-                        chunk = data_sock.recv(8192)
-                        if not chunk:
-                            break
-                        
-                        f.write(chunk)
-                        bytes_received += len(chunk)
-                        
-                        # 传输进度回调
-                        elapsed = time.time() - start_time
-                        if self.transfer_progress_callback and elapsed > 0:
-                            total_size = remote_size if remote_size > 0 else bytes_received
-                            self.transfer_progress_callback(local_size + bytes_received, total_size, elapsed)
+            try:
+                # 打开本地文件进行写入
+                file_mode = "ab" if resume else "wb"
+                with open(local_path, file_mode) as f:
+                    start_time = time.monotonic()
+                    bytes_received = 0
+                    next_report_at = self.progress_report_bytes
+                    
+                    # 复用同一个缓冲区接收数据，避免每个数据块分配新对象
+                    buf = bytearray(self.upload_chunk_size)
+                    view = memoryview(buf)
+                    
+                    # 接收数据
+                    while True:
+                        try:
+                            # 带宽限制
+                            if self.token_bucket:
+                                wait_time = self.token_bucket.consume(self.upload_chunk_size)
+                                if wait_time > 0:
+                                    time.sleep(wait_time)
                             
-                    except socket.timeout:
-                        break
-            
-            # 关闭数据连接
-            data_sock.close()
+                            # 接收数据块
+                            n = data_sock.recv_into(buf)
+                            if not n:
+                                break
+                            
+                            f.write(view[:n])
+                            bytes_received += n
+                            
+                            # 传输进度回调（按字节间隔触发，避免每个数据块都调用）
+                            if bytes_received >= next_report_at:
+                                next_report_at = bytes_received + self.progress_report_bytes
+                                self._report_progress(local_size + bytes_received, remote_size, start_time)
+                                
+                        except socket.timeout:
+                            # 超时不能视为传输结束，否则会留下不完整的文件
+                            raise TimeoutError(f"数据连接接收超时 (>{self.data_timeout}秒)")
+                    
+                    # 报告最终进度
+                    self._report_progress(local_size + bytes_received, remote_size, start_time)
+                
+            finally:
+                # 服务器以数据连接关闭判断传输结束，读取完成响应前必须关闭
+                try:
+                    data_sock.close()
+                except OSError:
+                    pass
             
             # 读取传输完成响应
             response = self._read_response()
             if self.last_response_code != self.TRANSFER_COMPLETE:
                 raise CommandError(f"读取下载完成响应失败: {response}")
             
-            elapsed_time = time.time() - start_time
+            elapsed_time = time.monotonic() - start_time
             logger.info(f"文件 {remote_path} 下载成功，耗时: {elapsed_time:.2f}秒")
             
             # 验证文件完整性
@@ -916,11 +1284,6 @@ class FTPClient(FTPProtocolMixin):
             return True, local_size + bytes_received, elapsed_time
             
         except Exception as e:
-            if data_sock:
-                try:
-                    data_sock.close()
-                except Exception:
-                    pass
             logger.error(f"下载文件时发生错误: {str(e)}")
             raise FileTransferError(f"下载文件 {remote_path} 失败: {str(e)}")
     
@@ -958,7 +1321,10 @@ class FTPClient(FTPProtocolMixin):
         
         # 处理断点续传
         remote_size = 0
-        if resume:
+        if resume and not self.supports('SIZE'):
+            # 服务器不支持SIZE，无法确定已上传的部分，从头开始上传
+            logger.info("服务器不支持SIZE命令，从头开始上传")
+        elif resume:
             try:
                 remote_size = self.size(remote_path)
                 if remote_size >= local_size:
@@ -970,74 +1336,87 @@ class FTPClient(FTPProtocolMixin):
                 # 远程文件不存在，从头开始上传
                 remote_size = 0
         
-        # 创建数据连接
-        data_sock = self._create_data_connection()
-        
         try:
-            # 如果是续传，发送断点命令
-            if resume and remote_size > 0:
-                self._send_command(f"REST {remote_size}")
-                response = self._read_response()
-                if self.last_response_code // 100 != self.POSITIVE_INTERMEDIATE:
-                    raise CommandError(f"设置断点续传失败: {response}")
-            
-            # 发送STOR或APPE命令
+            # 建立数据连接并发送STOR命令，续传时先发送REST再使用APPE
             if resume and remote_size > 0:
-                self._send_command(f"APPE {remote_path}")
+                data_sock = self._open_transfer(f"APPE {remote_path}", rest=remote_size)
             else:
-                self._send_command(f"STOR {remote_path}")
-                
-            response = self._read_response()
-            
-            if self.last_response_code != self.FILE_STATUS_OK:
-                data_sock.close()
-                raise CommandError(f"上传文件失败: {response}")
+                data_sock = self._open_transfer(f"STOR {remote_path}")
             
-            # 接收数据
-            if self.connection_mode == ConnectionMode.ACTIVE:
-                # 主动模式需要接受连接
-                client_sock, _ = data_sock.accept()
-                data_sock.close()
-                data_sock = client_sock
-            
-            # 打开本地文件进行读取
-            with open(local_path, "rb") as f:
-                # 如果是断点续传，跳过已上传的部分
-                if resume and remote_size > 0:
-                    f.seek(remote_size)
-                
-                start_time = time.time()
-                bytes_sent = 0
-                
-                # 发送数据
-                while True:
-                    chunk = f.read(8192)
-                    if not chunk:
-                        break
+            try:
+                # 打开本地文件进行读取
+                with open(local_path, "rb") as f:
+                    # 如果是断点续传，跳过已上传的部分
+                    if resume and remote_size > 0:
+                        f.seek(remote_size)
                     
-                    # 带宽限制
-                    if self.token_bucket:
-                        wait_time = self.token_bucket.consume(len(chunk))
-                        if wait_time > 0:
-                            time.sleep(wait_time)
+                    start_time = time.monotonic()
+                    bytes_sent = 0
+                    next_report_at = self.progress_report_bytes
                     
-                    data_sock.sendall(chunk)
-                    bytes_sent += len(chunk)
+                    # 无带宽限制且非TLS连接时，使用sendfile零拷贝发送
+                    if self._can_use_sendfile(data_sock):
+                        bytes_sent = self._sendfile_upload(
+                            data_sock, f, remote_size, local_size - remote_size, start_time
+                        )
                     
-                    # 传输进度回调
-                    elapsed = time.time() - start_time
-                    if self.transfer_progress_callback and elapsed > 0:
-                        self.transfer_progress_callback(remote_size + bytes_sent, local_size, elapsed)
-            
-            # 关闭数据连接
-            data_sock.close()
+                    # 带宽限制时每次读取两个数据块，合并为一次令牌消费和一次sendmsg调用
+                    chunk_size = self.upload_chunk_size
+                    gather = self.token_bucket is not None and self._can_use_sendmsg(data_sock)
+                    
+                    # 复用同一个缓冲区读取文件，避免每个数据块分配新对象
+                    buf = bytearray(chunk_size * 2 if gather else chunk_size)
+                    view = memoryview(buf)
+                    
+                    # 发送数据（sendfile之后文件位置已前移，此处仅发送剩余部分）
+                    while True:
+                        n = f.readinto(view[:chunk_size])
+                        if not n:
+                            break
+                        
+                        parts = [view[:n]]
+                        if gather and n == chunk_size:
+                            n2 = f.readinto(view[chunk_size:])
+                            if n2:
+                                parts.append(view[chunk_size:chunk_size + n2])
+                                n += n2
+                        
+                        # 带宽限制
+                        if self.token_bucket:
+                            wait_time = self.token_bucket.consume(n)
+                            if wait_time > 0:
+                                time.sleep(wait_time)
+                        
+                        if len(parts) > 1:
+                            self._sendmsg_all(data_sock, parts)
+                        else:
+                            data_sock.sendall(parts[0])
+                        bytes_sent += n
+                        
+                        # 传输进度回调（按字节间隔触发，避免每个数据块都调用）
+                        if bytes_sent >= next_report_at:
+                            next_report_at = bytes_sent + self.progress_report_bytes
+                            self._report_progress(remote_size + bytes_sent, local_size, start_time)
+                    
+                    # 报告最终进度
+                    self._report_progress(remote_size + bytes_sent, local_size, start_time)
+                
+            finally:
+                # 服务器以数据连接关闭判断传输结束，读取完成响应前必须关闭
+                try:
+                    data_sock.close()
+                except OSError:
+                    pass
             
             # 读取传输完成响应
             response = self._read_response()
             if self.last_response_code != self.TRANSFER_COMPLETE:
                 raise CommandError(f"读取上传完成响应失败: {response}")
             
-            elapsed_time = time.time() - start_time
+            # 远程文件已改变，缓存的大小和修改时间不再有效
+            self.invalidate_metadata_cache(remote_path)
+            
+            elapsed_time = time.monotonic() - start_time
             logger.info(f"文件 {local_path} 上传成功，耗时: {elapsed_time:.2f}秒")
             
             # 验证文件完整性
@@ -1048,13 +1427,302 @@ class FTPClient(FTPProtocolMixin):
             return True, remote_size + bytes_sent, elapsed_time
             
         except Exception as e:
-            if data_sock:
+            self.invalidate_metadata_cache(remote_path)
+            logger.error(f"上传文件时发生错误: {str(e)}")
+            raise FileTransferError(f"上传文件 {local_path} 失败: {str(e)}")
+    
+    def _open_transfer(self, command, mode=None, rest=0):
+        """
+        建立数据连接并发送传输命令，同步和异步传输共用
+        
+        Args:
+            command (str): 传输命令，如"STOR path"或"RETR path"
+            mode (TransferMode, optional): 传输模式，None表示调用方已设置
+            rest (int): 断点续传的起始位置，大于0时先发送REST
+            
+        Returns:
+            socket.socket: 已就绪的数据套接字
+        """
+        if mode is not None:
+            self.set_transfer_mode(mode)
+        data_sock = self._create_data_connection()
+        
+        try:
+            # 如果是续传，发送断点命令
+            if rest > 0:
+                self._send_command(f"REST {rest}")
+                response = self._read_response()
+                if self.last_response_class != self.POSITIVE_INTERMEDIATE:
+                    raise CommandError(f"设置断点续传失败: {response}")
+            
+            self._send_command(command)
+            response = self._read_response()
+            if self.last_response_code != self.FILE_STATUS_OK:
+                raise CommandError(f"传输命令失败: {response}")
+                
+            if self.connection_mode == ConnectionMode.ACTIVE:
+                # 主动模式需要接受连接，监听套接字随即关闭
+                data_sock = self._accept_data_connection(data_sock)
+        except Exception:
+            data_sock.close()
+            raise
+            
+        return data_sock
+
+    async def async_upload(self, local_path, remote_path, mode=None):
+        """
+        异步上传文件
+        
+        数据连接由事件循环驱动，本地文件在线程池中读取，读取下一块与发送当前块重叠进行。
+        控制连接仍为阻塞套接字，因此同一客户端同一时间只能进行一个传输，
+        并发传输多个文件时使用async_batch_transfer。
+        
+        Args:
+            local_path (str): 本地文件路径
+            remote_path (str): 远程保存路径
+            mode (TransferMode, optional): 传输模式，None时自动检测
+            
+        Returns:
+            tuple: (成功状态, 文件大小, 传输时间)
+        """
+        if not self.logged_in:
+            raise AuthenticationError("未登录FTP服务器")
+            
+        if not os.path.exists(local_path):
+            raise FileNotFoundError(f"本地文件不存在: {local_path}")
+            
+        loop = asyncio.get_running_loop()
+        local_size = os.path.getsize(local_path)
+        
+        if mode is None:
+            mode = TransferMode.BINARY if self.is_binary_file(local_path) else TransferMode.ASCII
+            
+        # TLS套接字不支持事件循环的非阻塞收发，退回同步实现
+        if self.enable_ssl:
+            return await loop.run_in_executor(None, self.upload, local_path, remote_path, mode)
+            
+        try:
+            data_sock = await loop.run_in_executor(None, self._open_transfer, f"STOR {remote_path}", mode)
+            
+            try:
+                data_sock.setblocking(False)
+                start_time = time.monotonic()
+                bytes_sent = 0
+                next_report_at = self.progress_report_bytes
+                
+                with open(local_path, "rb") as f:
+                    pending_read = loop.run_in_executor(None, f.read, self.upload_chunk_size)
+                    try:
+                        while True:
+                            chunk = await pending_read
+                            pending_read = None
+                            if not chunk:
+                                break
+                                
+                            # 发送当前数据块的同时读取下一块
+                            pending_read = loop.run_in_executor(None, f.read, self.upload_chunk_size)
+                            
+                            # 带宽限制
+                            if self.token_bucket:
+                                wait_time = self.token_bucket.consume(len(chunk))
+                                if wait_time > 0:
+                                    await asyncio.sleep(wait_time)
+                                    
+                            await loop.sock_sendall(data_sock, chunk)
+                            bytes_sent += len(chunk)
+                            
+                            if bytes_sent >= next_report_at:
+                                next_report_at = bytes_sent + self.progress_report_bytes
+                                self._report_progress(bytes_sent, local_size, start_time)
+                    finally:
+                        # 关闭文件前等待尚未完成的读取
+                        if pending_read is not None:
+                            await asyncio.wait([pending_read])
+                            
+                self._report_progress(bytes_sent, local_size, start_time)
+            finally:
+                data_sock.close()
+                
+            # 读取传输完成响应
+            response = await loop.run_in_executor(None, self._read_response)
+            if self.last_response_code != self.TRANSFER_COMPLETE:
+                raise CommandError(f"读取上传完成响应失败: {response}")
+                
+            self.invalidate_metadata_cache(remote_path)
+            elapsed_time = time.monotonic() - start_time
+            logger.info(f"文件 {local_path} 异步上传成功，耗时: {elapsed_time:.2f}秒")
+            return True, bytes_sent, elapsed_time
+            
+        except Exception as e:
+            self.invalidate_metadata_cache(remote_path)
+            logger.error(f"异步上传文件时发生错误: {str(e)}")
+            raise FileTransferError(f"上传文件 {local_path} 失败: {str(e)}")
+
+    async def async_download(self, remote_path, local_path, mode=None):
+        """
+        异步下载文件
+        
+        数据连接由事件循环驱动，本地文件在线程池中写入，写入当前块与接收下一块重叠进行。
+        同一客户端同一时间只能进行一个传输。
+        
+        Args:
+            remote_path (str): 远程文件路径
+            local_path (str): 本地保存路径
+            mode (TransferMode, optional): 传输模式，None时自动检测
+            
+        Returns:
+            tuple: (成功状态, 文件大小, 传输时间)
+        """
+        if not self.logged_in:
+            raise AuthenticationError("未登录FTP服务器")
+            
+        loop = asyncio.get_running_loop()
+        
+        if mode is None:
+            mode = TransferMode.BINARY if self.is_binary_file(remote_path) else TransferMode.ASCII
+            
+        # TLS套接字不支持事件循环的非阻塞收发，退回同步实现
+        if self.enable_ssl:
+            return await loop.run_in_executor(None, self.download, remote_path, local_path, mode)
+            
+        local_path = os.path.abspath(local_path)
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
+        
+        try:
+            remote_size = 0
+            if await loop.run_in_executor(None, self.supports, 'SIZE'):
                 try:
-                    data_sock.close()
+                    remote_size = await loop.run_in_executor(None, self.size, remote_path)
+                except CommandError:
+                    pass
+                
+            data_sock = await loop.run_in_executor(None, self._open_transfer, f"RETR {remote_path}", mode)
+            
+            try:
+                data_sock.setblocking(False)
+                start_time = time.monotonic()
+                bytes_received = 0
+                next_report_at = self.progress_report_bytes
+                
+                with open(local_path, "wb") as f:
+                    pending_write = None
+                    try:
+                        while True:
+                            # 带宽限制
+                            if self.token_bucket:
+                                wait_time = self.token_bucket.consume(self.upload_chunk_size)
+                                if wait_time > 0:
+                                    await asyncio.sleep(wait_time)
+                                    
+                            chunk = await loop.sock_recv(data_sock, self.upload_chunk_size)
+                            
+                            # 上一块写入完成后再提交当前块，保证写入顺序
+                            if pending_write is not None:
+                                await pending_write
+                                pending_write = None
+                            if not chunk:
+                                break
+                                
+                            pending_write = loop.run_in_executor(None, f.write, chunk)
+                            bytes_received += len(chunk)
+                            
+                            if bytes_received >= next_report_at:
+                                next_report_at = bytes_received + self.progress_report_bytes
+                                self._report_progress(bytes_received, remote_size, start_time)
+                    finally:
+                        # 关闭文件前等待尚未完成的写入
+                        if pending_write is not None:
+                            await asyncio.wait([pending_write])
+                            
+                self._report_progress(bytes_received, remote_size, start_time)
+            finally:
+                data_sock.close()
+                
+            # 读取传输完成响应
+            response = await loop.run_in_executor(None, self._read_response)
+            if self.last_response_code != self.TRANSFER_COMPLETE:
+                raise CommandError(f"读取下载完成响应失败: {response}")
+                
+            elapsed_time = time.monotonic() - start_time
+            logger.info(f"文件 {remote_path} 异步下载成功，耗时: {elapsed_time:.2f}秒")
+            return True, bytes_received, elapsed_time
+            
+        except Exception as e:
+            logger.error(f"异步下载文件时发生错误: {str(e)}")
+            raise FileTransferError(f"下载文件 {remote_path} 失败: {str(e)}")
+    
+    def _spawn_worker_client(self):
+        """
+        使用当前客户端的登录信息和传输设置建立一条新的控制连接
+        
+        Returns:
+            FTPClient: 已登录的FTP客户端
+        """
+        client = FTPClient(self.host, self.port, timeout=self.timeout, enable_ssl=self.enable_ssl,
+                           upload_chunk_size=self.upload_chunk_size)
+        client.connect()
+        client.login(self.username, self._password)
+        client.connection_mode = self.connection_mode
+        if self.bandwidth_limit:
+            client.set_bandwidth_limit(self.bandwidth_limit)
+        return client
+    
+    async def async_batch_transfer(self, jobs, upload=True, concurrency=4):
+        """
+        使用多条控制连接并发执行一批异步传输
+        
+        每条连接同一时间只能进行一个传输，因此建立最多concurrency条连接，
+        各自依次取出剩余任务执行，连接之间通过asyncio.gather并发。
+        
+        Args:
+            jobs (list): [(源路径, 目标路径), ...]
+            upload (bool): True为上传，False为下载
+            concurrency (int): 并发连接数
+            
+        Returns:
+            dict: 传输结果统计 {"total", "success", "failed", "errors"}
+        """
+        if not self.logged_in:
+            raise AuthenticationError("未登录FTP服务器")
+            
+        loop = asyncio.get_running_loop()
+        results = {"total": len(jobs), "success": 0, "failed": 0, "errors": []}
+        pending = deque(jobs)
+        
+        async def worker():
+            try:
+                client = await loop.run_in_executor(None, self._spawn_worker_client)
+            except Exception as e:
+                # 剩余任务由其他连接处理
+                logger.warning(f"建立并行传输连接失败: {str(e)}")
+                return
+                
+            transfer = client.async_upload if upload else client.async_download
+            try:
+                # 所有协程运行在同一个事件循环线程中，更新结果无需加锁
+                while pending:
+                    src, dst = pending.popleft()
+                    try:
+                        await transfer(src, dst)
+                        results["success"] += 1
+                    except Exception as e:
+                        results["failed"] += 1
+                        results["errors"].append(f"{src}: {str(e)}")
+            finally:
+                try:
+                    await loop.run_in_executor(None, client.quit)
                 except Exception:
                     pass
-            logger.error(f"上传文件时发生错误: {str(e)}")
-            raise FileTransferError(f"上传文件 {local_path} 失败: {str(e)}")
+        
+        logger.info(f"异步并行传输: {len(jobs)} 个文件，{concurrency} 个连接")
+        await asyncio.gather(*(worker() for _ in range(min(concurrency, len(jobs)))))
+        
+        # 所有连接都建立失败时，未执行的任务计为失败
+        while pending:
+            src, _ = pending.popleft()
+            results["failed"] += 1
+            results["errors"].append(f"{src}: 无可用的传输连接")
+        return results
     
     @ftp_command
     def delete(self, remote_path):
@@ -1070,9 +1738,10 @@ class FTPClient(FTPProtocolMixin):
         self._send_command(f"DELE {remote_path}")
         response = self._read_response()
         
-        if self.last_response_code // 100 != self.POSITIVE_COMPLETION:
+        if self.last_response_class != self.POSITIVE_COMPLETION:
             raise CommandError(f"删除文件失败: {response}")
             
+        self.invalidate_metadata_cache(remote_path)
         logger.info(f"文件 {remote_path} 已删除")
         return True
     
@@ -1088,20 +1757,32 @@ class FTPClient(FTPProtocolMixin):
         Returns:
             bool: 成功返回True
         """
-        # 发送RNFR命令
-        self._send_command(f"RNFR {from_path}")
-        response = self._read_response()
-        
-        if self.last_response_code // 100 != self.POSITIVE_INTERMEDIATE:
-            raise CommandError(f"重命名文件失败: {response}")
-        
-        # 发送RNTO命令
-        self._send_command(f"RNTO {to_path}")
-        response = self._read_response()
-        
-        if self.last_response_code // 100 != self.POSITIVE_COMPLETION:
-            raise CommandError(f"重命名文件失败: {response}")
+        if self.pipelining_enabled:
+            # RNFR和RNTO一次发送，只需一个往返
+            (rnfr_code, response), (rnto_code, rnto_response) = self._send_commands_pipeline(
+                [f"RNFR {from_path}", f"RNTO {to_path}"]
+            )
+            if rnfr_code // 100 != self.POSITIVE_INTERMEDIATE:
+                raise CommandError(f"重命名文件失败: {response}")
+            if rnto_code // 100 != self.POSITIVE_COMPLETION:
+                raise CommandError(f"重命名文件失败: {rnto_response}")
+        else:
+            # 发送RNFR命令
+            self._send_command(f"RNFR {from_path}")
+            response = self._read_response()
             
+            if self.last_response_class != self.POSITIVE_INTERMEDIATE:
+                raise CommandError(f"重命名文件失败: {response}")
+            
+            # 发送RNTO命令
+            self._send_command(f"RNTO {to_path}")
+            response = self._read_response()
+            
+            if self.last_response_class != self.POSITIVE_COMPLETION:
+                raise CommandError(f"重命名文件失败: {response}")
+            
+        self.invalidate_metadata_cache(from_path)
+        self.invalidate_metadata_cache(to_path)
         logger.info(f"文件 {from_path} 已重命名为 {to_path}")
         return True
     
@@ -1116,18 +1797,25 @@ class FTPClient(FTPProtocolMixin):
         Returns:
             int: 文件大小（字节）
         """
+        cache_key = self._metadata_cache_key(remote_path)
+        cached = self._get_cached_metadata(self._size_cache, cache_key)
+        if cached is not None:
+            return cached
+            
         self._send_command(f"SIZE {remote_path}")
         response = self._read_response()
         
-        if self.last_response_code // 100 != self.POSITIVE_COMPLETION:
+        if self.last_response_class != self.POSITIVE_COMPLETION:
             raise CommandError(f"获取文件大小失败: {response}")
             
         # 解析文件大小
         try:
             size = int(response.split()[1])
-            return size
         except (IndexError, ValueError):
             raise CommandError(f"无法解析文件大小: {response}")
+            
+        self._size_cache[cache_key] = (size, time.monotonic())
+        return size
     
     @ftp_command
     def mdtm(self, remote_path):
@@ -1140,12 +1828,15 @@ class FTPClient(FTPProtocolMixin):
         Returns:
             datetime: 文件修改时间
         """
-        from datetime import datetime
-        
+        cache_key = self._metadata_cache_key(remote_path)
+        cached = self._get_cached_metadata(self._mdtm_cache, cache_key)
+        if cached is not None:
+            return cached
+            
         self._send_command(f"MDTM {remote_path}")
         response = self._read_response()
         
-        if self.last_response_code // 100 != self.POSITIVE_COMPLETION:
+        if self.last_response_class != self.POSITIVE_COMPLETION:
             raise CommandError(f"获取文件修改时间失败: {response}")
             
         # 解析修改时间
@@ -1153,9 +1844,62 @@ class FTPClient(FTPProtocolMixin):
             time_str = response.split()[1]
             # 典型格式：YYYYMMDDhhmmss
             dt = datetime.strptime(time_str, "%Y%m%d%H%M%S")
-            return dt
         except (IndexError, ValueError) as e:
             raise CommandError(f"无法解析文件修改时间: {response}, {str(e)}")
+            
+        self._mdtm_cache[cache_key] = (dt, time.monotonic())
+        return dt
+    
+    def _metadata_cache_key(self, remote_path):
+        """
+        生成元数据缓存键，相对路径需要结合当前工作目录区分
+        
+        Args:
+            remote_path (str): 远程文件路径
+            
+        Returns:
+            tuple: 缓存键
+        """
+        if remote_path.startswith('/'):
+            return (None, remote_path)
+        return (self.working_directory, remote_path)
+    
+    def _get_cached_metadata(self, cache, cache_key):
+        """
+        读取未过期的缓存值
+        
+        Args:
+            cache (dict): 缓存字典
+            cache_key (tuple): 缓存键
+            
+        Returns:
+            缓存的值，不存在或已过期时返回None
+        """
+        entry = cache.get(cache_key)
+        if entry is None:
+            return None
+            
+        value, cached_at = entry
+        if time.monotonic() - cached_at > self.metadata_cache_ttl:
+            cache.pop(cache_key, None)
+            return None
+        return value
+    
+    def invalidate_metadata_cache(self, remote_path=None):
+        """
+        使SIZE/MDTM缓存失效
+        
+        Args:
+            remote_path (str, optional): 远程文件路径，None表示清空全部缓存
+        """
+        if remote_path is None:
+            self._size_cache.clear()
+            self._mdtm_cache.clear()
+            return
+            
+        cache_key = self._metadata_cache_key(remote_path)
+        self._size_cache.pop(cache_key, None)
+        self._mdtm_cache.pop(cache_key, None)
     
     def verify_connection(self):
         """
@@ -1242,10 +1986,10 @@ class FTPClient(FTPProtocolMixin):
                     if not name:
                         continue
                         
-                    is_dir = item.get('is_dir', False)
+                    is_dir = item.get('type') == 'dir'
                     
                     # 构建完整路径
-                    item_path = f"{current_path}/{name}" if current_path else name
+                    item_path = posixpath.join(current_path or "", name)
                     
                     if is_dir:
                         # 递归处理子目录
@@ -1264,33 +2008,67 @@ class FTPClient(FTPProtocolMixin):
             
         return _get_tree(path, 1)
 
-    def batch_upload(self, local_dir, remote_dir=None, pattern="*", recursive=True):
+    def _make_dirs(self, directory):
+        """
+        逐级创建远程目录，已存在的目录忽略
+        
+        Args:
+            directory (str): 远程目录
+        """
+        try:
+            self.mkd(directory)
+            return
+        except CommandError:
+            pass
+            
+        # 父目录可能不存在，先创建父目录再重试
+        parent = posixpath.dirname(directory.rstrip('/'))
+        if parent and parent not in ('/', directory):
+            self._make_dirs(parent)
+            try:
+                self.mkd(directory)
+            except CommandError:
+                pass  # 目录已存在
+
+    def _upload_creating_dirs(self, local_path, remote_path):
+        """
+        按完整路径上传文件，目标目录不存在（服务器返回550）时创建目录后重试一次
+        
+        Args:
+            local_path (str): 本地文件路径
+            remote_path (str): 远程文件路径
+            
+        Returns:
+            tuple: (成功状态, 文件大小, 传输时间)
+        """
+        try:
+            return self.upload(local_path, remote_path)
+        except FileTransferError:
+            parent = posixpath.dirname(remote_path)
+            if self.last_response_code != self.FILE_UNAVAILABLE or not parent or not self.connected:
+                raise
+                
+        self._make_dirs(parent)
+        return self.upload(local_path, remote_path)
+
+    def batch_upload(self, local_dir, remote_dir=None, pattern="*", recursive=True, concurrency=1):
         """
         批量上传文件
         
+        文件按完整路径上传，不切换工作目录；远程目录在首次上传失败时按需创建。
+        
         Args:
             local_dir (str): 本地目录
             remote_dir (str, optional): 远程目录，默认为当前目录
             pattern (str): 文件匹配模式
             recursive (bool): 是否递归处理子目录
+            concurrency (int): 并行传输的连接数，为1时在当前连接上顺序传输
             
         Returns:
             dict: 上传结果统计
         """
         if not os.path.exists(local_dir):
             raise FileNotFoundError(f"本地目录不存在: {local_dir}")
-            
-        if remote_dir:
-            # 确保远程目录存在
-            try:
-                self.cwd(remote_dir)
-            except CommandError:
-                # 尝试创建远程目录
-                try:
-                    self.mkd(remote_dir)
-                    self.cwd(remote_dir)
-                except CommandError as e:
-                    raise CommandError(f"无法创建或切换到远程目录: {str(e)}")
         
         results = {
             "total": 0,
@@ -1300,82 +2078,85 @@ class FTPClient(FTPProtocolMixin):
             "errors": []
         }
         
+        match_name = self._compile_pattern(pattern)
+        
+        if concurrency > 1:
+            # 并行连接登录后位于各自的初始目录，需要使用绝对路径
+            base_dir = posixpath.join(self.pwd(), remote_dir or "")
+            jobs = self._collect_upload_jobs(local_dir, base_dir, match_name, recursive, results)
+            if not jobs and remote_dir:
+                self._make_dirs(base_dir)
+            self._run_parallel_transfers("_upload_creating_dirs", jobs, concurrency, results)
+            return results
+        
         def _process_dir(local_path, remote_path):
-            # 处理当前目录下的文件
-            for item in os.listdir(local_path):
-                local_item_path = os.path.join(local_path, item)
+            """处理一个本地目录，返回是否在远程创建了内容"""
+            created = False
+            
+            # 处理当前目录下的文件，DirEntry缓存了文件类型，无需额外stat
+            with os.scandir(local_path) as entries:
+                entries = [entry for entry in entries if not entry.name.startswith('.')]
                 
-                # 跳过隐藏文件
-                if item.startswith('.'):
-                    continue
-                    
-                if os.path.isfile(local_item_path):
+            for entry in entries:
+                item = entry.name
+                local_item_path = entry.path
+                
+                if entry.is_file(follow_symlinks=False):
                     # 检查是否匹配模式
-                    if not fnmatch.fnmatch(item, pattern):
+                    if match_name(item) is None:
                         results["skipped"] += 1
                         continue
                         
                     # 构建远程路径
-                    remote_item_path = f"{remote_path}/{item}" if remote_path else item
+                    remote_item_path = posixpath.join(remote_path or "", item)
                     
                     # 上传文件
                     results["total"] += 1
                     try:
-                        self.upload(local_item_path, remote_item_path)
+                        self._upload_creating_dirs(local_item_path, remote_item_path)
                         results["success"] += 1
+                        created = True
                     except Exception as e:
                         results["failed"] += 1
                         results["errors"].append(f"{local_item_path}: {str(e)}")
                         
-                elif os.path.isdir(local_item_path) and recursive:
+                elif entry.is_dir(follow_symlinks=False) and recursive:
                     # 处理子目录
-                    remote_subdir = f"{remote_path}/{item}" if remote_path else item
-                    
-                    # 确保远程子目录存在
+                    remote_subdir = posixpath.join(remote_path or "", item)
                     try:
-                        try:
-                            self.cwd(remote_subdir)
-                        except CommandError:
-                            self.mkd(remote_subdir)
-                            self.cwd(remote_subdir)
-                            
-                        # 递归处理子目录
-                        _process_dir(local_item_path, remote_subdir)
-                        
-                        # 返回上一级目录
-                        self.cdup()
+                        if not _process_dir(local_item_path, remote_subdir):
+                            # 空目录没有文件触发创建，直接创建
+                            self._make_dirs(remote_subdir)
+                        created = True
                     except CommandError as e:
                         results["errors"].append(f"{remote_subdir}: {str(e)}")
+                        
+            return created
         
         # 开始处理
-        _process_dir(local_dir, remote_dir)
+        if not _process_dir(local_dir, remote_dir) and remote_dir:
+            self._make_dirs(remote_dir)
         return results
 
-    def batch_download(self, remote_dir, local_dir, pattern="*", recursive=True):
+    def batch_download(self, remote_dir, local_dir, pattern="*", recursive=True, concurrency=1):
         """
         批量下载文件
         
+        目录按路径列出、文件按完整路径下载，不切换工作目录。
+        
         Args:
             remote_dir (str): 远程目录
             local_dir (str): 本地目录
             pattern (str): 文件匹配模式
             recursive (bool): 是否递归处理子目录
+            concurrency (int): 并行传输的连接数，为1时在当前连接上顺序传输
             
         Returns:
             dict: 下载结果统计
         """
-        import fnmatch
-        
         # 确保本地目录存在
         os.makedirs(local_dir, exist_ok=True)
-        
-        if remote_dir:
-            # 切换到远程目录
-            try:
-                original_dir = self.pwd()
-                self.cwd(remote_dir)
-            except CommandError as e:
-                raise CommandError(f"无法切换到远程目录: {str(e)}")
+        match_name = self._compile_pattern(pattern)
         
         results = {
             "total": 0,
@@ -1385,11 +2166,20 @@ class FTPClient(FTPProtocolMixin):
             "errors": []
         }
         
+        if concurrency > 1:
+            # 并行连接登录后位于各自的初始目录，需要使用绝对路径
+            base_dir = posixpath.join(self.pwd(), remote_dir or "")
+            jobs = self._collect_download_jobs(base_dir, local_dir, match_name, recursive, results)
+            self._run_parallel_transfers("download", jobs, concurrency, results)
+            return results
+        
         def _process_remote_dir(current_remote_dir, current_local_dir):
             # 列出远程目录内容
             try:
-                items = self.list()
+                items = self.list(current_remote_dir or None)
             except CommandError as e:
+                if current_remote_dir == remote_dir:
+                    raise CommandError(f"无法列出远程目录: {str(e)}")
                 results["errors"].append(f"{current_remote_dir}: {str(e)}")
                 return
                 
@@ -1400,11 +2190,11 @@ class FTPClient(FTPProtocolMixin):
                 if name in ('.', '..'):
                     continue
                     
-                is_dir = item.get('is_dir', False)
+                remote_item_path = posixpath.join(current_remote_dir or "", name)
                 
-                if not is_dir:
+                if item.get('type') != 'dir':
                     # 处理文件
-                    if not fnmatch.fnmatch(name, pattern):
+                    if match_name(name) is None:
                         results["skipped"] += 1
                         continue
                         
@@ -1412,36 +2202,184 @@ class FTPClient(FTPProtocolMixin):
                     local_file_path = os.path.join(current_local_dir, name)
                     
                     try:
-                        self.download(name, local_file_path)
+                        self.download(remote_item_path, local_file_path)
                         results["success"] += 1
                     except Exception as e:
                         results["failed"] += 1
-                        results["errors"].append(f"{name}: {str(e)}")
+                        results["errors"].append(f"{remote_item_path}: {str(e)}")
                         
                 elif recursive:
                     # 处理子目录
                     local_subdir = os.path.join(current_local_dir, name)
                     os.makedirs(local_subdir, exist_ok=True)
-                    
-                    # 切换到子目录
-                    try:
-                        self.cwd(name)
-                        _process_remote_dir(f"{current_remote_dir}/{name}", local_subdir)
-                        self.cdup()  # 返回上一级目录
-                    except CommandError as e:
-                        results["errors"].append(f"{name}: {str(e)}")
+                    _process_remote_dir(remote_item_path, local_subdir)
         
         # 开始处理
         _process_remote_dir(remote_dir, local_dir)
+        return results
+
+    @staticmethod
+    def _compile_pattern(pattern):
+        """
+        预编译文件匹配模式，避免对每个文件名重复解析通配符
         
-        # 返回到原始目录
-        if remote_dir:
-            try:
-                self.cwd(original_dir)
-            except CommandError:
-                pass
+        Args:
+            pattern (str): 文件匹配模式
+            
+        Returns:
+            callable: 匹配函数，匹配成功时返回非None
+        """
+        # 与fnmatch.fnmatch一致，Windows下不区分大小写
+        flags = re.IGNORECASE if os.name == 'nt' else 0
+        return re.compile(fnmatch.translate(pattern), flags).match
+
+    def _collect_upload_jobs(self, local_dir, remote_dir, match_name, recursive, results):
+        """
+        遍历本地目录，收集待上传的文件；远程目录在上传时按需创建，空目录在此直接创建
+        
+        Args:
+            local_dir (str): 本地目录
+            remote_dir (str): 远程目录（绝对路径）
+            match_name (callable): 预编译的文件名匹配函数
+            recursive (bool): 是否递归处理子目录
+            results (dict): 结果统计，记录跳过的文件和错误
+            
+        Returns:
+            list: [(本地路径, 远程路径), ...]
+        """
+        jobs = []
+        with os.scandir(local_dir) as entries:
+            # 跳过隐藏文件
+            entries = [entry for entry in entries if not entry.name.startswith('.')]
+            
+        for entry in entries:
+            local_item_path = entry.path
+            remote_item_path = posixpath.join(remote_dir, entry.name)
+            
+            if entry.is_file(follow_symlinks=False):
+                if match_name(entry.name) is None:
+                    results["skipped"] += 1
+                    continue
+                jobs.append((local_item_path, remote_item_path))
                 
-        return results
+            elif entry.is_dir(follow_symlinks=False) and recursive:
+                sub_jobs = self._collect_upload_jobs(local_item_path, remote_item_path,
+                                                     match_name, recursive, results)
+                if not sub_jobs:
+                    self._make_dirs(remote_item_path)
+                jobs.extend(sub_jobs)
+        return jobs
+
+    def _collect_download_jobs(self, remote_dir, local_dir, match_name, recursive, results):
+        """
+        遍历远程目录，收集待下载的文件并预先创建本地子目录
+        
+        Args:
+            remote_dir (str): 远程目录（绝对路径）
+            local_dir (str): 本地目录
+            match_name (callable): 预编译的文件名匹配函数
+            recursive (bool): 是否递归处理子目录
+            results (dict): 结果统计，记录跳过的文件和错误
+            
+        Returns:
+            list: [(远程路径, 本地路径), ...]
+        """
+        try:
+            items = self.list(remote_dir)
+        except CommandError as e:
+            results["errors"].append(f"{remote_dir}: {str(e)}")
+            return []
+            
+        jobs = []
+        for item in items:
+            name = item.get('name')
+            # 跳过当前目录和父目录
+            if name in ('.', '..'):
+                continue
+                
+            remote_item_path = posixpath.join(remote_dir, name)
+            local_item_path = os.path.join(local_dir, name)
+            
+            if item.get('type') != 'dir':
+                if match_name(name) is None:
+                    results["skipped"] += 1
+                    continue
+                jobs.append((remote_item_path, local_item_path))
+                
+            elif recursive:
+                os.makedirs(local_item_path, exist_ok=True)
+                jobs.extend(self._collect_download_jobs(remote_item_path, local_item_path,
+                                                        match_name, recursive, results))
+        return jobs
+
+    def _run_parallel_transfers(self, method, jobs, concurrency, results):
+        """
+        通过连接池并行执行一批传输任务
+        
+        Args:
+            method (str): 传输方法名，"_upload_creating_dirs" 或 "download"
+            jobs (list): [(源路径, 目标路径), ...]
+            concurrency (int): 并行连接数
+            results (dict): 结果统计，由工作线程在锁保护下更新
+        """
+        pool = FTPConnectionPool(self.host, self.port, max_connections=concurrency)
+        results_lock = threading.Lock()
+        
+        def _acquire():
+            # 连接数已满时排队等待其他工作线程移交连接
+            client = pool.get_connection(wait_timeout=self.timeout, timeout=self.timeout,
+                                         enable_ssl=self.enable_ssl,
+                                         upload_chunk_size=self.upload_chunk_size)
+            if client is None:
+                raise ConnectionError("等待连接池中的空闲连接超时")
+            try:
+                if not client.logged_in:
+                    client.login(self.username, self._password)
+                client.connection_mode = self.connection_mode
+                if self.bandwidth_limit:
+                    client.set_bandwidth_limit(self.bandwidth_limit)
+            except BaseException:
+                # 登录失败的连接不放回池中，丢弃以释放其名额
+                pool.discard_connection(client)
+                raise
+            return client
+        
+        def _transfer_one(src, dst):
+            client = None
+            try:
+                client = _acquire()
+                try:
+                    getattr(client, method)(src, dst)
+                except FTPError:
+                    if client.connected:
+                        raise
+                    # 复用的连接可能已被服务器关闭，换一个新连接重试一次
+                    pool.discard_connection(client)
+                    client = None
+                    client = _acquire()
+                    getattr(client, method)(src, dst)
+                # 只有成功的连接才放回池中
+                pool.release_connection(client)
+                client = None
+                with results_lock:
+                    results["success"] += 1
+            except Exception as e:
+                with results_lock:
+                    results["failed"] += 1
+                    results["errors"].append(f"{src}: {str(e)}")
+            finally:
+                # 传输失败的连接上可能还有未读取的应答，不能交给下一个任务复用
+                if client:
+                    pool.discard_connection(client)
+        
+        results["total"] += len(jobs)
+        logger.info(f"并行传输({method}): {len(jobs)} 个文件，{concurrency} 个连接")
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                for src, dst in jobs:
+                    executor.submit(_transfer_one, src, dst)
+        finally:
+            pool.close_all()
 
 
 class FTPConnectionPool:
@@ -1463,123 +2401,171 @@ class FTPConnectionPool:
         self.idle_timeout = idle_timeout
         
         # 连接池
-        self.pool = []  # [(client, last_used_time), ...]
+        self.pool = deque()  # [(client, last_used_time), ...]，按释放时间从旧到新排列
         self.active_connections = 0
-        self.lock = threading.RLock()
+        self.lock = threading.Lock()
+        self._waiters = deque()  # 等待连接的请求(Future)，释放的连接按先进先出直接移交
         
         # 统计信息
         self.total_connections_created = 0
         self.total_connections_reused = 0
         self.total_connections_closed = 0
         self.connection_failures = 0
-        
-        # 启动连接验证定时器
-        self.validation_timer = None
-        self._start_validation_timer()
     
-    def _start_validation_timer(self):
-        """启动定期验证连接的定时器"""
-        if self.validation_timer:
-            self.validation_timer.cancel()
+    def _pop_expired(self):
+        """
+        从池中取出空闲超时的连接，调用方需持有锁
+        
+        池按释放时间排序，遇到未超时的连接即停止扫描。
+        
+        Returns:
+            list: 超时的FTP客户端
+        """
+        current_time = time.monotonic()
+        expired = []
+        
+        while self.pool:
+            client, last_used_time = self.pool[0]
+            if current_time - last_used_time <= self.idle_timeout:
+                break
+            self.pool.popleft()
+            expired.append(client)
             
-        # 创建一个定时器，每隔一段时间检查连接是否有效
-        self.validation_timer = threading.Timer(
-            self.idle_timeout / 2,  # 每隔超时时间的一半检查一次
-            self._validate_connections
-        )
-        self.validation_timer.daemon = True  # 设置为守护线程
-        self.validation_timer.start()
+        self.total_connections_closed += len(expired)
+        return expired
     
-    def _validate_connections(self):
-        """验证池中所有连接的有效性，关闭无效或超时的连接"""
+    @staticmethod
+    def _close_clients(clients):
+        """
+        关闭一组连接，在锁外调用以免网络I/O阻塞其他线程
+        
+        Args:
+            clients (list): 要关闭的FTP客户端
+        """
+        for client in clients:
+            logger.debug(f"关闭空闲连接: {client.host}:{client.port}")
+            try:
+                client.quit()
+            except:
+                pass
+    
+    def prune(self):
+        """
+        关闭池中空闲超时的连接
+        
+        Returns:
+            int: 关闭的连接数
+        """
         with self.lock:
-            current_time = time.time()
-            valid_connections = []
-            
-            for client, last_used_time in self.pool:
-                # 检查连接是否超时
-                if current_time - last_used_time > self.idle_timeout:
-                    logger.debug(f"关闭空闲连接: {client.host}:{client.port}")
-                    try:
-                        client.quit()
-                    except:
-                        pass
-                    self.total_connections_closed += 1
-                    continue
-                
-                # 验证连接是否还有效
-                if not client.verify_connection():
-                    logger.debug(f"关闭无效连接: {client.host}:{client.port}")
-                    try:
-                        client.quit()
-                    except:
-                        pass
-                    self.total_connections_closed += 1
-                    continue
-                
-                # 连接仍然有效
-                valid_connections.append((client, last_used_time))
-            
-            # 更新池
-            self.pool = valid_connections
+            expired = self._pop_expired()
+        self._close_clients(expired)
+        return len(expired)
+    
+    def _hand_off(self, client):
+        """
+        将释放的连接直接移交给最早的等待者，调用方需持有锁
+        
+        移交时连接保持活动状态，active_connections不变。
+        
+        Args:
+            client (FTPClient): 释放的连接，None表示移交一个新建连接的名额
             
-        # 重新启动定时器
-        self._start_validation_timer()
+        Returns:
+            bool: 是否已移交
+        """
+        if not self._waiters:
+            return False
+        self._waiters.popleft().set_result(client)
+        if client is not None:
+            self.total_connections_reused += 1
+        return True
     
-    def get_connection(self, username=None, password=None, **kwargs):
+    def get_connection(self, username=None, password=None, wait_timeout=None, **kwargs):
         """
         从连接池获取一个连接，如果池中没有可用连接则创建新连接
         
         Args:
             username (str): 用户名
             password (str): 密码
+            wait_timeout (float): 达到最大连接数时等待其他线程释放连接的时间(秒)，
+                None表示不等待
             **kwargs: 传递给FTPClient构造函数的其他参数
             
         Returns:
-            FTPClient: FTP客户端实例
+            FTPClient: FTP客户端实例，达到最大连接数且等待超时时返回None
         """
+        client = None
+        at_capacity = False
+        waiter = None
         with self.lock:
-            # 首先尝试从池中获取空闲连接
-            while self.pool:
-                client, last_used_time = self.pool.pop()
-                
-                # 验证连接是否有效
-                if client.verify_connection():
-                    self.active_connections += 1
-                    self.total_connections_reused += 1
-                    logger.debug(f"复用连接: {client.host}:{client.port}")
-                    return client
+            # 先取出空闲超时的连接，再直接复用池中的空闲连接，不发送NOOP验证；
+            # 若连接已失效，由调用方的第一条命令暴露错误后通过discard_connection丢弃
+            expired = self._pop_expired()
+            if self.pool:
+                client, _ = self.pool.popleft()
+                self.total_connections_reused += 1
+                self.active_connections += 1
+            elif self.active_connections >= self.max_connections:
+                if wait_timeout:
+                    waiter = Future()
+                    self._waiters.append(waiter)
                 else:
-                    # 连接无效，关闭并创建新连接
-                    logger.debug(f"连接无效，关闭: {client.host}:{client.port}")
-                    try:
-                        client.quit()
-                    except:
-                        pass
-                    self.total_connections_closed += 1
-            
-            # 如果达到最大连接数，等待
-            if self.active_connections >= self.max_connections:
-                logger.warning(f"已达到最大连接数: {self.max_connections}，等待连接释放")
-                return None
+                    at_capacity = True
+            else:
+                # 预留一个新连接的名额
+                self.active_connections += 1
             
-            # 创建新连接
+        # 网络操作均在锁外进行，多个线程可以同时建立连接
+        self._close_clients(expired)
+        
+        # 排队等待其他线程移交连接或新建连接的名额
+        if waiter is not None:
+            logger.debug(f"已达到最大连接数: {self.max_connections}，等待连接移交")
             try:
-                client = FTPClient(host=self.host, port=self.port, **kwargs)
-                client.connect()
-                
-                # 如果提供了用户名和密码，自动登录
-                if username and password:
-                    client.login(username, password)
-                
-                self.active_connections += 1
-                self.total_connections_created += 1
-                logger.debug(f"创建新连接: {client.host}:{client.port}")
-                return client
-            except Exception as e:
+                client = waiter.result(timeout=wait_timeout)
+            except FutureTimeoutError:
+                with self.lock:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                        at_capacity = True
+                # 超时与移交同时发生时，结果已在锁内设置
+                if not at_capacity:
+                    if waiter.cancelled():
+                        return None
+                    client = waiter.result()
+            except CancelledError:
+                return None
+        
+        # 如果达到最大连接数，等待
+        if at_capacity:
+            logger.warning(f"已达到最大连接数: {self.max_connections}，等待连接释放")
+            return None
+            
+        if client:
+            logger.debug(f"复用连接: {client.host}:{client.port}")
+            return client
+            
+        # 创建新连接
+        try:
+            client = FTPClient(host=self.host, port=self.port, **kwargs)
+            client.connect()
+            
+            # 如果提供了用户名和密码，自动登录
+            if username and password:
+                client.login(username, password)
+        except Exception as e:
+            with self.lock:
+                # 空出的名额移交给等待者，由其重新建立连接
+                if not self._hand_off(None):
+                    self.active_connections -= 1
                 self.connection_failures += 1
-                logger.error(f"创建连接失败: {str(e)}")
-                raise
+            logger.error(f"创建连接失败: {str(e)}")
+            raise
+            
+        with self.lock:
+            self.total_connections_created += 1
+        logger.debug(f"创建新连接: {client.host}:{client.port}")
+        return client
     
     def release_connection(self, client):
         """
@@ -1589,35 +2575,69 @@ class FTPConnectionPool:
             client (FTPClient): 要释放的FTP客户端
         """
         with self.lock:
-            # 如果连接无效或已关闭，不放回池中
+            # 如果连接无效或已关闭，不放回池中，空出的名额移交给等待者
             if not client or not client.connected:
-                self.active_connections = max(0, self.active_connections - 1)
+                if not self._hand_off(None):
+                    self.active_connections = max(0, self.active_connections - 1)
+                return
+            
+            if self._hand_off(client):
+                logger.debug(f"连接 {client.host}:{client.port} 已移交给等待者")
                 return
             
             # 将连接放回池中
-            self.pool.append((client, time.time()))
+            self.pool.append((client, time.monotonic()))
             self.active_connections -= 1
             logger.debug(f"连接 {client.host}:{client.port} 已释放回池")
     
+    def add_connection(self, client):
+        """
+        将调用方已建立的连接作为空闲连接加入池中
+        
+        Args:
+            client (FTPClient): 已连接的FTP客户端
+        """
+        with self.lock:
+            self.pool.append((client, time.monotonic()))
+            self.total_connections_created += 1
+        logger.debug(f"加入已有连接: {client.host}:{client.port}")
+    
+    def discard_connection(self, client):
+        """
+        关闭一个已失效的连接，不再放回池中
+        
+        Args:
+            client (FTPClient): 要丢弃的FTP客户端
+        """
+        try:
+            client.quit()
+        except:
+            pass
+        with self.lock:
+            if not self._hand_off(None):
+                self.active_connections = max(0, self.active_connections - 1)
+            self.total_connections_closed += 1
+        logger.debug(f"丢弃失效连接: {client.host}:{client.port}")
+    
     def close_all(self):
         """关闭所有连接并清空池"""
         with self.lock:
-            # 停止定时器
-            if self.validation_timer:
-                self.validation_timer.cancel()
-                self.validation_timer = None
+            clients = [client for client, _ in self.pool]
+            self.pool.clear()
+            self.active_connections = 0
+            self.total_connections_closed += len(clients)
             
-            # 关闭所有连接
-            for client, _ in self.pool:
-                try:
-                    client.quit()
-                except:
-                    pass
-                self.total_connections_closed += 1
+            # 唤醒所有等待者，get_connection返回None
+            while self._waiters:
+                self._waiters.popleft().cancel()
             
-            self.pool = []
-            self.active_connections = 0
-            logger.info("所有连接已关闭")
+        # 关闭所有连接
+        for client in clients:
+            try:
+                client.quit()
+            except:
+                pass
+        logger.info("所有连接已关闭")
     
     def get_stats(self):
         """获取连接池统计信息"""
@@ -1627,6 +2647,7 @@ class FTPConnectionPool:
                 "idle_connections": len(self.pool),
                 "total_connections": self.active_connections + len(self.pool),
                 "max_connections": self.max_connections,
+                "waiting_requests": len(self._waiters),
                 "total_created": self.total_connections_created,
                 "total_reused": self.total_connections_reused,
                 "total_closed": self.total_connections_closed,
@@ -1,28 +1,60 @@
 """FTP客户端书签管理"""
 
-import json
 import os
+import sys
 from PyQt5.QtWidgets import (QDialog, QListWidget, QListWidgetItem, QPushButton,
                            QVBoxLayout, QHBoxLayout, QFormLayout, QLabel, 
                            QLineEdit, QSpinBox, QCheckBox, QGroupBox, 
                            QMessageBox, QDialogButtonBox)
-from PyQt5.QtCore import QSettings, Qt, pyqtSignal
+from PyQt5.QtCore import QSettings, Qt, QTimer, pyqtSignal
 import logging
 
+from common import json_compat
+
 logger = logging.getLogger(__name__)
 
+def _intern(value):
+    """驻留字符串，非字符串原样返回"""
+    return sys.intern(value) if isinstance(value, str) else value
+
 class Bookmark:
     """书签类，包含FTP连接信息"""
     
+    __slots__ = ("name", "host", "port", "username", "password",
+                 "enable_ssl", "passive_mode", "_tooltip")
+    
     def __init__(self, name, host, port=21, username="anonymous", password="", 
                 enable_ssl=False, passive_mode=True):
         self.name = name
-        self.host = host
+        # 多个书签常指向同一主机/账号，驻留字符串以共享同一对象
+        self.host = _intern(host)
         self.port = port
-        self.username = username
+        self.username = _intern(username)
         self.password = password
         self.enable_ssl = enable_ssl
         self.passive_mode = passive_mode
+        self._tooltip = None
+    
+    def _key(self):
+        """用于比较的字段元组"""
+        return (self.name, self.host, self.port, self.username, self.password,
+                self.enable_ssl, self.passive_mode)
+    
+    def __eq__(self, other):
+        if not isinstance(other, Bookmark):
+            return NotImplemented
+        return self._key() == other._key()
+    
+    def __hash__(self):
+        # 与__eq__使用相同的字段，相等的书签哈希值相同
+        return hash(self._key())
+    
+    @property
+    def tooltip(self):
+        """列表项的提示文本，首次访问时生成并缓存"""
+        if self._tooltip is None:
+            self._tooltip = f"{self.username}@{self.host}:{self.port}"
+        return self._tooltip
     
     def to_dict(self):
         """转换为字典"""
@@ -39,6 +71,12 @@ class Bookmark:
     @classmethod
     def from_dict(cls, data):
         """从字典创建书签"""
+        try:
+            # to_dict生成的字典与构造函数参数一一对应，直接按关键字构造
+            return cls(**data)
+        except TypeError:
+            pass
+        # 字段缺失或包含未知字段时逐个读取
         return cls(
             name=data.get('name', ''),
             host=data.get('host', ''),
@@ -50,21 +88,78 @@ class Bookmark:
         )
 
 class BookmarkManager:
-    """书签管理器，负责保存和加载书签"""
+    """书签管理器，负责保存和加载书签
+    
+    书签以QSettings数组的形式保存，每个书签对应一组键，
+    修改单个书签时只需写入该书签的键，而不必重新序列化整个列表。
+    """
+    
+    # QSettings数组的名称，旧版本以JSON字符串保存在"bookmarks"键下
+    ARRAY_KEY = "bookmark_list"
+    LEGACY_KEY = "bookmarks"
+    
+    # 进程内缓存，避免每次打开书签对话框都重新读取QSettings
+    _cached_bookmarks = None
+    _cached_saved = None
+    
+    # 所有实例共享的QSettings对象，避免每次读写都重新打开注册表/配置文件
+    _settings = None
+    
+    @classmethod
+    def get_settings(cls):
+        """获取共享的QSettings对象，首次调用时创建"""
+        if BookmarkManager._settings is None:
+            BookmarkManager._settings = QSettings("NewFTP", "FTPClient")
+        return BookmarkManager._settings
     
     def __init__(self):
         self.bookmarks = []
+        self._saved = None  # 最近一次读取或写入QSettings的书签内容
         self.load_bookmarks()
     
-    def load_bookmarks(self):
-        """加载书签"""
-        settings = QSettings("NewFTP", "FTPClient")
-        bookmarks_data = settings.value("bookmarks", [])
+    def reload(self):
+        """忽略缓存，从QSettings重新加载书签（例如配置被外部修改后）"""
+        self.load_bookmarks(use_cache=False)
+    
+    def load_bookmarks(self, use_cache=True):
+        """
+        加载书签
         
+        Args:
+            use_cache (bool): 是否使用进程内缓存
+        """
+        cls = type(self)
+        if use_cache and cls._cached_bookmarks is not None:
+            self.bookmarks = list(cls._cached_bookmarks)
+            self._saved = cls._cached_saved
+            return
+            
+        settings = self.get_settings()
+        legacy_data = settings.value(self.LEGACY_KEY)
+        if legacy_data is not None:
+            self._migrate_legacy(legacy_data)
+            return
+        
+        self.bookmarks = []
+        count = settings.beginReadArray(self.ARRAY_KEY)
+        for i in range(count):
+            settings.setArrayIndex(i)
+            self.bookmarks.append(self._read_entry(settings))
+        settings.endArray()
+        
+        self._mark_saved()
+    
+    def _migrate_legacy(self, bookmarks_data):
+        """
+        读取旧版本的JSON格式书签，并转存为QSettings数组
+        
+        Args:
+            bookmarks_data: 旧版本"bookmarks"键中保存的内容
+        """
         if isinstance(bookmarks_data, str):
             try:
-                bookmarks_data = json.loads(bookmarks_data)
-            except:
+                bookmarks_data = json_compat.loads(bookmarks_data)
+            except (ValueError, TypeError):  # orjson.JSONDecodeError也是ValueError的子类
                 bookmarks_data = []
         
         self.bookmarks = []
@@ -72,31 +167,127 @@ class BookmarkManager:
             try:
                 bookmark = Bookmark.from_dict(data)
                 self.bookmarks.append(bookmark)
-            except Exception as e:
+            except (KeyError, TypeError, AttributeError) as e:
                 logger.error(f"加载书签失败: {str(e)}")
+        
+        self._save_from(0)
+        self.get_settings().remove(self.LEGACY_KEY)
+        logger.info(f"已迁移 {len(self.bookmarks)} 个旧格式书签")
+    
+    @staticmethod
+    def _read_entry(settings):
+        """从当前数组元素读取一个书签"""
+        return Bookmark(
+            name=settings.value("name", "", type=str),
+            host=settings.value("host", "", type=str),
+            port=settings.value("port", 21, type=int),
+            username=settings.value("username", "", type=str),
+            password=settings.value("password", "", type=str),
+            enable_ssl=settings.value("enable_ssl", False, type=bool),
+            passive_mode=settings.value("passive_mode", True, type=bool)
+        )
+    
+    @staticmethod
+    def _write_entry(settings, bookmark):
+        """将一个书签写入当前数组元素"""
+        settings.setValue("name", bookmark.name)
+        settings.setValue("host", bookmark.host)
+        settings.setValue("port", bookmark.port)
+        settings.setValue("username", bookmark.username)
+        settings.setValue("password", bookmark.password)
+        settings.setValue("enable_ssl", bookmark.enable_ssl)
+        settings.setValue("passive_mode", bookmark.passive_mode)
+    
+    def _mark_saved(self):
+        """记录当前书签为已保存状态，并同步到进程内缓存"""
+        cls = type(self)
+        self._saved = [bookmark._key() for bookmark in self.bookmarks]
+        cls._cached_bookmarks = list(self.bookmarks)
+        cls._cached_saved = self._saved
+    
+    def _save_from(self, start, old_count=None):
+        """
+        写入从start开始的书签，并删除多余的旧数组元素
+        
+        Args:
+            start (int): 第一个需要写入的书签索引
+            old_count (int, optional): 修改前的书签数量，用于清理删除后残留的元素
+        """
+        settings = self.get_settings()
+        count = len(self.bookmarks)
+        settings.beginWriteArray(self.ARRAY_KEY, count)
+        for i in range(start, count):
+            settings.setArrayIndex(i)
+            self._write_entry(settings, self.bookmarks[i])
+        settings.endArray()
+        
+        # QSettings数组下标从1开始，删除size之外残留的元素
+        for i in range(count + 1, (old_count or 0) + 1):
+            settings.remove(f"{self.ARRAY_KEY}/{i}")
+        
+        self._mark_saved()
     
     def save_bookmarks(self):
-        """保存书签"""
-        settings = QSettings("NewFTP", "FTPClient")
-        bookmarks_data = [bookmark.to_dict() for bookmark in self.bookmarks]
-        settings.setValue("bookmarks", json.dumps(bookmarks_data))
+        """保存全部书签"""
+        # 内容未变化时不写入，避免重复的注册表/配置文件I/O
+        if self._saved == [bookmark._key() for bookmark in self.bookmarks]:
+            return
+        old_count = len(self._saved) if self._saved is not None else 0
+        self._save_from(0, old_count)
+    
+    def save_one(self, index):
+        """
+        只写入指定位置的书签，其余书签保持不变
+        
+        Args:
+            index (int): 书签索引
+        """
+        if not 0 <= index < len(self.bookmarks):
+            return
+        settings = self.get_settings()
+        settings.beginWriteArray(self.ARRAY_KEY, len(self.bookmarks))
+        settings.setArrayIndex(index)
+        self._write_entry(settings, self.bookmarks[index])
+        settings.endArray()
+        self._mark_saved()
     
     def add_bookmark(self, bookmark):
         """添加书签"""
         self.bookmarks.append(bookmark)
-        self.save_bookmarks()
+        self.save_one(len(self.bookmarks) - 1)
+    
+    def add_bookmarks(self, bookmarks):
+        """批量添加书签，只写入新增的部分"""
+        start = len(self.bookmarks)
+        self.bookmarks.extend(bookmarks)
+        self._save_from(start)
     
     def update_bookmark(self, index, bookmark):
         """更新书签"""
         if 0 <= index < len(self.bookmarks):
+            # 内容未变化时无需保存
+            if self.bookmarks[index] == bookmark:
+                return
             self.bookmarks[index] = bookmark
-            self.save_bookmarks()
+            self.save_one(index)
     
     def delete_bookmark(self, index):
-        """删除书签"""
+        """删除书签，只重写被删除位置之后的书签"""
         if 0 <= index < len(self.bookmarks):
+            old_count = len(self.bookmarks)
+            del self.bookmarks[index]
+            self._save_from(index, old_count)
+    
+    def delete_bookmarks(self, indices):
+        """批量删除书签，只保存一次"""
+        valid = sorted({i for i in indices if 0 <= i < len(self.bookmarks)}, reverse=True)
+        if not valid:
+            return
+        old_count = len(self.bookmarks)
+        # 从后往前删除，避免索引错位
+        for index in valid:
             del self.bookmarks[index]
-            self.save_bookmarks()
+        self._save_from(valid[-1], old_count)
     
     def get_bookmark(self, index):
         """获取书签"""
@@ -114,12 +305,25 @@ class BookmarkDialog(QDialog):
         self.setWindowTitle("编辑书签" if bookmark else "新建书签")
         self.resize(400, 300)
         
-        # 创建界面
+        # 界面在首次显示时才创建，未显示就被丢弃的对话框无需构建控件
+        self._ui_built = False
+    
+    def _ensure_ui(self):
+        """创建界面并填充数据（仅执行一次）"""
+        if self._ui_built:
+            return
+        self._ui_built = True
+        
         self.setup_ui()
         
         # 如果是编辑，填充数据
-        if bookmark:
-            self.fill_data(bookmark)
+        if self.bookmark:
+            self.fill_data(self.bookmark)
+    
+    def showEvent(self, event):
+        """首次显示前创建界面"""
+        self._ensure_ui()
+        super().showEvent(event)
     
     def setup_ui(self):
         """设置界面"""
@@ -180,6 +384,7 @@ class BookmarkDialog(QDialog):
     
     def get_bookmark(self):
         """获取编辑后的书签"""
+        self._ensure_ui()
         return Bookmark(
             name=self.name_edit.text(),
             host=self.host_edit.text(),
@@ -214,14 +419,26 @@ class BookmarkManagerDialog(QDialog):
         self.setWindowTitle("书签管理")
         self.resize(600, 400)
         
-        # 书签管理器
-        self.manager = BookmarkManager()
+        # 书签管理器，首次使用时创建
+        self._manager = None
+        self._bookmarks_loaded = False
         
         # 创建界面
         self.setup_ui()
-        
-        # 加载书签列表
-        self.load_bookmarks()
+    
+    @property
+    def manager(self):
+        """书签管理器，首次访问时才读取QSettings"""
+        if self._manager is None:
+            self._manager = BookmarkManager()
+        return self._manager
+    
+    def showEvent(self, event):
+        """首次显示后再加载书签列表，使对话框先完成绘制"""
+        super().showEvent(event)
+        if not self._bookmarks_loaded:
+            self._bookmarks_loaded = True
+            QTimer.singleShot(0, self.load_bookmarks)
     
     def setup_ui(self):
         """设置界面"""
@@ -258,14 +475,26 @@ class BookmarkManagerDialog(QDialog):
         self.delete_button.clicked.connect(self.on_delete)
         self.close_button.clicked.connect(self.reject)
     
+    def _make_item(self, bookmark):
+        """创建书签对应的列表项"""
+        item = QListWidgetItem(bookmark.name)
+        item.setToolTip(bookmark.tooltip)
+        return item
+    
     def load_bookmarks(self):
         """加载书签到列表"""
-        self.bookmark_list.clear()
+        items = [self._make_item(bookmark) for bookmark in self.manager.bookmarks]
         
-        for bookmark in self.manager.bookmarks:
-            item = QListWidgetItem(bookmark.name)
-            item.setToolTip(f"{bookmark.username}@{bookmark.host}:{bookmark.port}")
-            self.bookmark_list.addItem(item)
+        # 插入期间暂停重绘和信号，全部插入后只刷新一次
+        self.bookmark_list.setUpdatesEnabled(False)
+        self.bookmark_list.blockSignals(True)
+        try:
+            self.bookmark_list.clear()
+            for item in items:
+                self.bookmark_list.addItem(item)
+        finally:
+            self.bookmark_list.blockSignals(False)
+            self.bookmark_list.setUpdatesEnabled(True)
     
     def on_connect(self):
         """连接到选中的书签"""
@@ -285,7 +514,7 @@ class BookmarkManagerDialog(QDialog):
         if dialog.exec_():
             bookmark = dialog.get_bookmark()
             self.manager.add_bookmark(bookmark)
-            self.load_bookmarks()
+            self.bookmark_list.addItem(self._make_item(bookmark))
     
     def on_edit(self):
         """编辑选中的书签"""
@@ -299,8 +528,14 @@ class BookmarkManagerDialog(QDialog):
             dialog = BookmarkDialog(bookmark, parent=self)
             if dialog.exec_():
                 updated_bookmark = dialog.get_bookmark()
+                if updated_bookmark == bookmark:
+                    return
                 self.manager.update_bookmark(current_row, updated_bookmark)
-                self.load_bookmarks()
+                
+                # 只更新被编辑的列表项
+                item = self.bookmark_list.item(current_row)
+                item.setText(updated_bookmark.name)
+                item.setToolTip(updated_bookmark.tooltip)
     
     def on_delete(self):
         """删除选中的书签"""
@@ -318,7 +553,7 @@ class BookmarkManagerDialog(QDialog):
         
         if reply == QMessageBox.Yes:
             self.manager.delete_bookmark(current_row)
-            self.load_bookmarks()
+            self.bookmark_list.takeItem(current_row)
     
     def on_item_double_clicked(self, item):
         """双击列表项"""
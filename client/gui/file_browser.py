@@ -1,22 +1,33 @@
 """FTP客户端文件浏览器组件"""
 
 import os
+import stat
+import posixpath
 import threading
+from collections import deque
+from functools import lru_cache
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTreeView, QHeaderView,
                            QLabel, QLineEdit, QPushButton, QToolBar, QAction,
-                           QFileDialog, QMenu, QInputDialog, QMessageBox, QSplitter, QStyle)
+                           QFileDialog, QMenu, QInputDialog, QMessageBox, QSplitter, QStyle,
+                           QApplication)
 from PyQt5.QtCore import (Qt, QModelIndex, QDir, pyqtSignal, QItemSelectionModel, 
-                         QEvent, QThread, QObject, QTimer)
-from PyQt5.QtGui import QStandardItemModel, QStandardItem, QIcon
+                         QEvent, QThread, QObject, QTimer, QRunnable, QThreadPool,
+                         QAbstractTableModel)
+from PyQt5.QtGui import QIcon, QPixmapCache
 import logging
 
+from common.utils import format_size as _raw_format_size, remote_join
+
+# 目录列表中常有大量重复的文件大小，缓存格式化结果
+_format_size = lru_cache(maxsize=4096)(_raw_format_size)
+
 logger = logging.getLogger(__name__)
 
 class DragDropHelper(QObject):
     """辅助处理拖放操作，避免线程问题"""
     
-    uploadDirectoryRequested = pyqtSignal(str, str)
-    uploadFileRequested = pyqtSignal(str, str)
+    # [(本地路径, 远程路径, 是否是目录), ...]，一次拖放只发出一个信号
+    uploadBatchRequested = pyqtSignal(list)
     
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -24,18 +35,201 @@ class DragDropHelper(QObject):
     
     def handleDrop(self, urls, remote_path):
         """处理拖放事件，分发到主线程"""
+        batch = []
         for url in urls:
             local_path = url.toLocalFile()
-            if os.path.isfile(local_path):
-                file_name = os.path.basename(local_path)
-                remote_file = os.path.join(remote_path, file_name).replace('\\', '/')
-                # 使用信号发送到主线程
-                self.uploadFileRequested.emit(local_path, remote_file)
-            elif os.path.isdir(local_path):
-                # 处理目录上传
-                dir_name = os.path.basename(local_path)
-                remote_dir = os.path.join(remote_path, dir_name).replace('\\', '/')
-                self.uploadDirectoryRequested.emit(local_path, remote_dir)
+            try:
+                # 每个路径只stat一次
+                mode = os.stat(local_path).st_mode
+            except OSError:
+                continue
+            if stat.S_ISREG(mode) or stat.S_ISDIR(mode):
+                name = os.path.basename(local_path.rstrip('/\\'))
+                remote_file = remote_join(remote_path, name)
+                batch.append((local_path, remote_file, stat.S_ISDIR(mode)))
+        
+        if batch:
+            # 使用信号发送到主线程
+            self.uploadBatchRequested.emit(batch)
+
+class DirectoryWalkerSignals(QObject):
+    """DirectoryWalker的信号，QRunnable本身不能定义信号"""
+    
+    # 远程目录列表（父目录在前）, [(本地路径, 远程路径), ...]
+    planReady = pyqtSignal(list, list)
+    error = pyqtSignal(str)  # 错误信息
+
+class DirectoryWalker(QRunnable):
+    """在线程池中遍历本地目录，避免在界面线程中执行大量stat调用"""
+    
+    def __init__(self, local_dir, remote_dir):
+        super().__init__()
+        self.local_dir = local_dir
+        self.remote_dir = remote_dir
+        self.signals = DirectoryWalkerSignals()
+    
+    def run(self):
+        """按广度优先遍历目录，遍历结束后通过planReady一次性发出目录和文件列表"""
+        pending = deque([(self.local_dir, self.remote_dir)])
+        dirs = []
+        files = []
+        while pending:
+            local_dir, remote_dir = pending.popleft()
+            # 广度优先保证父目录总是排在子目录之前
+            dirs.append(remote_dir)
+            try:
+                with os.scandir(local_dir) as it:
+                    for entry in it:
+                        remote_path = remote_join(remote_dir, entry.name)
+                        if entry.is_dir(follow_symlinks=False):
+                            pending.append((entry.path, remote_path))
+                        elif entry.is_file():
+                            files.append((entry.path, remote_path))
+            except OSError as e:
+                logger.error(f"上传目录内容失败: {str(e)}")
+                self.signals.error.emit(str(e))
+        
+        self.signals.planReady.emit(dirs, files)
+
+class RemoteListingModel(QAbstractTableModel):
+    """
+    远程文件列表模型
+    
+    每列数据保存在各自的列表中，不为每个单元格创建QStandardItem，
+    大小等显示文本在视图请求时才生成，因此只有可见行才需要格式化。
+    """
+    
+    HEADERS = ["名称", "大小", "修改日期", "权限"]
+    
+    def __init__(self, icons, parent=None):
+        super().__init__(parent)
+        self._icons = icons
+        self._names = []
+        self._sizes = []
+        self._dates = []
+        self._perms = []
+        self._types = []
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._names)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        column = index.column()
+        
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return self._names[row]
+            if column == 1:
+                size = self._sizes[row]
+                if size is None:
+                    return ''
+                return '<目录>' if self._types[row] == 'dir' else _format_size(size)
+            if column == 2:
+                return self._dates[row]
+            if column == 3:
+                return self._perms[row]
+        elif role == Qt.DecorationRole and column == 0:
+            item_type = self._types[row]
+            if item_type == 'directory':
+                return self._icons['parent']
+            return self._icons['folder' if item_type == 'dir' else 'file']
+        elif role == Qt.UserRole:
+            return self._types[row]
+        return None
+    
+    def setRows(self, items):
+        """
+        用新的文件项列表替换模型内容，只触发一次模型重置
+        
+        Args:
+            items (list): 文件项列表，'.'和'..'会被忽略
+        """
+        self.beginResetModel()
+        # 第一行总是返回上级目录
+        self._names = [".."]
+        self._sizes = [None]
+        self._dates = ['']
+        self._perms = ['']
+        self._types = ["directory"]
+        self._extend(items)
+        self.endResetModel()
+    
+    def appendRows(self, items):
+        """
+        在末尾追加文件项，只发出一次行插入通知
+        
+        Args:
+            items (list): 文件项列表，'.'和'..'会被忽略
+        """
+        items = [item for item in items if item.get('name', '') not in ('.', '..')]
+        if not items:
+            return
+        first = len(self._names)
+        self.beginInsertRows(QModelIndex(), first, first + len(items) - 1)
+        self._extend(items)
+        self.endInsertRows()
+    
+    def upsertRow(self, item):
+        """
+        插入或更新单个文件项，同名项已存在时原地更新
+        
+        Args:
+            item (dict): 文件项
+        """
+        name = item.get('name', '')
+        try:
+            row = self._names.index(name, 1)
+        except ValueError:
+            self.appendRows([item])
+            return
+        self._sizes[row] = item.get('size', 0)
+        self._dates[row] = item.get('date', '')
+        self._perms[row] = item.get('permissions', '')
+        self._types[row] = item.get('type', 'file')
+        self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.HEADERS) - 1))
+    
+    def removeName(self, name):
+        """
+        删除指定名称的文件项
+        
+        Args:
+            name (str): 文件名
+            
+        Returns:
+            bool: 找到并删除返回True
+        """
+        try:
+            row = self._names.index(name, 1)
+        except ValueError:
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row)
+        for column in (self._names, self._sizes, self._dates, self._perms, self._types):
+            del column[row]
+        self.endRemoveRows()
+        return True
+    
+    def _extend(self, items):
+        """将文件项追加到各列数据中"""
+        for item in items:
+            name = item.get('name', '')
+            if name in ('.', '..'):
+                continue
+            self._names.append(name)
+            self._sizes.append(item.get('size', 0))
+            self._dates.append(item.get('date', ''))
+            self._perms.append(item.get('permissions', ''))
+            self._types.append(item.get('type', 'file'))
 
 class FileBrowser(QWidget):
     """
@@ -48,16 +242,34 @@ class FileBrowser(QWidget):
     deleteRequested = pyqtSignal(str, bool)  # 路径, 是否是目录
     mkdirRequested = pyqtSignal(str)  # 远程目录路径
     refreshRequested = pyqtSignal()  # 刷新请求
+    # 远程目录列表, [(本地路径, 远程路径), ...]；先创建所有目录再上传文件
+    uploadTreeRequested = pyqtSignal(list, list)
+    
+    # 目录列表缓存最多保存的目录数
+    REMOTE_CACHE_SIZE = 64
+    # 大目录分批插入远程列表，每批的行数
+    REMOTE_CHUNK_SIZE = 512
     
     def __init__(self, parent=None):
         super().__init__(parent)
         
+        # 远程目录列表缓存，键为远程路径，用于目录间来回导航时避免重新LIST
+        self._remote_cache = {}
+        # 当前远程路径，与remote_path_edit同步，避免反复从控件读取文本
+        self._remote_path = ""
+        # 远程列表的版本号，新的列表到达时使尚未插入的旧批次失效
+        self._remote_generation = 0
+        
+        # 合并短时间内的多次刷新请求，快速连续进入目录时只列出最后一个
+        self._refresh_timer = QTimer(self)
+        self._refresh_timer.setSingleShot(True)
+        self._refresh_timer.setInterval(50)
+        self._refresh_timer.timeout.connect(self.refreshRequested.emit)
+        
         # 创建拖放助手
         self.drag_drop_helper = DragDropHelper(self)
-        self.drag_drop_helper.uploadFileRequested.connect(
-            self.uploadRequested.emit, Qt.QueuedConnection)
-        self.drag_drop_helper.uploadDirectoryRequested.connect(
-            self.on_upload_directory_requested, Qt.QueuedConnection)
+        self.drag_drop_helper.uploadBatchRequested.connect(
+            self.on_upload_batch_requested, Qt.QueuedConnection)
         
         # 初始化界面
         self.setup_ui()
@@ -176,7 +388,7 @@ class FileBrowser(QWidget):
                 if event.mimeData().hasUrls():
                     # 获取所有被拖放的文件URL
                     urls = event.mimeData().urls()
-                    remote_path = self.remote_path_edit.text()
+                    remote_path = self._remote_path
                     
                     # 使用拖放助手处理，避免线程问题
                     self.drag_drop_helper.handleDrop(urls, remote_path)
@@ -186,39 +398,37 @@ class FileBrowser(QWidget):
         
         return super().eventFilter(obj, event)
     
+    def on_upload_batch_requested(self, batch):
+        """处理一次拖放产生的所有上传请求"""
+        for local_path, remote_path, is_dir in batch:
+            if is_dir:
+                self.on_upload_directory_requested(local_path, remote_path)
+            else:
+                self.uploadRequested.emit(local_path, remote_path)
+    
     def on_upload_directory_requested(self, local_dir, remote_dir):
-        """处理目录上传请求"""
-        # 先创建远程目录
-        self.mkdirRequested.emit(remote_dir)
-        
-        # 用计时器确保目录创建后再上传文件
-        QTimer.singleShot(500, lambda: self.upload_directory_contents(local_dir, remote_dir))
+        """处理目录上传请求，在线程池中遍历目录"""
+        walker = DirectoryWalker(local_dir, remote_dir)
+        walker.signals.planReady.connect(self.uploadTreeRequested.emit, Qt.QueuedConnection)
+        walker.signals.error.connect(self.on_upload_directory_error, Qt.QueuedConnection)
+        QThreadPool.globalInstance().start(walker)
     
-    def upload_directory_contents(self, local_dir, remote_dir):
-        """上传目录中的内容"""
-        try:
-            # 上传目录中的所有文件
-            for item in os.listdir(local_dir):
-                local_path = os.path.join(local_dir, item)
-                if os.path.isfile(local_path):
-                    # 上传文件
-                    remote_path = os.path.join(remote_dir, item).replace('\\', '/')
-                    self.uploadRequested.emit(local_path, remote_path)
-                elif os.path.isdir(local_path):
-                    # 递归处理子目录
-                    sub_dir_name = os.path.basename(local_path)
-                    sub_remote_dir = os.path.join(remote_dir, sub_dir_name).replace('\\', '/')
-                    self.on_upload_directory_requested(local_path, sub_remote_dir)
-        except Exception as e:
-            logger.error(f"上传目录内容失败: {str(e)}")
-            QMessageBox.warning(self, "上传错误", f"上传目录内容失败:\n{str(e)}")
+    def on_upload_directory_error(self, message):
+        """目录遍历出错"""
+        QMessageBox.warning(self, "上传错误", f"上传目录内容失败:\n{message}")
     
     def setup_models(self):
         """设置模型"""
         # 本地文件模型
-        from PyQt5.QtWidgets import QFileSystemModel
+        from PyQt5.QtWidgets import QFileSystemModel, QFileIconProvider
         self.local_model = QFileSystemModel()
-        self.local_model.setRootPath(QDir.rootPath())
+        # 不探测自定义目录图标、不解析符号链接，减少逐个文件的额外I/O
+        icon_provider = QFileIconProvider()
+        icon_provider.setOptions(QFileIconProvider.DontUseCustomDirectoryIcons)
+        self.local_model.setIconProvider(icon_provider)
+        self.local_model.setOption(QFileSystemModel.DontResolveSymlinks, True)
+        # 只监视当前浏览的目录，而不是整个文件系统
+        self.local_model.setRootPath(QDir.homePath())
         self.local_tree.setModel(self.local_model)
         self.local_tree.setRootIndex(self.local_model.index(QDir.homePath()))
         # 设置只显示文件名列
@@ -227,28 +437,46 @@ class FileBrowser(QWidget):
             self.local_tree.hideColumn(i)
         
         # 远程文件模型
-        self.remote_model = QStandardItemModel()
-        self.remote_model.setHorizontalHeaderLabels(["名称", "大小", "修改日期", "权限"])
+        self.load_icons()
+        self.remote_model = RemoteListingModel(self.icons, self)
         self.remote_tree.setModel(self.remote_model)
         # 设置列宽
         self.remote_tree.setColumnWidth(0, 200)
         self.remote_tree.setColumnWidth(1, 100)
         self.remote_tree.setColumnWidth(2, 150)
         
+        # 所有行高度一致，视图无需逐行计算sizeHint
+        for tree in (self.local_tree, self.remote_tree):
+            tree.setUniformRowHeights(True)
+            tree.setAnimated(False)
+            tree.setWordWrap(False)
+            tree.setTextElideMode(Qt.ElideRight)
+        # 双击远程目录用于进入目录，而不是展开
+        self.remote_tree.setExpandsOnDoubleClick(False)
+        
         # 更新本地路径显示
         self.local_path_edit.setText(QDir.homePath())
-            
-        # 加载文件图标
-        self.load_icons()
+    
+    # 所有FileBrowser实例共享的图标
+    _icons_cache = None
+    
+    @classmethod
+    def _get_icons(cls):
+        """获取标准图标，每个进程只从样式中生成一次"""
+        if FileBrowser._icons_cache is None:
+            # 图标像素图由QPixmapCache缓存，适当放大上限以免滚动时被反复淘汰重绘
+            QPixmapCache.setCacheLimit(max(QPixmapCache.cacheLimit(), 20 * 1024))
+            style = QApplication.style()
+            FileBrowser._icons_cache = {
+                'folder': style.standardIcon(QStyle.SP_DirIcon),
+                'file': style.standardIcon(QStyle.SP_FileIcon),
+                'parent': style.standardIcon(QStyle.SP_FileDialogToParent)
+            }
+        return FileBrowser._icons_cache
     
     def load_icons(self):
         """加载图标"""
-        style = self.style()
-        self.icons = {
-            'folder': style.standardIcon(QStyle.SP_DirIcon),
-            'file': style.standardIcon(QStyle.SP_FileIcon),
-            'parent': style.standardIcon(QStyle.SP_FileDialogToParent)
-        }
+        self.icons = self._get_icons()
     
     def connect_signals(self):
         """连接信号槽"""
@@ -269,6 +497,12 @@ class FileBrowser(QWidget):
         self.action_refresh.triggered.connect(self.refresh_remote)
         self.action_new_folder.triggered.connect(self.create_remote_directory)
         self.action_delete.triggered.connect(self.delete_remote_selected)
+        
+        # 远程文件发生变化时缓存失效
+        self.uploadRequested.connect(self.invalidate_remote_cache)
+        self.deleteRequested.connect(self.invalidate_remote_cache)
+        self.mkdirRequested.connect(self.invalidate_remote_cache)
+        self.uploadTreeRequested.connect(self.invalidate_remote_cache)
     
     def browse_local_directory(self):
         """浏览本地目录"""
@@ -277,6 +511,7 @@ class FileBrowser(QWidget):
         )
         
         if directory:
+            self.local_model.setRootPath(directory)
             self.local_tree.setRootIndex(self.local_model.index(directory))
             self.local_path_edit.setText(directory)
     
@@ -290,6 +525,7 @@ class FileBrowser(QWidget):
         file_path = self.local_model.filePath(index)
         
         if os.path.isdir(file_path):
+            self.local_model.setRootPath(file_path)
             self.local_tree.setRootIndex(index)
             self.local_path_edit.setText(file_path)
     
@@ -319,93 +555,168 @@ class FileBrowser(QWidget):
     
     def set_remote_path(self, path):
         """设置远程路径"""
+        self._remote_path = path
         self.remote_path_edit.setText(path)
         self.remote_path_label.setText(path)
     
-    def update_remote_tree(self, items):
+    def invalidate_remote_cache(self, *args):
+        """清空远程目录列表缓存"""
+        self._remote_cache.clear()
+    
+    def navigate_remote(self, path):
+        """
+        进入远程目录，已缓存的目录直接显示，否则请求刷新
+        
+        Args:
+            path (str): 远程目录路径
+        """
+        self.set_remote_path(path)
+        items = self._remote_cache.get(path)
+        if items is not None:
+            self.update_remote_tree(items, path)
+        else:
+            self._refresh_timer.start()
+    
+    def update_remote_tree(self, items, path=None):
         """
         更新远程文件树
         
         Args:
             items (list): 文件项列表
+            path (str, optional): 列表所属的远程路径，提供时写入缓存
         """
-        self.remote_model.clear()
-        self.remote_model.setHorizontalHeaderLabels(["名称", "大小", "修改日期", "权限"])
-        
-        # 添加父目录项
-        parent_item = QStandardItem(self.icons['parent'], "..")
-        parent_item.setData("directory", Qt.UserRole)
-        self.remote_model.appendRow([parent_item])
+        if path is not None:
+            self._remote_cache.pop(path, None)
+            if len(self._remote_cache) >= self.REMOTE_CACHE_SIZE:
+                # 淘汰最早缓存的目录
+                self._remote_cache.pop(next(iter(self._remote_cache)))
+            self._remote_cache[path] = items
+        
+        # 模型重置后保持原有列宽
+        header = self.remote_tree.header()
+        header_state = header.saveState()
+        self._remote_generation += 1
+        chunk = self.REMOTE_CHUNK_SIZE
+        self.remote_model.setRows(items[:chunk])
+        header.restoreState(header_state)
+        
+        # 大目录的其余部分在事件循环空闲时分批追加，期间界面保持响应
+        if len(items) > chunk:
+            self._append_remote_chunk(items, chunk, self._remote_generation)
+        # 远程列表目前是平铺的。若以后需要默认展开，应在此处调用一次
+        # expandAll()/expandToDepth()，不要逐行调用setExpanded
+    
+    def apply_local_delta(self, op, path, entry=None):
+        """
+        将已知的远程变更直接应用到列表和缓存，不重新向服务器请求LIST
         
-        for item in items:
-            name = item.get('name', '')
-            if name in ['.', '..']:
-                continue
-                
-            item_type = item.get('type', 'file')
-            size = item.get('size', 0)
-            date = item.get('date', '')
-            perms = item.get('permissions', '')
+        Args:
+            op (str): "add"表示新增或更新，"remove"表示删除
+            path (str): 变更的远程路径
+            entry (dict, optional): op为"add"时的文件项，名称取自path
             
-            # 根据类型设置图标
-            if item_type == 'dir':
-                icon = self.icons['folder']
-            else:
-                icon = self.icons['file']
-                
-            name_item = QStandardItem(icon, name)
-            name_item.setData(item_type, Qt.UserRole)
-            size_item = QStandardItem(self.format_size(size) if item_type != 'dir' else '<目录>')
-            date_item = QStandardItem(date)
-            perms_item = QStandardItem(perms)
+        Returns:
+            bool: 变更所在目录正在显示时返回True
+        """
+        if op not in ("add", "remove"):
+            raise ValueError(f"无效的变更类型: {op}")
+        
+        parent, name = posixpath.split(path.rstrip('/'))
+        parent = parent or '/'
+        if op == "add":
+            entry = dict(entry or {}, name=name)
+        
+        # 更新缓存中的目录列表，列表本身不修改，以免影响仍在分批插入的旧列表
+        items = self._remote_cache.get(parent)
+        if items is not None:
+            items = [item for item in items if item.get('name') != name]
+            if op == "add":
+                items.append(entry)
+            self._remote_cache[parent] = items
+        
+        if parent != (self._remote_path.rstrip('/') or '/'):
+            return False
+        if op == "add":
+            self.remote_model.upsertRow(entry)
+        else:
+            self.remote_model.removeName(name)
+        return True
+    
+    def _remote_entry(self, index):
+        """
+        获取远程列表中某一行的信息
+        
+        Args:
+            index (QModelIndex): 该行任意一列的索引
             
-            self.remote_model.appendRow([name_item, size_item, date_item, perms_item])
+        Returns:
+            tuple: (名称, 类型, 远程路径)，索引无效时返回None
+        """
+        if not index.isValid():
+            return None
+        name_index = index.sibling(index.row(), 0)
+        name = name_index.data()
+        return name, name_index.data(Qt.UserRole), remote_join(self._remote_path, name)
+    
+    def _selected_remote(self):
+        """获取当前选中的远程项，未选中时返回None"""
+        indexes = self.remote_tree.selectedIndexes()
+        if not indexes:
+            return None
+        return self._remote_entry(indexes[0])
     
-    def format_size(self, size):
-        """格式化文件大小"""
-        from common.utils import format_size
-        return format_size(size)
+    def _append_remote_chunk(self, items, start, generation):
+        """
+        在下一次事件循环中追加一批文件项
+        
+        Args:
+            items (list): 完整的文件项列表
+            start (int): 本批第一个文件项的位置
+            generation (int): 发起时的列表版本号，已过期则放弃
+        """
+        def append():
+            if generation != self._remote_generation:
+                return
+            end = start + self.REMOTE_CHUNK_SIZE
+            self.remote_model.appendRows(items[start:end])
+            if end < len(items):
+                self._append_remote_chunk(items, end, generation)
+        
+        QTimer.singleShot(0, append)
     
     def on_remote_item_double_clicked(self, index):
         """处理远程项双击事件"""
         if not index.isValid():
             return
         
-        item = self.remote_model.itemFromIndex(index)
-        name = item.text()
-        item_type = item.data(Qt.UserRole)
+        name_index = index.sibling(index.row(), 0)
+        name = name_index.data()
+        item_type = name_index.data(Qt.UserRole)
         
         if item_type == "directory" or name == "..":
-            current_path = self.remote_path_edit.text()
+            current_path = self._remote_path
             
             if name == "..":
                 # 导航到父目录
                 parent_path = os.path.dirname(current_path.rstrip('/'))
                 if not parent_path:
                     parent_path = "/"
-                self.set_remote_path(parent_path)
+                self.navigate_remote(parent_path)
             else:
                 # 导航到子目录
-                new_path = os.path.join(current_path, name).replace('\\', '/')
-                self.set_remote_path(new_path)
-                
-            self.refreshRequested.emit()
+                new_path = remote_join(current_path, name)
+                self.navigate_remote(new_path)
     
     def show_remote_context_menu(self, position):
         """显示远程文件系统上下文菜单"""
         index = self.remote_tree.indexAt(position)
         
-        if not index.isValid():
-            return   
-            
-        item = self.remote_model.itemFromIndex(index)
-        name = item.text()
+        entry = self._remote_entry(index)
+        if entry is None:
+            return
+        name, item_type, remote_path = entry
         if name == "..":
             return
-            
-        item_type = item.data(Qt.UserRole)
-        current_path = self.remote_path_edit.text()
-        remote_path = os.path.join(current_path, name).replace('\\', '/')
         
         menu = QMenu(self)
         
@@ -424,8 +735,7 @@ class FileBrowser(QWidget):
             if action == download_dir_action:
                 self.download_directory(remote_path)
             elif action == enter_dir_action:
-                self.set_remote_path(remote_path)
-                self.refreshRequested.emit()
+                self.navigate_remote(remote_path)
         elif action == download_action:
             self.download_file(remote_path)
         
@@ -446,41 +756,20 @@ class FileBrowser(QWidget):
             )
             return
                 
-        remote_path = self.remote_path_edit.text()
+        remote_path = self._remote_path
         
+        # 不在界面线程预先打开文件检查可读性，无法读取的文件由上传任务报告错误
         if os.path.isdir(local_path):
             # 对于目录，上传其中的内容
-            for item in os.listdir(local_path):
-                item_path = os.path.join(local_path, item)
-                if os.path.isfile(item_path):
-                    # 检查文件是否可读
-                    try:
-                        with open(item_path, 'rb') as f:
-                            pass  # 测试文件是否可打开
-                        remote_file = os.path.join(remote_path, item).replace('\\', '/')
-                        self.uploadRequested.emit(item_path, remote_file)
-                    except IOError:
-                        QMessageBox.warning(
-                            self, 
-                            "文件错误", 
-                            f"无法打开文件:\n{item_path}"
-                        )
+            # scandir的DirEntry缓存了文件类型，无需再逐个stat
+            with os.scandir(local_path) as it:
+                for entry in it:
+                    if entry.is_file():
+                        self.uploadRequested.emit(entry.path, remote_join(remote_path, entry.name))
         else:
             # 对于单个文件直接上传
-            try:
-                # 检查文件是否可读
-                with open(local_path, 'rb') as f:
-                    pass  # 测试文件是否可打开
-                    
-                file_name = os.path.basename(local_path)
-                remote_file = os.path.join(remote_path, file_name).replace('\\', '/')
-                self.uploadRequested.emit(local_path, remote_file)
-            except IOError:
-                QMessageBox.critical(
-                    self, 
-                    "文件错误", 
-                    f"无法打开文件:\n{local_path}"
-                )
+            file_name = os.path.basename(local_path)
+            self.uploadRequested.emit(local_path, remote_join(remote_path, file_name))
     
     def upload_selected(self):
         """上传选中的文件"""
@@ -529,23 +818,14 @@ class FileBrowser(QWidget):
     
     def download_selected(self):
         """下载选中的文件"""
-        indexes = self.remote_tree.selectedIndexes()
-        if not indexes:
+        selected = self._selected_remote()
+        if selected is None:
             QMessageBox.information(self, "提示", "请先选择要下载的文件")
             return
         
-        # 获取第一列的索引
-        row = indexes[0].row()
-        index = self.remote_model.index(row, 0)
-        name = self.remote_model.data(index)
-        
+        name, item_type, remote_path = selected
         if name == "..":
             return
-            
-        item = self.remote_model.itemFromIndex(index)
-        item_type = item.data(Qt.UserRole)
-        current_path = self.remote_path_edit.text()
-        remote_path = os.path.join(current_path, name).replace('\\', '/')
         
         if item_type == "directory":
             self.download_directory(remote_path)
@@ -554,7 +834,7 @@ class FileBrowser(QWidget):
     
     def refresh_remote(self):
         """刷新远程目录"""
-        self.refreshRequested.emit()
+        self._refresh_timer.start()
     
     def create_remote_directory(self):
         """创建远程目录"""
@@ -563,8 +843,8 @@ class FileBrowser(QWidget):
         )
         
         if ok and dir_name:
-            current_path = self.remote_path_edit.text()
-            new_path = os.path.join(current_path, dir_name).replace('\\', '/')
+            current_path = self._remote_path
+            new_path = remote_join(current_path, dir_name)
             self.mkdirRequested.emit(new_path)
     
     def delete_remote(self, path, is_dir):
@@ -584,22 +864,13 @@ class FileBrowser(QWidget):
     
     def delete_remote_selected(self):
         """删除选中的远程文件或目录"""
-        indexes = self.remote_tree.selectedIndexes()
-        if not indexes:
+        selected = self._selected_remote()
+        if selected is None:
             QMessageBox.information(self, "提示", "请先选择要删除的文件或目录")
             return
         
-        # 获取第一列的索引
-        row = indexes[0].row()
-        index = self.remote_model.index(row, 0)
-        name = self.remote_model.data(index)
-        
+        name, item_type, remote_path = selected
         if name == "..":
             return
-            
-        item = self.remote_model.itemFromIndex(index)
-        item_type = item.data(Qt.UserRole)
-        current_path = self.remote_path_edit.text()
-        remote_path = os.path.join(current_path, name).replace('\\', '/')
         
         self.delete_remote(remote_path, item_type == "directory")
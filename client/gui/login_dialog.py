@@ -16,6 +16,9 @@ class LoginDialog(QDialog):
         self.setWindowTitle("连接到FTP服务器")
         self.resize(400, 250)
         
+        # 加载和保存设置共用一个QSettings对象
+        self._settings = QSettings("NewFTP", "FTPClient")
+        
         # 创建控件
         self.setup_ui()
         
@@ -93,16 +96,27 @@ class LoginDialog(QDialog):
     
     def load_settings(self):
         """加载保存的设置"""
-        settings = QSettings("NewFTP", "FTPClient")
-        self.host_edit.setText(settings.value("connection/host", ""))
-        self.port_spin.setValue(int(settings.value("connection/port", 21)))
-        self.username_edit.setText(settings.value("connection/username", ""))
-        self.password_edit.setText(settings.value("connection/password", ""))
-        self.ssl_check.setChecked(settings.value("connection/ssl", False, type=bool))
-        self.passive_check.setChecked(settings.value("connection/passive", True, type=bool))
+        settings = self._settings
+        settings.beginGroup("connection")
+        values = {
+            "host": settings.value("host", "", type=str),
+            "port": settings.value("port", 21, type=int),
+            "username": settings.value("username", "", type=str),
+            "password": settings.value("password", "", type=str),
+            "ssl": settings.value("ssl", False, type=bool),
+            "passive": settings.value("passive", True, type=bool),
+        }
+        settings.endGroup()
+        
+        self.host_edit.setText(values["host"])
+        self.port_spin.setValue(values["port"])
+        self.username_edit.setText(values["username"])
+        self.password_edit.setText(values["password"])
+        self.ssl_check.setChecked(values["ssl"])
+        self.passive_check.setChecked(values["passive"])
         
         # 如果用户名是anonymous，勾选匿名登录
-        if self.username_edit.text() == "anonymous":
+        if values["username"] == "anonymous":
             self.anonymous_check.setChecked(True)
     
     def save_settings(self):
@@ -110,13 +124,17 @@ class LoginDialog(QDialog):
         if not self.save_settings_check.isChecked():
             return
             
-        settings = QSettings("NewFTP", "FTPClient")
-        settings.setValue("connection/host", self.host_edit.text())
-        settings.setValue("connection/port", self.port_spin.value())
-        settings.setValue("connection/username", self.username_edit.text())
-        settings.setValue("connection/password", self.password_edit.text())
-        settings.setValue("connection/ssl", self.ssl_check.isChecked())
-        settings.setValue("connection/passive", self.passive_check.isChecked())
+        settings = self._settings
+        settings.beginGroup("connection")
+        settings.setValue("host", self.host_edit.text())
+        settings.setValue("port", self.port_spin.value())
+        settings.setValue("username", self.username_edit.text())
+        settings.setValue("password", self.password_edit.text())
+        settings.setValue("ssl", self.ssl_check.isChecked())
+        settings.setValue("passive", self.passive_check.isChecked())
+        settings.endGroup()
+        # 所有设置写完后一次性写回
+        settings.sync()
     
     def get_connection_info(self):
         """获取连接信息"""
@@ -1,18 +1,24 @@
 """FTP客户端主窗口"""
 
 import os
+import posixpath
 import sys
+import time
 import logging
+import threading
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QTabWidget, 
                            QAction, QMessageBox, QFileDialog, QInputDialog,
                            QToolBar, QStatusBar, QSplitter, QStyle, QProgressDialog, QApplication)
-from PyQt5.QtCore import Qt, QTimer, pyqtSlot, QMetaType
+from PyQt5.QtCore import Qt, QTimer, QSettings, pyqtSignal, pyqtSlot, QMetaType
 from PyQt5.QtGui import QIcon
 
 from client.gui.login_dialog import LoginDialog
 from client.gui.file_browser import FileBrowser
 from client.gui.transfer_manager import TransferManager
+from client.gui.settings_dialog import SettingsDialog
+from client.gui.bookmarks import BookmarkManagerDialog
 from client.advanced_client import AdvancedFTPClient, TaskType, TaskPriority, TaskStatus
+from common.utils import remote_join
 
 logger = logging.getLogger(__name__)
 
@@ -33,9 +39,43 @@ def register_meta_types():
 class MainWindow(QMainWindow):
     """FTP客户端主窗口"""
     
+    # 任务状态或进度变化，由工作线程发出，通过队列连接在主线程中更新界面
+    taskUpdated = pyqtSignal(object)
+    # 有新的待刷新进度，由工作线程发出，每个刷新周期最多发出一次
+    progressPending = pyqtSignal()
+    # 任务完成/失败，由工作线程发出，第二个参数为任务种类，用于选择完成处理函数
+    taskCompleted = pyqtSignal(object, str)
+    taskFailed = pyqtSignal(object)
+    # 目录下载的扫描进度：扫描任务, 已提交的文件数, 当前目录
+    directoryScanProgress = pyqtSignal(object, int, str)
+    # 客户端后台关闭完成，由关闭线程发出
+    shutdownComplete = pyqtSignal()
+    
+    # 定时刷新时每次最多补充刷新的活动任务数
+    TASK_REFRESH_BATCH = 6
+    
+    # 图标名称到标准图标的映射，图标在首次使用时创建
+    _ICON_MAP = {
+        'connect': QStyle.SP_ComputerIcon,
+        'disconnect': QStyle.SP_BrowserStop,
+        'refresh': QStyle.SP_BrowserReload,
+        'upload': QStyle.SP_ArrowUp,
+        'download': QStyle.SP_ArrowDown,
+        'folder': QStyle.SP_DirIcon,
+        'file': QStyle.SP_FileIcon,
+        'delete': QStyle.SP_TrashIcon,
+        # 修改设置图标，使用一个更合适的替代品
+        'settings': QStyle.SP_FileDialogDetailedView,
+        'exit': QStyle.SP_DialogCloseButton,
+        'bookmark': QStyle.SP_DialogSaveButton
+    }
+    
     def __init__(self):
         super().__init__()
         
+        # 已创建的图标缓存
+        self._icon_cache = {}
+        
         # 注册Qt元类型
         register_meta_types()
         
@@ -45,22 +85,49 @@ class MainWindow(QMainWindow):
         # FTP客户端
         self.client = AdvancedFTPClient(max_concurrent_tasks=3)  # 减少并发任务数量避免频繁连接断开
         
+        # 当前远程路径，随地址栏文本同步，避免反复从控件读取
+        self._remote_path = ""
+        
         # 创建界面
         self.setup_ui()
         
         # 连接信号
         self.connect_signals()
         
-        # 任务状态刷新定时器
+        # 任务状态由taskUpdated信号推送，定时器只用于刷新汇总的任务数量
+        # 这些定时器都不需要高精度，使用CoarseTimer避免提高系统定时器精度
         self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.CoarseTimer)
         self.timer.timeout.connect(self.refresh_task_status)
-        self.timer.start(2000)  # 降低刷新频率，减少负载
+        self.timer.start(5000)
+        
+        # 进度更新先记录在待刷新集合中，每100毫秒统一刷新一次界面
+        self._dirty_tasks = {}
+        self._dirty_lock = threading.Lock()
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setTimerType(Qt.CoarseTimer)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(100)
+        self._flush_timer.timeout.connect(self._flush_dirty)
+        self.progressPending.connect(self._flush_timer.start, Qt.QueuedConnection)
+        
+        # 合并500毫秒内的多次刷新请求，只发出一次LIST
+        self._refresh_coalesce = QTimer(self)
+        self._refresh_coalesce.setTimerType(Qt.CoarseTimer)
+        self._refresh_coalesce.setSingleShot(True)
+        self._refresh_coalesce.setInterval(500)
+        self._refresh_coalesce.timeout.connect(self._do_refresh_remote)
         
         # 当前连接状态
         self.connected = False
+        # 正在扫描的目录下载任务ID到进度对话框的映射
+        self._directory_scans = {}
+        # 是否正在等待客户端关闭后退出
+        self._closing = False
+        self.shutdownComplete.connect(QApplication.quit, Qt.QueuedConnection)
         
         # 显示连接对话框
-        QTimer.singleShot(100, self.show_login_dialog)
+        QTimer.singleShot(100, Qt.CoarseTimer, self.show_login_dialog)
     
     def setup_ui(self):
         """设置界面"""
@@ -87,8 +154,8 @@ class MainWindow(QMainWindow):
         self.setStatusBar(self.status_bar)
         self.status_bar.showMessage("就绪")
         
-        # 重要：在使用图标之前先加载
-        self.load_icons()
+        # 创建菜单和工具栏共用的动作
+        self.setup_actions()
         
         # 创建菜单
         self.setup_menu()
@@ -96,131 +163,134 @@ class MainWindow(QMainWindow):
         # 创建工具栏
         self.setup_toolbar()
     
-    def load_icons(self):
-        """加载图标"""
-        # 使用标准图标
-        style = self.style()
-        self.icons = {
-            'connect': style.standardIcon(QStyle.SP_ComputerIcon),
-            'disconnect': style.standardIcon(QStyle.SP_BrowserStop),
-            'refresh': style.standardIcon(QStyle.SP_BrowserReload),
-            'upload': style.standardIcon(QStyle.SP_ArrowUp),
-            'download': style.standardIcon(QStyle.SP_ArrowDown),
-            'folder': style.standardIcon(QStyle.SP_DirIcon),
-            'file': style.standardIcon(QStyle.SP_FileIcon),
-            'delete': style.standardIcon(QStyle.SP_TrashIcon),
-            # 修改设置图标，使用一个更合适的替代品
-            'settings': style.standardIcon(QStyle.SP_FileDialogDetailedView),
-            'exit': style.standardIcon(QStyle.SP_DialogCloseButton),
-            'bookmark': style.standardIcon(QStyle.SP_DialogSaveButton)
-        }
+    def icon(self, key):
+        """
+        按需获取标准图标，首次使用时才创建并缓存
+        
+        Args:
+            key (str): 图标名称，见_ICON_MAP
+            
+        Returns:
+            QIcon: 图标
+        """
+        icon = self._icon_cache.get(key)
+        if icon is None:
+            icon = self.style().standardIcon(self._ICON_MAP[key])
+            self._icon_cache[key] = icon
+        return icon
 
+    def setup_actions(self):
+        """创建菜单和工具栏共用的动作，每个命令只创建一个QAction"""
+        # 名称: (图标, 菜单文本, 工具栏文本, 槽函数)
+        specs = {
+            'connect': ('connect', "连接(&C)...", "连接", self.show_login_dialog),
+            'bookmarks': ('bookmark', "书签(&B)...", None, self.show_bookmarks),
+            'disconnect': ('disconnect', "断开连接(&D)", "断开", self.disconnect),
+            'settings': ('settings', "设置(&S)...", None, self.show_settings),
+            'exit': ('exit', "退出(&X)", None, self.close),
+            'upload': ('upload', "上传文件(&U)...", "上传", self.upload_file_dialog),
+            'download': ('download', "下载文件(&D)...", "下载", self.download_file_dialog),
+            'clear': ('delete', "清除已完成的传输(&C)", None, self.transfer_manager.clear_completed_tasks),
+            'refresh': ('refresh', "刷新(&R)", "刷新", self.refresh_remote),
+            'mkdir': (None, "新建文件夹(&N)...", None, self.create_remote_directory),
+            'about': (None, "关于(&A)...", None, self.show_about),
+        }
+        
+        self.actions = {}
+        for name, (icon, text, icon_text, slot) in specs.items():
+            if icon:
+                action = QAction(self.icon(icon), text, self)
+            else:
+                action = QAction(text, self)
+            if icon_text:
+                action.setIconText(icon_text)
+            # UniqueConnection防止重构时重复连接同一个槽
+            action.triggered.connect(slot, Qt.UniqueConnection)
+            self.actions[name] = action
+    
     def setup_menu(self):
         """设置菜单"""
+        actions = self.actions
+        
         # 文件菜单
         file_menu = self.menuBar().addMenu("文件(&F)")
-        
-        connect_action = QAction(self.icons['connect'], "连接(&C)...", self)
-        connect_action.triggered.connect(self.show_login_dialog)
-        file_menu.addAction(connect_action)
-        
-        bookmarks_action = QAction(self.icons['bookmark'], "书签(&B)...", self)
-        bookmarks_action.triggered.connect(self.show_bookmarks)
-        file_menu.addAction(bookmarks_action)
-        
-        disconnect_action = QAction(self.icons['disconnect'], "断开连接(&D)", self)
-        disconnect_action.triggered.connect(self.disconnect)
-        file_menu.addAction(disconnect_action)
-        
+        file_menu.addAction(actions['connect'])
+        file_menu.addAction(actions['bookmarks'])
+        file_menu.addAction(actions['disconnect'])
         file_menu.addSeparator()
-        
-        settings_action = QAction(self.icons['settings'], "设置(&S)...", self)
-        settings_action.triggered.connect(self.show_settings)
-        file_menu.addAction(settings_action)
-        
+        file_menu.addAction(actions['settings'])
         file_menu.addSeparator()
-        
-        exit_action = QAction(self.icons['exit'], "退出(&X)", self)
-        exit_action.triggered.connect(self.close)
-        file_menu.addAction(exit_action)
+        file_menu.addAction(actions['exit'])
         
         # 传输菜单
         transfer_menu = self.menuBar().addMenu("传输(&T)")
-        
-        upload_action = QAction(self.icons['upload'], "上传文件(&U)...", self)
-        upload_action.triggered.connect(self.upload_file_dialog)
-        transfer_menu.addAction(upload_action)
-        
-        download_action = QAction(self.icons['download'], "下载文件(&D)...", self)
-        download_action.triggered.connect(self.download_file_dialog)
-        transfer_menu.addAction(download_action)
-        
+        transfer_menu.addAction(actions['upload'])
+        transfer_menu.addAction(actions['download'])
         transfer_menu.addSeparator()
-        
-        clear_action = QAction(self.icons['delete'], "清除已完成的传输(&C)", self)
-        clear_action.triggered.connect(self.transfer_manager.clear_completed_tasks)
-        transfer_menu.addAction(clear_action)
+        transfer_menu.addAction(actions['clear'])
         
         # 操作菜单
         operation_menu = self.menuBar().addMenu("操作(&O)")
-        
-        refresh_action = QAction("刷新(&R)", self)
-        refresh_action.triggered.connect(self.refresh_remote)
-        operation_menu.addAction(refresh_action)
-        
-        mkdir_action = QAction("新建文件夹(&N)...", self)
-        mkdir_action.triggered.connect(self.create_remote_directory)
-        operation_menu.addAction(mkdir_action)
+        operation_menu.addAction(actions['refresh'])
+        operation_menu.addAction(actions['mkdir'])
         
         # 帮助菜单
         help_menu = self.menuBar().addMenu("帮助(&H)")
-        
-        about_action = QAction("关于(&A)...", self)
-        about_action.triggered.connect(self.show_about)
-        help_menu.addAction(about_action)
+        help_menu.addAction(actions['about'])
     
     def setup_toolbar(self):
         """设置工具栏"""
         toolbar = QToolBar("主工具栏", self)
         self.addToolBar(toolbar)
         
-        connect_action = QAction(self.icons['connect'], "连接", self)
-        connect_action.triggered.connect(self.show_login_dialog)
-        toolbar.addAction(connect_action)
-        
-        disconnect_action = QAction(self.icons['disconnect'], "断开", self)
-        disconnect_action.triggered.connect(self.disconnect)
-        toolbar.addAction(disconnect_action)
-        
+        # 与菜单共用同一组QAction
+        actions = self.actions
+        toolbar.addAction(actions['connect'])
+        toolbar.addAction(actions['disconnect'])
         toolbar.addSeparator()
-        
-        refresh_action = QAction(self.icons['refresh'], "刷新", self)
-        refresh_action.triggered.connect(self.refresh_remote)
-        toolbar.addAction(refresh_action)
-        
+        toolbar.addAction(actions['refresh'])
         toolbar.addSeparator()
-        
-        upload_action = QAction(self.icons['upload'], "上传", self)
-        upload_action.triggered.connect(self.upload_file_dialog)
-        toolbar.addAction(upload_action)
-        
-        download_action = QAction(self.icons['download'], "下载", self)
-        download_action.triggered.connect(self.download_file_dialog)
-        toolbar.addAction(download_action)
+        toolbar.addAction(actions['upload'])
+        toolbar.addAction(actions['download'])
     
     def connect_signals(self):
         """连接信号"""
+        # 任务回调在工作线程中发出信号，通过队列连接回到主线程处理
+        self._completion_handlers = {
+            'list': self.on_list_completed,
+            'upload': self.on_upload_completed,
+            'upload_tree': self.on_upload_tree_queued,
+            'download': self.on_download_completed,
+            'download_dir': self.on_download_directory_scanned,
+            'mkdir': self.on_mkdir_completed,
+            'delete': self.on_delete_completed,
+        }
+        self.taskCompleted.connect(self._dispatch_completed, Qt.QueuedConnection)
+        self.taskFailed.connect(self.on_task_error, Qt.QueuedConnection)
+        self.directoryScanProgress.connect(self.on_directory_scan_progress, Qt.QueuedConnection)
+        
         # 文件浏览器信号 - 使用QueuedConnection确保线程安全
         self.file_browser.uploadRequested.connect(self.upload_file, Qt.QueuedConnection)
         self.file_browser.downloadRequested.connect(self.download_file, Qt.QueuedConnection)
         self.file_browser.deleteRequested.connect(self.delete_remote, Qt.QueuedConnection)
         self.file_browser.mkdirRequested.connect(self.create_remote_directory_path, Qt.QueuedConnection)
+        self.file_browser.uploadTreeRequested.connect(self.upload_tree, Qt.QueuedConnection)
         self.file_browser.refreshRequested.connect(self.refresh_remote, Qt.QueuedConnection)
+        self.file_browser.remote_path_edit.textChanged.connect(self._on_remote_path_changed)
+        
+        # 任务状态变化由工作线程通知，必须排队到主线程处理
+        self.taskUpdated.connect(self.transfer_manager.queue_update, Qt.QueuedConnection)
+        self.client.set_task_listener(self._on_task_changed)
         
         # 传输管理器信号
         self.transfer_manager.cancelRequested.connect(self.cancel_task, Qt.QueuedConnection)
+        self.transfer_manager.cancelManyRequested.connect(self.cancel_tasks, Qt.QueuedConnection)
         self.transfer_manager.clearCompletedRequested.connect(self.clear_completed_tasks, Qt.QueuedConnection)
     
+    def _on_remote_path_changed(self, path):
+        """地址栏文本变化时更新缓存的远程路径"""
+        self._remote_path = path
+    
     def show_login_dialog(self):
         """显示登录对话框"""
         dialog = LoginDialog(self)
@@ -230,21 +300,34 @@ class MainWindow(QMainWindow):
     
     def connect_to_server(self, host, port, username, password, enable_ssl=False, passive_mode=True):
         """连接到FTP服务器"""
-        try:
-            self.status_bar.showMessage(f"正在连接到 {host}:{port}...")
-            
-            # 断开可能存在的连接
-            if self.client and self.connected:
+        self.status_bar.showMessage(f"正在连接到 {host}:{port}...")
+        
+        # 断开可能存在的连接
+        if self.client and self.connected:
+            try:
                 self.client.disconnect()
-                # 给服务器一点时间处理断开连接
-                QApplication.processEvents()
+            except Exception as e:
+                logger.warning(f"断开旧连接时出错: {str(e)}")
+            self.connected = False
+        
+        # 先返回事件循环让状态栏完成绘制，再在下一轮事件循环中连接
+        QTimer.singleShot(0, Qt.CoarseTimer, lambda: self._do_connect(
+            host, port, username, password, enable_ssl, passive_mode))
+    
+    def _do_connect(self, host, port, username, password, enable_ssl, passive_mode):
+        """实际执行连接"""
+        try:
+            # 控制连接池大小取自设置中的最大连接数
+            max_connections = QSettings("NewFTP", "FTPClient").value(
+                "transfer/max_connections", 3, type=int)
             
             # 优化连接参数
             self.client.set_connection_options(
                 retry_count=2,   # 减少重试次数
                 retry_delay=1,   # 减少重试延迟
                 timeout=10,      # 设置较短的超时
-                keep_alive=True  # 保持连接
+                keep_alive=True, # 保持连接
+                pool_size=max_connections
             )
             
             # 连接服务器
@@ -279,6 +362,7 @@ class MainWindow(QMainWindow):
             self.status_bar.showMessage("已断开连接")
             
             # 清空远程文件列表
+            self.file_browser.invalidate_remote_cache()
             self.file_browser.update_remote_tree([])
             
         except Exception as e:
@@ -293,19 +377,28 @@ class MainWindow(QMainWindow):
         return True
     
     def refresh_remote(self):
-        """刷新远程文件列表"""
+        """立即刷新远程文件列表，用于用户主动刷新"""
+        self._refresh_coalesce.stop()
+        self._do_refresh_remote()
+    
+    def schedule_refresh_remote(self):
+        """请求刷新远程文件列表，短时间内的多次请求合并为一次"""
+        self._refresh_coalesce.start()
+    
+    def _do_refresh_remote(self):
+        """向服务器请求当前远程目录的列表"""
         if not self.check_connection():
             return
             
-        current_path = self.file_browser.remote_path_edit.text()
+        current_path = self._remote_path
         if not current_path:
             current_path = "/"
             self.file_browser.set_remote_path(current_path)
         
-        task_id = self.client.list_directory(
+        self.client.list_directory(
             remote_path=current_path,
-            on_complete=self.on_list_completed,
-            on_error=self.on_task_error
+            on_complete=self._completed('list'),
+            on_error=self.taskFailed.emit
         )
         
         self.status_bar.showMessage(f"正在刷新目录 {current_path}...")
@@ -318,7 +411,7 @@ class MainWindow(QMainWindow):
             path = result.get('remote_path', '/')
             
             # 更新文件浏览器
-            self.file_browser.update_remote_tree(listing)
+            self.file_browser.update_remote_tree(listing, path)
             self.file_browser.set_remote_path(path)
             
             self.status_bar.showMessage(f"已加载目录 {path}")
@@ -334,10 +427,25 @@ class MainWindow(QMainWindow):
             self, "选择要上传的文件"
         )
         
-        if files:
-            remote_path = self.file_browser.remote_path_edit.text()
-            for file_path in files:
-                self.upload_file(file_path, os.path.join(remote_path, os.path.basename(file_path)))
+        if not files:
+            return
+            
+        remote_path = self._remote_path
+        pairs = [(file_path, remote_join(remote_path, os.path.basename(file_path)))
+                 for file_path in files]
+        
+        # 一次性创建并提交所有上传任务
+        tasks = self.client.upload_many(
+            pairs,
+            on_progress=self.on_progress,
+            on_complete=self._completed('upload'),
+            on_error=self.taskFailed.emit
+        )
+        self.transfer_manager.add_tasks(tasks)
+        self.status_bar.showMessage(f"已添加 {len(tasks)} 个上传任务")
+        
+        # 切换到传输队列选项卡
+        self.tab_widget.setCurrentWidget(self.transfer_manager)
     
     def upload_file(self, local_path, remote_path):
         """上传文件"""
@@ -348,24 +456,48 @@ class MainWindow(QMainWindow):
         remote_path = remote_path.replace('\\', '/')
         
         # 创建上传任务
-        task_id = self.client.upload(
+        task = self.client.upload(
             local_path=local_path,
             remote_path=remote_path,
             on_progress=self.on_progress,
-            on_complete=self.on_upload_completed,
-            on_error=self.on_task_error
+            on_complete=self._completed('upload'),
+            on_error=self.taskFailed.emit
         )
         
         # 添加任务到传输管理器
-        task = self.client.get_task_status(task_id)
-        if task:
-            self.transfer_manager.add_task(task)
-            self.status_bar.showMessage(f"已添加上传任务: {os.path.basename(local_path)}")
-            
-            # 切换到传输队列选项卡
-            self.tab_widget.setCurrentWidget(self.transfer_manager)
-        else:
-            QMessageBox.warning(self, "错误", "创建上传任务失败")
+        self.transfer_manager.add_task(task)
+        self.status_bar.showMessage(f"已添加上传任务: {os.path.basename(local_path)}")
+        
+        # 切换到传输队列选项卡
+        self.tab_widget.setCurrentWidget(self.transfer_manager)
+    
+    def upload_tree(self, remote_dirs, files):
+        """
+        上传目录树，由FTP工作线程先依次创建目录，再提交文件上传任务
+        
+        Args:
+            remote_dirs (list): 远程目录列表，父目录在前
+            files (list): [(本地路径, 远程路径), ...]
+        """
+        if not self.check_connection():
+            return
+        
+        self.client.upload_tree(
+            remote_dirs,
+            files,
+            on_progress=self.on_progress,
+            on_complete=self._completed('upload'),
+            on_error=self.taskFailed.emit,
+            on_queued=self._completed('upload_tree')
+        )
+        self.status_bar.showMessage(f"正在创建 {len(remote_dirs)} 个远程目录...")
+    
+    def on_upload_tree_queued(self, task):
+        """目录创建完成、上传任务已提交的回调"""
+        tasks = (task.result or {}).get('tasks', [])
+        self.transfer_manager.add_tasks(tasks)
+        self.status_bar.showMessage(f"已添加 {len(tasks)} 个上传任务")
+        self.schedule_refresh_remote()
     
     def download_file_dialog(self):
         """显示下载文件对话框"""
@@ -386,12 +518,11 @@ class MainWindow(QMainWindow):
         if name == "..":
             return
             
-        item = self.file_browser.remote_model.itemFromIndex(index)
-        item_type = item.data(Qt.UserRole)
+        item_type = self.file_browser.remote_model.data(index, Qt.UserRole)
         
         # 获取文件保存路径
-        current_path = self.file_browser.remote_path_edit.text()
-        remote_path = os.path.join(current_path, name).replace('\\', '/')
+        current_path = self._remote_path
+        remote_path = remote_join(current_path, name)
         
         if item_type == "directory":
             # 处理目录下载
@@ -417,83 +548,132 @@ class MainWindow(QMainWindow):
             return
                 
         # 创建下载任务
-        task_id = self.client.download(
+        task = self.client.download(
             remote_path=remote_path,
             local_path=local_path,
             on_progress=self.on_progress,
-            on_complete=self.on_download_completed,
-            on_error=self.on_task_error
+            on_complete=self._completed('download'),
+            on_error=self.taskFailed.emit
         )
         
         # 添加任务到传输管理器
-        task = self.client.get_task_status(task_id)
-        if task:
-            self.transfer_manager.add_task(task)
-            self.status_bar.showMessage(f"已添加下载任务: {os.path.basename(remote_path)}")
-            
-            # 切换到传输队列选项卡
-            self.tab_widget.setCurrentWidget(self.transfer_manager)
-        else:
-            QMessageBox.warning(self, "错误", "创建下载任务失败")
+        self.transfer_manager.add_task(task)
+        self.status_bar.showMessage(f"已添加下载任务: {posixpath.basename(remote_path)}")
+        
+        # 切换到传输队列选项卡
+        self.tab_widget.setCurrentWidget(self.transfer_manager)
 
     def download_directory(self, remote_dir, local_dir):
-        """下载整个目录"""
+        """下载整个目录，远程目录在工作线程中边扫描边提交下载任务"""
         if not self.check_connection():
             return
                 
         # 显示进度对话框
-        progress_dialog = QProgressDialog("准备下载目录...", "取消", 0, 0, self)
+        progress_dialog = QProgressDialog("正在扫描目录...", "取消", 0, 0, self)
         progress_dialog.setWindowTitle("下载目录")
         progress_dialog.setWindowModality(Qt.WindowModal)
+        
+        scan_task = self.client.download_directory_async(
+            remote_dir=remote_dir,
+            local_dir=local_dir,
+            on_progress=self.on_progress,
+            on_complete=self._completed('download'),
+            on_error=self.taskFailed.emit,
+            on_scan_progress=self.directoryScanProgress.emit,
+            on_scan_complete=self._completed('download_dir')
+        )
+        self._directory_scans[scan_task.id] = progress_dialog
+        progress_dialog.canceled.connect(lambda: self._cancel_directory_scan(scan_task.id))
         progress_dialog.show()
-        QApplication.processEvents()
         
-        # 开始下载目录
-        try:
-            task_ids = self.client.download_directory(
-                remote_dir=remote_dir,
-                local_dir=local_dir,
-                on_progress=self.on_progress,
-                on_complete=self.on_download_completed,
-                on_error=self.on_task_error
-            )
-            
-            # 更新提示信息
+        # 切换到传输队列选项卡
+        self.tab_widget.setCurrentWidget(self.transfer_manager)
+    
+    def _cancel_directory_scan(self, task_id):
+        """取消目录扫描，已提交的下载任务不受影响"""
+        self._directory_scans.pop(task_id, None)
+        self.client.cancel_task(task_id)
+    
+    def on_directory_scan_progress(self, task, count, path):
+        """目录扫描进度回调"""
+        progress_dialog = self._directory_scans.get(task.id)
+        if progress_dialog:
+            progress_dialog.setLabelText(f"已添加 {count} 个下载任务\n正在扫描: {path}")
+    
+    def on_download_directory_scanned(self, task):
+        """目录扫描完成回调"""
+        task_ids = (task.result or {}).get('task_ids', [])
+        progress_dialog = self._directory_scans.pop(task.id, None)
+        if progress_dialog:
             progress_dialog.setLabelText(f"已创建 {len(task_ids)} 个下载任务")
-            QApplication.processEvents()
-            
             # 等待一会儿然后关闭对话框
-            QTimer.singleShot(2000, progress_dialog.close)
-            
-            # 切换到传输队列选项卡
-            self.tab_widget.setCurrentWidget(self.transfer_manager)
-            self.status_bar.showMessage(f"已添加 {len(task_ids)} 个文件到下载队列")
-        
-        except Exception as e:
-            progress_dialog.close()
-            logger.error(f"下载目录失败: {str(e)}")
-            QMessageBox.warning(self, "错误", f"下载目录失败: {str(e)}")
+            QTimer.singleShot(2000, Qt.CoarseTimer, progress_dialog.close)
+        self.status_bar.showMessage(f"已添加 {len(task_ids)} 个文件到下载队列")
+    
+    def _on_task_changed(self, task):
+        """任务状态变化监听器，在工作线程中调用，只转发传输队列中显示的上传/下载任务"""
+        if task.type in (TaskType.UPLOAD, TaskType.DOWNLOAD):
+            self.taskUpdated.emit(task)
     
     def on_progress(self, task, transferred, total, elapsed):        
-        """进度回调"""
-        # 更新传输管理器中的任务
-        self.transfer_manager.update_task(task)
+        """进度回调，在工作线程中调用"""
+        with self._dirty_lock:
+            first = not self._dirty_tasks
+            self._dirty_tasks[task.id] = task
+        # 只有集合由空变为非空时才通知主线程，之后的进度在同一周期内合并
+        if first:
+            self.progressPending.emit()
+    
+    def _flush_dirty(self):
+        """将合并后的进度更新到传输管理器"""
+        with self._dirty_lock:
+            tasks = self._dirty_tasks
+            self._dirty_tasks = {}
+        now = time.monotonic()
+        for task in tasks.values():
+            self.transfer_manager.update_task(task)
+            task.last_ui_update_ts = now
+    
+    def _completed(self, kind):
+        """
+        生成任务完成回调，回调在工作线程中只发出taskCompleted信号
+        
+        Args:
+            kind (str): 任务种类，对应_completion_handlers中的处理函数
+            
+        Returns:
+            callable: 任务完成回调函数
+        """
+        return lambda task: self.taskCompleted.emit(task, kind)
+    
+    def _dispatch_completed(self, task, kind):
+        """在主线程中按任务种类调用完成处理函数"""
+        self._completion_handlers[kind](task)
     
     def on_upload_completed(self, task):
         """上传完成回调"""
         self.transfer_manager.update_task(task)
         self.status_bar.showMessage(f"上传完成: {os.path.basename(task.args[0])}")
         
-        # 自动刷新当前目录    
-        self.refresh_remote()
+        # 直接在列表中添加上传的文件，不重新LIST
+        result = task.result or {}
+        remote_path = result.get('remote_path')
+        if remote_path:
+            self.file_browser.apply_local_delta(
+                "add", remote_path, entry={'type': 'file', 'size': result.get('size', 0)})
+        else:
+            self.schedule_refresh_remote()
         
     def on_download_completed(self, task):
         """下载完成回调"""
         self.transfer_manager.update_task(task)
-        self.status_bar.showMessage(f"下载完成: {os.path.basename(task.args[0])}")
+        self.status_bar.showMessage(f"下载完成: {posixpath.basename(task.args[0])}")
     
     def on_task_error(self, task):
         """任务错误回调"""
+        progress_dialog = self._directory_scans.pop(task.id, None)
+        if progress_dialog:
+            progress_dialog.close()
         self.transfer_manager.update_task(task)
         error_msg = str(task.error) if task.error else "未知错误"
         self.status_bar.showMessage(f"任务失败: {error_msg}")
@@ -509,8 +689,8 @@ class MainWindow(QMainWindow):
         )
         
         if ok and dir_name:    
-            current_path = self.file_browser.remote_path_edit.text()
-            new_path = os.path.join(current_path, dir_name).replace('\\', '/')
+            current_path = self._remote_path
+            new_path = remote_join(current_path, dir_name)
             self.create_remote_directory_path(new_path)
     
     def create_remote_directory_path(self, path):
@@ -518,10 +698,10 @@ class MainWindow(QMainWindow):
         if not self.check_connection():
             return
         
-        task_id = self.client.mkdir(
+        self.client.mkdir(
             path,
-            on_complete=self.on_mkdir_completed,
-            on_error=self.on_task_error
+            on_complete=self._completed('mkdir'),
+            on_error=self.taskFailed.emit
         )
     
     def on_mkdir_completed(self, task):
@@ -531,8 +711,8 @@ class MainWindow(QMainWindow):
             path = result.get('remote_path', '')
             self.status_bar.showMessage(f"已创建目录: {path}")
             
-            # 刷新当前目录
-            self.refresh_remote()
+            # 直接在列表中添加新目录，不重新LIST
+            self.file_browser.apply_local_delta("add", path, entry={'type': 'dir', 'size': 0})
         else:
             QMessageBox.warning(self, "错误", "创建目录失败")
     
@@ -542,16 +722,16 @@ class MainWindow(QMainWindow):
             return
         
         if is_dir:
-            task_id = self.client.rmdir(
+            self.client.rmdir(
                 path,
-                on_complete=self.on_delete_completed,
-                on_error=self.on_task_error
+                on_complete=self._completed('delete'),
+                on_error=self.taskFailed.emit
             )
         else:
-            task_id = self.client.delete(
+            self.client.delete(
                 path,
-                on_complete=self.on_delete_completed,
-                on_error=self.on_task_error
+                on_complete=self._completed('delete'),
+                on_error=self.taskFailed.emit
             )
     
     def on_delete_completed(self, task):
@@ -561,8 +741,8 @@ class MainWindow(QMainWindow):
             path = result.get('remote_path', '')
             self.status_bar.showMessage(f"已删除: {path}")
             
-            # 刷新当前目录
-            self.refresh_remote()
+            # 直接从列表中移除，不重新LIST
+            self.file_browser.apply_local_delta("remove", path)
         else:
             QMessageBox.warning(self, "错误", "删除失败")
     
@@ -576,32 +756,38 @@ class MainWindow(QMainWindow):
             if task:
                 self.transfer_manager.update_task(task)
     
+    def cancel_tasks(self, task_ids):
+        """批量取消任务"""
+        canceled = self.client.cancel_tasks(task_ids)
+        self.status_bar.showMessage(f"已取消 {len(canceled)} 个任务")
+        
+        # 状态变化会经任务监听器排队刷新，这里合并为一次更新
+        for task_id in canceled:
+            task = self.client.get_task_status(task_id)
+            if task:
+                self.transfer_manager.queue_update(task)
+    
     def clear_completed_tasks(self):
         """清除已完成的任务"""
         self.transfer_manager.clear_completed_tasks()
         self.status_bar.showMessage("已清除已完成的任务")
     
     def refresh_task_status(self):
-        """刷新任务状态"""
+        """刷新任务数量统计，并补充刷新界面最久未更新的活动任务"""
         if not self.connected:
             return
             
         try:
-            # 获取所有任务
-            tasks = self.client.get_all_tasks()
-            
-            # 更新传输管理器状态标签
-            active_count = len(tasks['active'])
-            pending_count = tasks['queue_size']
-            completed_count = len(tasks['completed'])
-            self.transfer_manager.update_status_label(active_count, pending_count, completed_count)
+            # 单个任务的状态由taskUpdated信号推送，这里只更新汇总数量
+            counts = self.client.get_task_counts()
+            self.transfer_manager.update_status_label(
+                counts['active'], counts['queued'], counts['completed'])
             
-            # 更新活动任务，但减少频率避免界面卡顿
-            for task_id, task_data in list(tasks['active'].items())[:3]:  # 每次最多更新3个任务
-                task = self.client.get_task_status(task_id)
-                if task:
-                    # 使用QMetaObject.invokeMethod确保UI更新在主线程进行
-                    self.transfer_manager.update_task(task)
+            # 作为信号推送的补充，每次只刷新最久未更新的几个任务，所有任务轮流得到刷新
+            now = time.monotonic()
+            for task in self.client.iter_active_sorted_by_ui_age(self.TASK_REFRESH_BATCH):
+                self.transfer_manager.update_task(task)
+                task.last_ui_update_ts = now
         except Exception as e:
             logger.debug(f"刷新任务状态时出错: {str(e)}")  # 降低日志级别，避免日志过多
     
@@ -615,7 +801,6 @@ class MainWindow(QMainWindow):
     
     def show_settings(self):
         """显示设置对话框"""
-        from client.gui.settings_dialog import SettingsDialog
         dialog = SettingsDialog(self)
         if dialog.exec_():
             # 可以在这里应用某些设置，例如更新最大并发任务数
@@ -623,7 +808,6 @@ class MainWindow(QMainWindow):
 
     def show_bookmarks(self):
         """显示书签管理对话框"""
-        from client.gui.bookmarks import BookmarkManagerDialog
         dialog = BookmarkManagerDialog(self)
         dialog.bookmarkSelected.connect(self.connect_to_bookmark)
         dialog.exec_()
@@ -645,6 +829,10 @@ class MainWindow(QMainWindow):
 
     def closeEvent(self, event):
         """关闭事件处理"""
+        if self._closing:
+            event.ignore()
+            return
+        
         if self.connected:
             reply = QMessageBox.question(
                 self, "确认退出", 
@@ -654,21 +842,17 @@ class MainWindow(QMainWindow):
             )
             
             if reply == QMessageBox.Yes:
-                try:
-                    self.client.disconnect()
-                except Exception:
-                    pass
-                # 给Qt足够时间清理所有线程
-                QTimer.singleShot(500, self.perform_exit)
-                event.ignore()  # 我们将在定时器回调中退出
-            else:
-                event.ignore()
+                self.perform_exit()
         else:
-            event.accept()
+            self.perform_exit()
+        # 在客户端关闭完成后才退出
+        event.ignore()
             
     def perform_exit(self):
-        """执行退出操作"""
-        # 确保线程已清理
-        if hasattr(self.client, 'cleanup'):
-            self.client.cleanup()
-        QApplication.quit()
\ No newline at end of file
+        """在后台关闭客户端，完成后由shutdownComplete信号退出应用"""
+        self._closing = True
+        self.timer.stop()
+        self.status_bar.showMessage("正在断开连接...")
+        self.client.shutdown_async(on_complete=self.shutdownComplete.emit)
+        # FTP服务器无响应时的兜底退出
+        QTimer.singleShot(3000, Qt.CoarseTimer, QApplication.quit)
\ No newline at end of file
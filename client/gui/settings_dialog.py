@@ -17,6 +17,9 @@ class SettingsDialog(QDialog):
         self.setWindowTitle("设置")
         self.resize(500, 400)
         
+        # 设置存储只打开一次，读写共用
+        self._settings = QSettings("NewFTP", "FTPClient")
+        
         # 创建界面
         self.setup_ui()
         
@@ -93,35 +96,54 @@ class SettingsDialog(QDialog):
     
     def load_settings(self):
         """加载设置"""
-        settings = QSettings("NewFTP", "FTPClient")
+        settings = self._settings
         
         # 连接设置
-        self.default_host_edit.setText(settings.value("defaults/host", ""))
-        self.default_port_spin.setValue(int(settings.value("defaults/port", 21)))
-        self.default_username_edit.setText(settings.value("defaults/username", ""))
-        self.default_ssl_check.setChecked(settings.value("defaults/ssl", False, type=bool))
-        self.passive_mode_check.setChecked(settings.value("defaults/passive", True, type=bool))
+        settings.beginGroup("defaults")
+        try:
+            self.default_host_edit.setText(settings.value("host", ""))
+            self.default_port_spin.setValue(int(settings.value("port", 21)))
+            self.default_username_edit.setText(settings.value("username", ""))
+            self.default_ssl_check.setChecked(settings.value("ssl", False, type=bool))
+            self.passive_mode_check.setChecked(settings.value("passive", True, type=bool))
+        finally:
+            settings.endGroup()
         
         # 传输设置
-        self.max_connections_spin.setValue(int(settings.value("transfer/max_connections", 3)))
-        self.retry_count_spin.setValue(int(settings.value("transfer/retry_count", 3)))
-        self.retry_delay_spin.setValue(int(settings.value("transfer/retry_delay", 5)))
+        settings.beginGroup("transfer")
+        try:
+            self.max_connections_spin.setValue(int(settings.value("max_connections", 3)))
+            self.retry_count_spin.setValue(int(settings.value("retry_count", 3)))
+            self.retry_delay_spin.setValue(int(settings.value("retry_delay", 5)))
+        finally:
+            settings.endGroup()
     
     def save_settings(self):
         """保存设置"""
-        settings = QSettings("NewFTP", "FTPClient")
+        settings = self._settings
         
         # 连接设置
-        settings.setValue("defaults/host", self.default_host_edit.text())
-        settings.setValue("defaults/port", self.default_port_spin.value())
-        settings.setValue("defaults/username", self.default_username_edit.text())
-        settings.setValue("defaults/ssl", self.default_ssl_check.isChecked())
-        settings.setValue("defaults/passive", self.passive_mode_check.isChecked())
+        settings.beginGroup("defaults")
+        try:
+            settings.setValue("host", self.default_host_edit.text())
+            settings.setValue("port", self.default_port_spin.value())
+            settings.setValue("username", self.default_username_edit.text())
+            settings.setValue("ssl", self.default_ssl_check.isChecked())
+            settings.setValue("passive", self.passive_mode_check.isChecked())
+        finally:
+            settings.endGroup()
         
         # 传输设置
-        settings.setValue("transfer/max_connections", self.max_connections_spin.value())
-        settings.setValue("transfer/retry_count", self.retry_count_spin.value())
-        settings.setValue("transfer/retry_delay", self.retry_delay_spin.value())
+        settings.beginGroup("transfer")
+        try:
+            settings.setValue("max_connections", self.max_connections_spin.value())
+            settings.setValue("retry_count", self.retry_count_spin.value())
+            settings.setValue("retry_delay", self.retry_delay_spin.value())
+        finally:
+            settings.endGroup()
+        
+        # 一次性刷新到后端
+        settings.sync()
     
     def accept(self):
         """确定按钮处理"""
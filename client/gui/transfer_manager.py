@@ -1,46 +1,349 @@
 """FTP客户端传输管理器组件"""
 
-from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, 
-                           QTableWidgetItem, QPushButton, QHeaderView,
-                           QProgressBar, QLabel, QMenu, QMessageBox)
-from PyQt5.QtCore import Qt, pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QTableView,
+                           QPushButton, QHeaderView, QLabel, QMenu, QMessageBox,
+                           QStyledItemDelegate, QStyleOptionProgressBar, QStyle,
+                           QApplication)
+from PyQt5.QtCore import Qt, QModelIndex, QAbstractTableModel, QTimer, pyqtSignal, pyqtSlot
 from PyQt5.QtGui import QColor
 import logging
 
-from client.transfer_queue import TaskStatus
-
 logger = logging.getLogger(__name__)
 
+# 进度列数据所用的角色，值为0-100的整数
+PROGRESS_ROLE = Qt.UserRole + 1
+
+# 状态名称到中文名称的映射，同时兼容transfer_queue和advanced_client两套任务状态
+STATUS_NAMES = {
+    "PENDING": "等待中",
+    "RUNNING": "传输中",
+    "COMPLETED": "已完成",
+    "COMPLETE": "已完成",
+    "FAILED": "失败",
+    "CANCELED": "已取消",
+    "CANCELLED": "已取消",
+    "PAUSED": "已暂停",
+    "RETRYING": "重试中"
+}
+
+TYPE_NAMES = {
+    "UPLOAD": "上传",
+    "DOWNLOAD": "下载",
+    "DELETE": "删除",
+    "RENAME": "重命名",
+    "MKDIR": "创建目录",
+    "RMDIR": "删除目录",
+    "LIST": "列表"
+}
+
+# 按枚举成员缓存的中文名称，首次遇到某个成员时才计算，之后省去.name属性访问
+_STATUS_NAME_BY_ENUM = {}
+_TYPE_NAME_BY_ENUM = {}
+
+def status_name(status):
+    """
+    获取任务状态枚举的中文名称
+    
+    Args:
+        status: 任务状态枚举成员
+        
+    Returns:
+        str: 中文名称
+    """
+    name = _STATUS_NAME_BY_ENUM.get(status)
+    if name is None:
+        name = _STATUS_NAME_BY_ENUM[status] = STATUS_NAMES.get(status.name, status.name)
+    return name
+
+def type_name(task_type):
+    """
+    获取任务类型枚举的中文名称
+    
+    Args:
+        task_type: 任务类型枚举成员
+        
+    Returns:
+        str: 中文名称
+    """
+    name = _TYPE_NAME_BY_ENUM.get(task_type)
+    if name is None:
+        name = _TYPE_NAME_BY_ENUM[task_type] = TYPE_NAMES.get(task_type.name, task_type.name)
+    return name
+
+# 各状态的行背景色，未列出的状态使用默认白色
+_COLORS_BY_NAME = {
+    "RUNNING": QColor(173, 216, 230),    # 淡蓝色
+    "COMPLETED": QColor(144, 238, 144),  # 淡绿色
+    "COMPLETE": QColor(144, 238, 144),
+    "FAILED": QColor(255, 192, 203),     # 淡红色
+    "CANCELED": QColor(211, 211, 211),   # 淡灰色
+    "CANCELLED": QColor(211, 211, 211),
+}
+_DEFAULT_COLOR = QColor(255, 255, 255)
+
+# 已结束的任务状态，不能再取消
+_FINISHED_STATUSES = {"COMPLETED", "COMPLETE", "FAILED", "CANCELED", "CANCELLED"}
+# 清除时移除的任务状态
+_CLEARABLE_STATUSES = {"COMPLETED", "COMPLETE", "CANCELED", "CANCELLED"}
+
+def _row_runs(rows):
+    """
+    将行号合并为连续区间
+    
+    Args:
+        rows (list): 行号列表
+    
+    Returns:
+        list: [(起始行, 结束行), ...]
+    """
+    runs = []
+    for row in sorted(rows):
+        if runs and row == runs[-1][1] + 1:
+            runs[-1][1] = row
+        else:
+            runs.append([row, row])
+    return runs
+
+class TransferTaskModel(QAbstractTableModel):
+    """
+    传输任务列表模型
+    
+    直接保存任务对象的引用，单元格内容在视图请求时才生成，
+    因此只有可见行需要绘制，任务变化时只通知所在行。
+    """
+    
+    HEADERS = ["ID", "类型", "源", "目标", "状态", "进度"]
+    STATUS_COLUMN = 4
+    PROGRESS_COLUMN = 5
+    
+    # 任务状态变化时需要刷新的角色
+    _CHANGED_ROLES = [Qt.DisplayRole, Qt.BackgroundRole, PROGRESS_ROLE]
+    # 仅进度变化时需要刷新的角色
+    _PROGRESS_ROLES = [PROGRESS_ROLE]
+    
+    # 按状态枚举成员缓存的行背景色，所有行共用同一个QColor对象
+    _STATUS_COLORS = {}
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._tasks = []
+        self._id_to_row = {}
+        # 上次通知视图时的任务状态 {id: status}
+        self._last_status = {}
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._tasks)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.HEADERS[section]
+        return None
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        task = self._tasks[index.row()]
+        column = index.column()
+        
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return task.id
+            if column == 1:
+                return type_name(task.type)
+            if column == 2:
+                return str(task.args[0]) if task.args else "-"
+            if column == 3:
+                if task.type.name in ("UPLOAD", "DOWNLOAD") and len(task.args) > 1:
+                    return str(task.args[1])
+                return "-"
+            if column == self.STATUS_COLUMN:
+                return status_name(task.status)
+        elif role == PROGRESS_ROLE and column == self.PROGRESS_COLUMN:
+            return int(task.progress)
+        elif role == Qt.BackgroundRole:
+            color = self._STATUS_COLORS.get(task.status)
+            if color is None:
+                color = _COLORS_BY_NAME.get(task.status.name, _DEFAULT_COLOR)
+                self._STATUS_COLORS[task.status] = color
+            return color
+        return None
+    
+    def task(self, row):
+        """获取指定行的任务对象"""
+        return self._tasks[row]
+    
+    def contains(self, task_id):
+        """任务是否已在列表中"""
+        return task_id in self._id_to_row
+    
+    def task_ids(self):
+        """获取所有任务ID"""
+        return list(self._id_to_row)
+    
+    def addTasks(self, tasks):
+        """
+        在末尾追加任务，已存在的任务被忽略，只发出一次行插入通知
+        
+        Args:
+            tasks (list): 任务对象列表
+        """
+        tasks = [task for task in tasks if task.id not in self._id_to_row]
+        if not tasks:
+            return
+        first = len(self._tasks)
+        self.beginInsertRows(QModelIndex(), first, first + len(tasks) - 1)
+        for offset, task in enumerate(tasks):
+            self._id_to_row[task.id] = first + offset
+            self._last_status[task.id] = task.status
+            self._tasks.append(task)
+        self.endInsertRows()
+    
+    def taskChanged(self, task):
+        """
+        通知视图任务所在行已变化
+        
+        Args:
+            task: 任务对象
+        
+        Returns:
+            bool: 任务在列表中返回True
+        """
+        return self.tasksChanged([task]) > 0
+    
+    def tasksChanged(self, tasks):
+        """
+        通知视图多个任务已变化，相邻的行合并为一次通知
+        
+        Args:
+            tasks (list): 任务对象列表
+        
+        Returns:
+            int: 在列表中的任务数
+        """
+        status_rows = []
+        progress_rows = []
+        for task in tasks:
+            row = self._id_to_row.get(task.id)
+            if row is None:
+                continue
+            # 任务对象可能被替换为同ID的新对象
+            self._tasks[row] = task
+            
+            # 大部分更新只有进度变化，此时不必刷新整行文字和背景色
+            if self._last_status.get(task.id) == task.status:
+                progress_rows.append(row)
+            else:
+                self._last_status[task.id] = task.status
+                status_rows.append(row)
+        
+        last_column = len(self.HEADERS) - 1
+        for first, last in _row_runs(status_rows):
+            self.dataChanged.emit(self.index(first, 0), self.index(last, last_column),
+                                  self._CHANGED_ROLES)
+        for first, last in _row_runs(progress_rows):
+            self.dataChanged.emit(self.index(first, self.PROGRESS_COLUMN),
+                                  self.index(last, self.PROGRESS_COLUMN), self._PROGRESS_ROLES)
+        return len(status_rows) + len(progress_rows)
+    
+    def removeWhere(self, predicate):
+        """
+        移除满足条件的任务，连续的行一次移除
+        
+        Args:
+            predicate (callable): 接收任务对象，返回True表示移除
+        
+        Returns:
+            int: 移除的任务数
+        """
+        removed = 0
+        row = len(self._tasks) - 1
+        while row >= 0:
+            if not predicate(self._tasks[row]):
+                row -= 1
+                continue
+            last = row
+            while row > 0 and predicate(self._tasks[row - 1]):
+                row -= 1
+            self.beginRemoveRows(QModelIndex(), row, last)
+            del self._tasks[row:last + 1]
+            self.endRemoveRows()
+            removed += last - row + 1
+            row -= 1
+        
+        if removed:
+            self._id_to_row = {task.id: row for row, task in enumerate(self._tasks)}
+            self._last_status = {task.id: self._last_status[task.id] for task in self._tasks}
+        return removed
+
+class ProgressDelegate(QStyledItemDelegate):
+    """用当前样式直接绘制进度条，不为每行创建QProgressBar部件"""
+    
+    def paint(self, painter, option, index):
+        progress = index.data(PROGRESS_ROLE)
+        if progress is None:
+            super().paint(painter, option, index)
+            return
+        
+        bar = QStyleOptionProgressBar()
+        bar.rect = option.rect
+        bar.minimum = 0
+        bar.maximum = 100
+        bar.progress = progress
+        bar.text = f"{progress}%"
+        bar.textVisible = True
+        bar.textAlignment = Qt.AlignCenter
+        bar.state = option.state
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.CE_ProgressBar, bar, painter)
+
 class TransferManager(QWidget):
     """传输管理器组件，用于显示和管理传输任务"""
     
     # 信号定义
     cancelRequested = pyqtSignal(str)  # 任务ID
+    cancelManyRequested = pyqtSignal(list)  # 任务ID列表
     clearCompletedRequested = pyqtSignal()  # 清除完成的任务
     
+    # 合并任务更新的刷新间隔（毫秒）
+    UPDATE_INTERVAL = 150
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         
+        # 任务列表模型
+        self.model = TransferTaskModel(self)
+        
+        # 待刷新的任务，键为任务ID；同一任务在一个刷新周期内的多次更新只重绘一次
+        self._pending = {}
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setTimerType(Qt.CoarseTimer)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.setInterval(self.UPDATE_INTERVAL)
+        self._flush_timer.timeout.connect(self._flush_updates)
+        
         # 初始化界面
         self.setup_ui()
-        
-        # 任务ID到行索引的映射
-        self.task_rows = {}
     
     def setup_ui(self):
         """设置界面"""
         # 主布局
         main_layout = QVBoxLayout(self)
         
-        # 传输任务表
-        self.task_table = QTableWidget()
-        self.task_table.setColumnCount(7)
-        self.task_table.setHorizontalHeaderLabels(
-            ["ID", "类型", "源", "目标", "状态", "进度", "操作"]
-        )
-        self.task_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
-        self.task_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
-        self.task_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+        # 传输任务表，只绘制可见行
+        self.task_table = QTableView()
+        self.task_table.setModel(self.model)
+        self.task_table.setItemDelegateForColumn(TransferTaskModel.PROGRESS_COLUMN,
+                                                 ProgressDelegate(self.task_table))
+        self.task_table.setSelectionBehavior(QTableView.SelectRows)
+        self.task_table.verticalHeader().setVisible(False)
+        header = self.task_table.horizontalHeader()
+        # ResizeToContents需要测量所有行，任务很多时代价很高，改为交互式列宽
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        header.setSectionResizeMode(2, QHeaderView.Stretch)
+        header.setSectionResizeMode(3, QHeaderView.Stretch)
         self.task_table.setContextMenuPolicy(Qt.CustomContextMenu)
         
         # 按钮区域
@@ -72,182 +375,113 @@ class TransferManager(QWidget):
         Args:
             task: TransferTask对象
         """
-        row = self.task_table.rowCount()
-        self.task_table.insertRow(row)
-        
-        # 保存任务ID到行索引的映射
-        self.task_rows[task.id] = row
-        
-        # 设置单元格
-        self.task_table.setItem(row, 0, QTableWidgetItem(task.id))
-        self.task_table.setItem(row, 1, QTableWidgetItem(self.get_task_type_name(task.type.name)))
-        
-        # 源路径
-        if task.type.name == "UPLOAD":
-            source = task.args[0]
-        else:
-            source = task.args[0] if task.args else "-"
-        self.task_table.setItem(row, 2, QTableWidgetItem(source))
-        
-        # 目标路径
-        if task.type.name == "UPLOAD":
-            target = task.args[1] if len(task.args) > 1 else "-"
-        elif task.type.name == "DOWNLOAD":
-            target = task.args[1] if len(task.args) > 1 else "-"
-        else:
-            target = "-"
-        self.task_table.setItem(row, 3, QTableWidgetItem(target))
-        
-        # 状态
-        self.task_table.setItem(row, 4, QTableWidgetItem(self.get_status_name(task.status.name)))
-        
-        # 进度条
-        progress_bar = QProgressBar()
-        progress_bar.setRange(0, 100)
-        progress_bar.setValue(int(task.progress))
-        progress_bar.setTextVisible(True)
-        progress_bar.setFormat("%p%")
-        self.task_table.setCellWidget(row, 5, progress_bar)
-        
-        # 操作按钮
-        cancel_button = QPushButton("取消")
-        cancel_button.setProperty("task_id", task.id)
-        cancel_button.clicked.connect(lambda: self.cancel_task(task.id))
-        
-        self.task_table.setCellWidget(row, 6, cancel_button)
+        self.model.addTasks([task])
+    
+    def add_tasks(self, tasks):
+        """
+        批量添加任务到表格，只发出一次行插入通知
         
-        # 设置样色以标识任务状态
-        self.update_row_color(row, task.status)
+        Args:
+            tasks (list): 任务对象列表
+        """
+        self.model.addTasks(tasks)
     
     def update_task(self, task):
         """
-        更新任务状态
+        更新任务状态，只重绘任务所在行
         
         Args:
             task: TransferTask对象
         """
-        if task.id not in self.task_rows:
+        if not self.model.taskChanged(task):
             self.add_task(task)
-            return
-        
-        row = self.task_rows[task.id]
-        
-        # 更新状态
-        self.task_table.item(row, 4).setText(self.get_status_name(task.status.name))
-        
-        # 更新进度条
-        progress_bar = self.task_table.cellWidget(row, 5)
-        if progress_bar:
-            progress_bar.setValue(int(task.progress))
-        
-        # 更新行颜色
-        self.update_row_color(row, task.status)
-        
-        # 如果任务已完成或失败，禁用取消按钮
-        if task.status in [TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELED]:
-            cancel_button = self.task_table.cellWidget(row, 6)
-            if cancel_button:
-                cancel_button.setEnabled(False)
     
-    def update_row_color(self, row, status):
+    def queue_update(self, task):
         """
-        根据任务状态更新行颜色
+        记录任务更新，在下一个刷新周期统一重绘；新任务立即加入列表
         
         Args:
-            row: 行索引
-            status: 任务状态
+            task: TransferTask对象
         """
-        color = QColor(255, 255, 255)  # 默认白色
-        
-        if status == TaskStatus.RUNNING:
-            color = QColor(173, 216, 230)  # 淡蓝色
-        elif status == TaskStatus.COMPLETED:
-            color = QColor(144, 238, 144)  # 淡绿色
-        elif status == TaskStatus.FAILED:
-            color = QColor(255, 192, 203)  # 淡红色
-        elif status == TaskStatus.CANCELED:
-            color = QColor(211, 211, 211)  # 淡灰色
-        
-        for col in range(self.task_table.columnCount()):
-            item = self.task_table.item(row, col)
-            if item:
-                item.setBackground(color)
+        if not self.model.contains(task.id):
+            self.add_task(task)
+            return
+        self._pending[task.id] = task
+        if not self._flush_timer.isActive():
+            self._flush_timer.start()
+    
+    def _flush_updates(self):
+        """重绘本周期内有更新的任务行"""
+        pending = self._pending
+        self._pending = {}
+        self.model.tasksChanged(list(pending.values()))
     
     def get_status_name(self, status_name):
         """获取状态的中文名称"""
-        status_names = {
-            "PENDING": "等待中",
-            "RUNNING": "传输中",
-            "COMPLETED": "已完成",
-            "FAILED": "失败",
-            "CANCELED": "已取消",
-            "PAUSED": "已暂停",
-            "RETRYING": "重试中"
-        }
-        return status_names.get(status_name, status_name)
+        return STATUS_NAMES.get(status_name, status_name)
     
     def get_task_type_name(self, type_name):
         """获取任务类型的中文名称"""
-        type_names = {
-            "UPLOAD": "上传",
-            "DOWNLOAD": "下载",
-            "DELETE": "删除",
-            "RENAME": "重命名",
-            "MKDIR": "创建目录",
-            "RMDIR": "删除目录",
-            "LIST": "列表"
-        }
-        return type_names.get(type_name, type_name)
+        return TYPE_NAMES.get(type_name, type_name)
     
     def cancel_task(self, task_id):
         """取消任务"""
         reply = QMessageBox.question(
-            self, "确认取消", f"确定要取消任务 {task_id} 吗？", 
+            self, "确认取消", f"确定要取消任务 {task_id} 吗？",
             QMessageBox.Yes | QMessageBox.No, QMessageBox.No
         )
         
         if reply == QMessageBox.Yes:
             self.cancelRequested.emit(task_id)
-            
-            # 禁用取消按钮
-            if task_id in self.task_rows:
-                row = self.task_rows[task_id]
-                cancel_button = self.task_table.cellWidget(row, 6)
-                if cancel_button:
-                    cancel_button.setEnabled(False)
     
     def cancel_all_tasks(self):
         """取消所有任务"""
         reply = QMessageBox.question(
-            self, "确认取消", "确定要取消所有任务吗？", 
+            self, "确认取消", "确定要取消所有任务吗？",
             QMessageBox.Yes | QMessageBox.No, QMessageBox.No
         )
         
         if reply == QMessageBox.Yes:
-            for task_id in list(self.task_rows.keys()):
-                self.cancelRequested.emit(task_id)
+            # 一次性发出所有未结束的任务，由接收方统一加锁处理
+            tasks = map(self.model.task, range(self.model.rowCount()))
+            task_ids = [task.id for task in tasks if task.status.name not in _FINISHED_STATUSES]
+            if task_ids:
+                self.cancelManyRequested.emit(task_ids)
     
     def show_context_menu(self, position):
         """显示上下文菜单"""
+        index = self.task_table.indexAt(position)
+        if not index.isValid():
+            return
+        
+        # 右键所在行和所有选中行共用一个取消动作，已结束的任务不能取消
+        rows = {index.row()}
+        rows.update(selected.row() for selected in self.task_table.selectionModel().selectedRows())
+        task_ids = [self.model.task(row).id for row in sorted(rows)
+                    if self.model.task(row).status.name not in _FINISHED_STATUSES]
+        
         menu = QMenu(self)
-        cancel_action = menu.addAction("取消")
+        cancel_action = menu.addAction("取消" if len(task_ids) <= 1 else f"取消 {len(task_ids)} 个任务")
+        cancel_action.setEnabled(bool(task_ids))
         
         action = menu.exec_(self.task_table.viewport().mapToGlobal(position))
         
-        if action == cancel_action:
-            index = self.task_table.indexAt(position)
-            if index.isValid():
-                task_id = self.task_table.item(index.row(), 0).text()
-                self.cancel_task(task_id)
+        if action != cancel_action:
+            return
+        if len(task_ids) == 1:
+            self.cancel_task(task_ids[0])
+            return
+        reply = QMessageBox.question(
+            self, "确认取消", f"确定要取消选中的 {len(task_ids)} 个任务吗？",
+            QMessageBox.Yes | QMessageBox.No, QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            self.cancelManyRequested.emit(task_ids)
     
     def clear_completed_tasks(self):
         """清除已完成的任务"""
-        for row in range(self.task_table.rowCount() - 1, -1, -1):
-            status = self.task_table.item(row, 4).text()
-            if status in ["已完成", "已取消"]:
-                task_id = self.task_table.item(row, 0).text()
-                self.task_rows.pop(task_id, None)
-                self.task_table.removeRow(row)
+        self._flush_updates()
+        self.model.removeWhere(lambda task: task.status.name in _CLEARABLE_STATUSES)
     
     def update_status_label(self, active_count, pending_count, completed_count):
         """更新状态标签"""
@@ -10,95 +10,112 @@ import traceback
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, BASE_DIR)  # 使用insert(0, ...)确保优先搜索
 
-# 打印调试信息
-print(f"项目根目录: {BASE_DIR}")
-print(f"Python路径: {sys.path}")
-print(f"当前工作目录: {os.getcwd()}")
-
-# 确保配置目录存在
-config_dir = os.path.join(BASE_DIR, 'config')
-if not os.path.exists(config_dir):
-    try:
-        os.makedirs(config_dir, exist_ok=True)
-        print(f"已创建配置目录: {config_dir}")
-    except Exception as e:
-        print(f"无法创建配置目录: {e}")
+# 默认客户端配置
+DEFAULT_CLIENT_CONFIG = {
+    "default_host": "localhost",
+    "default_port": 2121,
+    "enable_ssl": True,
+    "timeout": 30,
+    "retry_count": 3,
+    "retry_delay": 5,
+    "max_concurrent_transfers": 3,
+    "log_level": "INFO"
+}
 
-# 检查common目录是否存在且可访问
-common_dir = os.path.join(BASE_DIR, 'common')
-print(f"common目录是否存在: {os.path.exists(common_dir)}")
-if os.path.exists(common_dir):
-    print(f"common目录内容: {os.listdir(common_dir)}")
+def _ensure_client_config(config_dir):
+    """
+    确保配置目录和默认客户端配置存在，仅在缺失时写入
+
+    Args:
+        config_dir: 配置目录
+    """
+    if not os.path.exists(config_dir):
+        try:
+            os.makedirs(config_dir, exist_ok=True)
+            print(f"已创建配置目录: {config_dir}")
+        except Exception as e:
+            print(f"无法创建配置目录: {e}")
+            return
 
-try:
-    # 创建默认客户端配置
     client_config_path = os.path.join(config_dir, 'client_config.json')
-    if not os.path.exists(client_config_path):
-        print(f"创建默认客户端配置: {client_config_path}")
-        import json
-        default_config = {
-            "default_host": "localhost",
-            "default_port": 2121,
-            "enable_ssl": True,
-            "timeout": 30,
-            "retry_count": 3,
-            "retry_delay": 5,
-            "max_concurrent_transfers": 3,
-            "log_level": "INFO"
-        }
-        with open(client_config_path, 'w') as f:
-            json.dump(default_config, f, indent=4)
-    
+    if os.path.exists(client_config_path):
+        return
+
+    print(f"创建默认客户端配置: {client_config_path}")
+    import json
+    with open(client_config_path, 'w') as f:
+        json.dump(DEFAULT_CLIENT_CONFIG, f, indent=4)
+
+def _bootstrap():
+    """
+    启动前的准备工作：创建配置、初始化日志并记录调试信息
+
+    Returns:
+        logging.Logger: 入口模块的日志记录器
+    """
+    _ensure_client_config(os.path.join(BASE_DIR, 'config'))
+
     # 立即初始化日志系统
     from common.logger import setup_logging
     setup_logging()
     logger = logging.getLogger(__name__)
-    
-    # 将Qt相关导入放在日志初始化之后
-    from PyQt5.QtWidgets import QApplication
-    from PyQt5.QtCore import QDir, QCoreApplication, Qt
-    
-    # 设置应用程序属性防止冻结
-    QCoreApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
-    QCoreApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
-    
-    from client.gui.main_window import MainWindow, register_meta_types
-    
-    def main():
-        """主函数"""
-        try:
-            # 注册元类型
-            register_meta_types()
-            
-            # 创建应用程序
-            app = QApplication(sys.argv)
-            app.setApplicationName("NewFTP客户端")
-            
-            # 设置组织信息用于QSettings
-            app.setOrganizationName("NewFTP")
-            app.setOrganizationDomain("newftp.example.com")
-            
-            # 设置样式表
-            app.setStyle("Fusion")
-            
-            # 创建主窗口
-            main_window = MainWindow()
-            main_window.show()
-            
-            # 运行应用程序
-            sys.exit(app.exec_())
-            
-        except Exception as e:
-            logger.exception(f"应用程序启动失败: {str(e)}")
-            print(f"错误: {str(e)}")
-            print(f"调用堆栈: {traceback.format_exc()}")
-            sys.exit(1)
-    
-    if __name__ == "__main__":
-        main()
-except ImportError as e:
-    print(f"导入错误: {e}")
-    print(f"Python版本: {sys.version}")
-    print(f"Python可执行文件: {sys.executable}")
-    print(f"调用堆栈: {traceback.format_exc()}")
-    sys.exit(1)
+
+    # 记录调试信息
+    logger.debug(f"项目根目录: {BASE_DIR}")
+    logger.debug(f"Python路径: {sys.path}")
+    logger.debug(f"当前工作目录: {os.getcwd()}")
+    common_dir = os.path.join(BASE_DIR, 'common')
+    logger.debug(f"common目录是否存在: {os.path.exists(common_dir)}")
+
+    return logger
+
+def main():
+    """主函数"""
+    try:
+        logger = _bootstrap()
+
+        # Qt相关导入放在日志初始化之后，仅在真正启动界面时加载
+        from PyQt5.QtWidgets import QApplication
+        from PyQt5.QtCore import QCoreApplication, Qt
+        from client.gui.main_window import MainWindow, register_meta_types
+    except ImportError as e:
+        print(f"导入错误: {e}")
+        print(f"Python版本: {sys.version}")
+        print(f"Python可执行文件: {sys.executable}")
+        print(f"调用堆栈: {traceback.format_exc()}")
+        sys.exit(1)
+
+    try:
+        # 设置应用程序属性防止冻结
+        QCoreApplication.setAttribute(Qt.AA_EnableHighDpiScaling, True)
+        QCoreApplication.setAttribute(Qt.AA_UseHighDpiPixmaps, True)
+
+        # 注册元类型
+        register_meta_types()
+
+        # 创建应用程序
+        app = QApplication(sys.argv)
+        app.setApplicationName("NewFTP客户端")
+
+        # 设置组织信息用于QSettings
+        app.setOrganizationName("NewFTP")
+        app.setOrganizationDomain("newftp.example.com")
+
+        # 设置样式表
+        app.setStyle("Fusion")
+
+        # 创建主窗口
+        main_window = MainWindow()
+        main_window.show()
+
+        # 运行应用程序
+        sys.exit(app.exec_())
+
+    except Exception as e:
+        logger.exception(f"应用程序启动失败: {str(e)}")
+        print(f"错误: {str(e)}")
+        print(f"调用堆栈: {traceback.format_exc()}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
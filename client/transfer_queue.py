@@ -1,11 +1,15 @@
 import os
+import sys
 import time
-import queue
+import heapq
 import threading
 import logging
+from collections import OrderedDict
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum, auto
-from dataclasses import dataclass
-from datetime import datetime
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
 from typing import Callable, Optional, Dict, List, Any
 
 from common.exceptions import QueueError, FileTransferError
@@ -40,7 +44,10 @@ class TaskType(Enum):
     RMDIR = auto()      # 删除目录
     LIST = auto()       # 列表
 
-@dataclass
+# Python 3.10起dataclass支持slots，任务对象不再携带__dict__
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_DATACLASS_OPTIONS)
 class TransferTask:
     """传输任务定义"""
     # 基本属性
@@ -52,9 +59,9 @@ class TransferTask:
     
     # 状态跟踪
     status: TaskStatus = TaskStatus.PENDING       # 任务状态
-    created_time: datetime = None                 # 创建时间
-    start_time: Optional[datetime] = None         # 开始时间
-    end_time: Optional[datetime] = None           # 结束时间
+    created_time: float = None                    # 创建时间(time.monotonic)
+    start_time: Optional[float] = None            # 开始时间(time.monotonic)
+    end_time: Optional[float] = None              # 结束时间(time.monotonic)
     progress: float = 0                           # 进度(0-100)
     error: Optional[Exception] = None             # 错误信息
     result: Any = None                            # 任务结果
@@ -69,10 +76,25 @@ class TransferTask:
     on_complete: Optional[Callable] = None        # 完成回调
     on_error: Optional[Callable] = None           # 错误回调
     
+    # 创建时的墙上时间，仅用于显示
+    created_wall: datetime = field(default=None, init=False, repr=False, compare=False)
+    
+    # 进度换算：总量变化时才重新计算比例
+    _progress_total: int = field(default=0, init=False, repr=False, compare=False)
+    _progress_scale: float = field(default=0.0, init=False, repr=False, compare=False)
+    
+    # 上次触发进度回调时的整数百分比和时间
+    _emitted_percent: int = field(default=-1, init=False, repr=False, compare=False)
+    _emitted_at: float = field(default=0.0, init=False, repr=False, compare=False)
+    
+    # 进度回调节流：整数百分比未变且距上次回调不足0.1秒时不触发
+    PROGRESS_MIN_INTERVAL = 0.1
+    
     def __post_init__(self):
         """初始化后处理"""
         if self.created_time is None:
-            self.created_time = datetime.now()
+            self.created_time = time.monotonic()
+        self.created_wall = datetime.now()
     
     def update_progress(self, current: int, total: int, elapsed: float):
         """
@@ -83,23 +105,36 @@ class TransferTask:
             total: 总量
             elapsed: 已用时间(秒)
         """
-        if total > 0:
-            self.progress = min(100.0, (current / total) * 100)
+        if total != self._progress_total:
+            self._progress_total = total
+            self._progress_scale = 100.0 / total if total > 0 else 0.0
+        
+        if current < total:
+            self.progress = current * self._progress_scale
         else:
-            self.progress = 0
+            self.progress = 100.0 if total > 0 else 0
             
-        if self.on_progress:
-            self.on_progress(self, current, total, elapsed)
+        if not self.on_progress:
+            return
+        
+        # 传输很快时每秒可能更新数百次，只在整数百分比变化或间隔足够长时回调
+        percent = int(self.progress)
+        now = time.monotonic()
+        if percent == self._emitted_percent and now - self._emitted_at < self.PROGRESS_MIN_INTERVAL:
+            return
+        self._emitted_percent = percent
+        self._emitted_at = now
+        self.on_progress(self, current, total, elapsed)
     
     def mark_running(self):
         """标记任务为运行中"""
         self.status = TaskStatus.RUNNING
-        self.start_time = datetime.now()
+        self.start_time = time.monotonic()
     
     def mark_completed(self, result=None):
         """标记任务为已完成"""
         self.status = TaskStatus.COMPLETED
-        self.end_time = datetime.now()
+        self.end_time = time.monotonic()
         self.result = result
         self.progress = 100.0
         
@@ -109,7 +144,7 @@ class TransferTask:
     def mark_failed(self, error=None):
         """标记任务为失败"""
         self.status = TaskStatus.FAILED
-        self.end_time = datetime.now()
+        self.end_time = time.monotonic()
         self.error = error
         
         if self.on_error:
@@ -118,7 +153,7 @@ class TransferTask:
     def mark_canceled(self):
         """标记任务为已取消"""
         self.status = TaskStatus.CANCELED
-        self.end_time = datetime.now()
+        self.end_time = time.monotonic()
     
     def mark_paused(self):
         """标记任务为已暂停"""
@@ -135,13 +170,27 @@ class TransferTask:
         if not self.start_time:
             return 0
             
-        end = self.end_time if self.end_time else datetime.now()
-        return (end - self.start_time).total_seconds()
+        end = self.end_time if self.end_time else time.monotonic()
+        return end - self.start_time
     
     @property
     def age(self) -> float:
         """获取任务年龄(从创建至今)"""
-        return (datetime.now() - self.created_time).total_seconds()
+        return time.monotonic() - self.created_time
+    
+    def _isoformat(self, timestamp: Optional[float]) -> Optional[str]:
+        """
+        将单调时间戳换算为墙上时间字符串
+        
+        Args:
+            timestamp: time.monotonic()时间戳
+            
+        Returns:
+            str: ISO格式时间，时间戳为空时返回None
+        """
+        if timestamp is None:
+            return None
+        return (self.created_wall + timedelta(seconds=timestamp - self.created_time)).isoformat()
     
     def can_retry(self) -> bool:
         """检查任务是否可以重试"""
@@ -155,58 +204,70 @@ class TransferTask:
             'type': self.type.name,
             'status': self.status.name,
             'progress': self.progress,
-            'created': self.created_time.isoformat() if self.created_time else None,
-            'started': self.start_time.isoformat() if self.start_time else None,
-            'ended': self.end_time.isoformat() if self.end_time else None,
+            'created': self._isoformat(self.created_time),
+            'started': self._isoformat(self.start_time),
+            'ended': self._isoformat(self.end_time),
             'duration': self.duration,
             'retry_count': self.retry_count,
             'error': str(self.error) if self.error else None,
             'priority': self.priority.name,
         }
 
+class _LRUDict(OrderedDict):
+    """按插入顺序保存、超出容量时淘汰最早条目的字典"""
+    
+    def __init__(self, *args, max_size=1000, **kwargs):
+        """
+        初始化字典
+        
+        Args:
+            max_size: 最大条目数
+        """
+        self._max = max_size
+        super().__init__(*args, **kwargs)
+    
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        while len(self) > self._max:
+            self.popitem(last=False)
+
 class TransferQueue:
     """传输队列管理器"""
     
-    def __init__(self, max_concurrent_tasks=3, auto_retry=True):
+    def __init__(self, max_concurrent_tasks=3, auto_retry=True, max_history=1000):
         """
         初始化传输队列
         
         Args:
             max_concurrent_tasks: 最大并发任务数
             auto_retry: 是否自动重试失败任务
+            max_history: 已完成和失败任务各自保留的最大数量
         """
-        self.task_queue = queue.PriorityQueue()     # 任务优先队列
+        self._heap = []                             # 任务堆 [(-优先级, 序号, 任务), ...]
+        self._delayed = []                          # 等待重试的任务堆 [(可执行时间, 序号, 任务), ...]
+        self._queued = {}                           # 排队中的任务 {id: task}
+        self._canceled_ids = set()                  # 已取消但仍在堆中的任务ID，出堆时丢弃
+        self._seq = 0                               # 入队序号，同优先级按入队顺序执行
+        self._unfinished = 0                        # 已入队但尚未处理完的任务数
+        self._running = 0                           # 已提交给线程池的任务数
+        self._retry_timers = set()                  # 等待重试到期的定时器
         self.active_tasks = {}                      # 活动任务 {id: task}
-        self.completed_tasks = {}                   # 已完成任务 {id: task}
-        self.failed_tasks = {}                      # 失败任务 {id: task}
+        self.completed_tasks = _LRUDict(max_size=max_history)   # 已完成任务 {id: task}，超出上限淘汰最早的
+        self.failed_tasks = _LRUDict(max_size=max_history)      # 失败任务 {id: task}，超出上限淘汰最早的
         self.max_concurrent_tasks = max_concurrent_tasks
         self.auto_retry = auto_retry
         self.shutdown_flag = threading.Event()      # 关闭标志
-        self.task_added_event = threading.Event()   # 任务添加事件
         
-        # 工作线程
-        self._worker_threads = []
         self._lock = threading.RLock()
+        # shutdown在此等待所有任务处理完
+        self._cond = threading.Condition(self._lock)
         self._task_id_counter = 0
         
-        # 启动工作线程
-        for i in range(max_concurrent_tasks):
-            t = threading.Thread(
-                target=self._worker, 
-                name=f"TransferWorker-{i}",
-                daemon=True
-            )
-            self._worker_threads.append(t)
-            t.start()
-        
-        # 启动重试线程
-        if auto_retry:
-            self._retry_thread = threading.Thread(
-                target=self._retry_worker,
-                name="RetryWorker",
-                daemon=True
-            )
-            self._retry_thread.start()
+        # 任务按优先级从堆中取出，仅在有空闲名额时提交给线程池
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_tasks,
+            thread_name_prefix="TransferWorker"
+        )
         
         logger.info(f"传输队列已初始化，最大并发任务数: {max_concurrent_tasks}, 自动重试: {auto_retry}")
     
@@ -249,95 +310,128 @@ class TransferQueue:
         )
         
         # 添加到队列
-        # 使用负优先级值是因为PriorityQueue是按照优先级从小到大排序
-        self.task_queue.put((-task.priority.value, task.created_time, task))
-        
-        # 通知有新任务
-        self.task_added_event.set()
+        self._push(task)
         
-        logger.debug(f"已添加任务 {task_id} 类型: {task_type.name}, 优先级: {priority.name}")
+        logger.debug("已添加任务 %s 类型: %s, 优先级: %s", task_id, task_type.name, priority.name)
         return task_id
     
-    def _worker(self):
-        """工作线程，处理队列任务"""
-        while not self.shutdown_flag.is_set():
-            try:
-                # 等待任务 (带有0.5秒超时)
-                try:
-                    _, _, task = self.task_queue.get(timeout=0.5)
-                except queue.Empty:
-                    continue
-                
-                # 检查任务是否被取消
-                if task.status == TaskStatus.CANCELED:
-                    logger.debug(f"跳过已取消的任务: {task.id}")
-                    self.task_queue.task_done()
-                    continue
-                
-                # 更新任务状态
-                with self._lock:
-                    task.mark_running()
-                    self.active_tasks[task.id] = task
-                
-                logger.info(f"开始执行任务: {task.id} 类型: {task.type.name}")
-                
-                try:
-                    # 将任务交给具体处理方法执行
-                    handler_method = self._get_task_handler(task.type)
-                    result = handler_method(task)
-                    
-                    # 任务成功完成
-                    with self._lock:
-                        task.mark_completed(result)
-                        self.completed_tasks[task.id] = task
-                        self.active_tasks.pop(task.id, None)
-                        
-                    logger.info(f"任务完成: {task.id} 类型: {task.type.name}")
-                    
-                except Exception as e:
-                    # 任务执行失败
-                    with self._lock:
-                        task.mark_failed(e)
-                        self.failed_tasks[task.id] = task
-                        self.active_tasks.pop(task.id, None)
-                        
-                    logger.error(f"任务失败: {task.id} 类型: {task.type.name}, 错误: {e}")
-                
-                finally:
-                    self.task_queue.task_done()
-                    
-            except Exception as e:
-                logger.exception(f"工作线程异常: {e}")
-    
-    def _retry_worker(self):
-        """重试线程，处理失败的任务"""
-        while not self.shutdown_flag.is_set():
-            try:
-                # 每5秒检查一次
-                time.sleep(5)
+    def _push(self, task):
+        """
+        将任务加入堆，有空闲名额时立即提交执行
+        
+        Args:
+            task: 任务对象
+        """
+        with self._lock:
+            # 使用负优先级值是因为heapq按从小到大排序；序号保证同优先级先进先出
+            self._seq += 1
+            heapq.heappush(self._heap, (-task.priority.value, self._seq, task))
+            self._queued[task.id] = task
+            self._unfinished += 1
+            self._dispatch()
+    
+    def _schedule_retry(self, task):
+        """
+        将失败任务放入重试堆，到期后由定时器触发调度，调用方需持有锁
+        
+        Args:
+            task: 任务对象
+        """
+        task.mark_retrying()
+        self._seq += 1
+        heapq.heappush(self._delayed, (time.monotonic() + task.retry_delay, self._seq, task))
+        self._queued[task.id] = task
+        self._unfinished += 1
+        
+        timer = threading.Timer(task.retry_delay, self._on_retry_due)
+        timer.daemon = True
+        timer.args = (timer,)
+        self._retry_timers.add(timer)
+        timer.start()
+        logger.info("重试任务: %s 类型: %s, 第 %d 次重试, %s 秒后执行",
+                    task.id, task.type.name, task.retry_count, task.retry_delay)
+    
+    def _on_retry_due(self, timer):
+        """重试定时器到期，调度已到期的重试任务"""
+        with self._lock:
+            self._retry_timers.discard(timer)
+            self._dispatch()
+    
+    def _promote_due_retries(self):
+        """将已到期的重试任务移入任务堆，调用方需持有锁"""
+        now = time.monotonic()
+        while self._delayed and self._delayed[0][0] <= now:
+            _, seq, task = heapq.heappop(self._delayed)
+            heapq.heappush(self._heap, (-task.priority.value, seq, task))
+    
+    def _task_done(self):
+        """标记一个出堆的任务已处理完，调用方需持有锁"""
+        self._unfinished -= 1
+        if self._unfinished == 0:
+            self._cond.notify_all()
+    
+    def _dispatch(self):
+        """按优先级把任务提交给线程池，直到没有空闲名额，调用方需持有锁"""
+        if self.shutdown_flag.is_set():
+            return
+        self._promote_due_retries()
+        
+        while self._heap and self._running < self.max_concurrent_tasks:
+            _, _, task = heapq.heappop(self._heap)
+            self._queued.pop(task.id, None)
+            
+            # 丢弃已取消的任务
+            if task.id in self._canceled_ids:
+                self._canceled_ids.discard(task.id)
+                logger.debug("跳过已取消的任务: %s", task.id)
+                self._task_done()
+                continue
+            
+            # 更新任务状态
+            task.mark_running()
+            self.active_tasks[task.id] = task
+            self._running += 1
+            self._executor.submit(self._run_task, task)
+    
+    def _run_task(self, task):
+        """
+        在线程池中执行任务，结束后记录结果并调度下一个任务
+        
+        Args:
+            task: 任务对象
+        """
+        logger.info("开始执行任务: %s 类型: %s", task.id, task.type.name)
+        
+        try:
+            # 将任务交给具体处理方法执行
+            handler_method = self._get_task_handler(task.type)
+            result = handler_method(task)
+            
+            # 任务成功完成
+            with self._lock:
+                task.mark_completed(result)
+                self.completed_tasks[task.id] = task
+                self.active_tasks.pop(task.id, None)
                 
-                # 检查有无需要重试的任务
-                retry_tasks = []
-                with self._lock:
-                    for task_id, task in list(self.failed_tasks.items()):
-                        if task.can_retry():
-                            retry_tasks.append(task)
-                            self.failed_tasks.pop(task_id)
+            logger.info("任务完成: %s 类型: %s", task.id, task.type.name)
+            
+        except Exception as e:
+            # 任务执行失败
+            with self._lock:
+                task.mark_failed(e)
+                self.active_tasks.pop(task.id, None)
+                if self.auto_retry and task.can_retry():
+                    self._schedule_retry(task)
+                else:
+                    self.failed_tasks[task.id] = task
                 
-                # 重新提交需要重试的任务
-                for task in retry_tasks:
-                    task.mark_retrying()
-                    logger.info(f"重试任务: {task.id} 类型: {task.type.name}, 第 {task.retry_count} 次重试")
-                    
-                    # 等待重试延迟
-                    time.sleep(task.retry_delay)
-                    
-                    # 重新添加到队列
-                    self.task_queue.put((-task.priority.value, task.created_time, task))
-                    self.task_added_event.set()
-                    
-            except Exception as e:
-                logger.exception(f"重试线程异常: {e}")
+            logger.error(f"任务失败: {task.id} 类型: {task.type.name}, 错误: {e}")
+        
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._task_done()
+                self._dispatch()
     
     def _get_task_handler(self, task_type):
         """
@@ -366,29 +460,66 @@ class TransferQueue:
             bool: 是否成功取消
         """
         with self._lock:
-            # 检查活动任务
-            if task_id in self.active_tasks:
-                logger.warn(f"无法取消正在执行的任务: {task_id}")
-                return False
+            return self._cancel_locked(task_id)
+    
+    def cancel_tasks(self, task_ids):
+        """
+        批量取消任务，只获取一次锁
+        
+        Args:
+            task_ids: 任务ID列表
             
-            # 检查失败任务
-            if task_id in self.failed_tasks:
-                task = self.failed_tasks.pop(task_id)
-                task.mark_canceled()
-                self.completed_tasks[task_id] = task
-                logger.info(f"已取消失败任务: {task_id}")
-                return True
+        Returns:
+            list: 成功取消的任务ID
+        """
+        with self._lock:
+            return [task_id for task_id in task_ids if self._cancel_locked(task_id)]
+    
+    def _cancel_locked(self, task_id):
+        """
+        取消单个任务，调用方需持有锁
+        
+        Args:
+            task_id: 任务ID
             
-            # 检查已完成任务
-            if task_id in self.completed_tasks:
-                logger.warn(f"无法取消已完成的任务: {task_id}")
-                return False
-        
-        # 任务可能还在队列中
-        # 由于PriorityQueue不支持直接删除或修改元素
-        # 我们只能在worker线程中跳过已取消的任务
-        # 在这里标记任务为已取消并返回True
-        logger.info(f"标记队列中的任务为取消: {task_id}")
+        Returns:
+            bool: 是否成功取消
+        """
+        # 检查活动任务
+        if task_id in self.active_tasks:
+            logger.warning("无法取消正在执行的任务: %s", task_id)
+            return False
+        
+        # 检查失败任务
+        if task_id in self.failed_tasks:
+            task = self.failed_tasks.pop(task_id)
+            task.mark_canceled()
+            self.completed_tasks[task_id] = task
+            logger.info("已取消失败任务: %s", task_id)
+            return True
+        
+        # 检查已完成任务
+        if task_id in self.completed_tasks:
+            logger.warning("无法取消已完成的任务: %s", task_id)
+            return False
+        
+        task = self._queued.pop(task_id, None)
+        if task is None:
+            logger.warning("任务不存在: %s", task_id)
+            return False
+        
+        delayed = [entry for entry in self._delayed if entry[2] is not task]
+        if len(delayed) < len(self._delayed):
+            # 等待重试的任务直接移出重试堆，否则shutdown要等到其定时器到期才能返回
+            self._delayed = delayed
+            heapq.heapify(self._delayed)
+            self._task_done()
+        else:
+            # 队列中的任务留在堆中，调度出堆时丢弃
+            self._canceled_ids.add(task_id)
+        task.mark_canceled()
+        self.completed_tasks[task_id] = task
+        logger.info("已取消队列中的任务: %s", task_id)
         return True
     
     def get_task_status(self, task_id):
@@ -411,12 +542,55 @@ class TransferQueue:
                 
             if task_id in self.failed_tasks:
                 return self.failed_tasks[task_id]
+            
+            return self._queued.get(task_id)
+    
+    @property
+    def queue_size(self):
+        """排队中(含等待重试)的任务数"""
+        return len(self._queued)
+    
+    def get_active_tasks(self):
+        """
+        获取正在执行的任务
+        
+        Returns:
+            list: 任务对象列表
+        """
+        with self._lock:
+            return list(self.active_tasks.values())
+    
+    def get_completed_tasks(self, limit=100, offset=0):
+        """
+        分页获取已完成的任务，最近结束的在前
+        
+        Args:
+            limit: 最多返回的任务数
+            offset: 跳过的任务数
+            
+        Returns:
+            list: 任务对象列表
+        """
+        with self._lock:
+            return list(islice(reversed(self.completed_tasks.values()), offset, offset + limit))
+    
+    def get_failed_tasks(self, limit=100, offset=0):
+        """
+        分页获取失败的任务，最近失败的在前
         
-        return None
+        Args:
+            limit: 最多返回的任务数
+            offset: 跳过的任务数
+            
+        Returns:
+            list: 任务对象列表
+        """
+        with self._lock:
+            return list(islice(reversed(self.failed_tasks.values()), offset, offset + limit))
     
     def get_all_tasks(self):
         """
-        获取所有任务状态
+        获取所有任务状态，会为每个任务生成字典，仅用于导出或序列化
         
         Returns:
             dict: 所有任务状态
@@ -440,10 +614,10 @@ class TransferQueue:
             # 失败任务
             for task_id, task in self.failed_tasks.items():
                 result['failed'][task_id] = task.to_dict()
-        
-        # 无法直接查看队列中的所有元素
-        # 但可以获取队列大小
-        result['queue_size'] = self.task_queue.qsize()
+            
+            # 排队中的任务
+            result['queued'] = [task.to_dict() for task in self._queued.values()]
+            result['queue_size'] = len(self._queued)
         
         return result
     
@@ -457,15 +631,17 @@ class TransferQueue:
         Returns:
             int: 清理的任务数量
         """
-        now = time.time()
+        cutoff = time.monotonic() - older_than
         count = 0
         
         with self._lock:
-            for task_id in list(self.completed_tasks.keys()):
-                task = self.completed_tasks[task_id]
-                if task.end_time and (now - task.end_time.timestamp()) > older_than:
-                    self.completed_tasks.pop(task_id)
-                    count += 1
+            # 任务按结束顺序插入，从最早的一端弹出直到遇到较新的任务
+            while self.completed_tasks:
+                task = next(iter(self.completed_tasks.values()))
+                if task.end_time is None or task.end_time >= cutoff:
+                    break
+                self.completed_tasks.popitem(last=False)
+                count += 1
         
         logger.info(f"已清理 {count} 个已完成任务")
         return count
@@ -477,17 +653,18 @@ class TransferQueue:
         Args:
             wait: 是否等待所有任务完成
         """
-        if wait:
-            self.task_queue.join()
+        with self._cond:
+            if wait:
+                while self._unfinished:
+                    self._cond.wait()
             
-        self.shutdown_flag.set()
-        
-        for thread in self._worker_threads:
-            if thread.is_alive():
-                thread.join(timeout=1.0)
+            self.shutdown_flag.set()
+            for timer in self._retry_timers:
+                timer.cancel()
+            self._retry_timers.clear()
         
-        if hasattr(self, '_retry_thread') and self._retry_thread.is_alive():
-            self._retry_thread.join(timeout=1.0)
+        # 正在执行的任务不会被中断，未提交的任务随队列一起丢弃
+        self._executor.shutdown(wait=wait)
             
         logger.info("传输队列已关闭")
     
@@ -1,7 +1,11 @@
 import json
 import os
+import time
 import logging
 from pathlib import Path
+from types import MappingProxyType
+
+from common import json_compat
 
 class Config:
     """配置管理类，负责加载和提供配置项访问"""
@@ -33,6 +37,11 @@ class Config:
         self.config_file = Path(config_file)
         self.config = {}
         self.last_modified = 0
+        # 配置内容每次变化时递增，持有快照的调用方据此判断是否过期
+        self.version = 0
+        # reload_if_modified两次检查文件的最小间隔(秒)
+        self._last_check = 0.0
+        self._min_check_interval = 1.0
         self.load_config()
         
     def load_config(self):
@@ -55,17 +64,20 @@ class Config:
                 return False
                 
             logging.info(f"正在加载配置文件: {self.config_file}")
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
+            raw = self.config_file.read_bytes()
+            if b'//' not in raw:
+                # 没有注释时直接解析原始字节
+                self.config = json_compat.loads(raw)
+            else:
                 # 处理可能的JSON注释(以//开头的行)
-                lines = [line for line in content.splitlines() if not line.strip().startswith('//')]
-                clean_content = '\n'.join(lines)
-                self.config = json.loads(clean_content)
+                lines = [line for line in raw.decode('utf-8').splitlines() if not line.strip().startswith('//')]
+                self.config = json_compat.loads('\n'.join(lines))
                 
             self.last_modified = current_mtime
+            self.version += 1
             logging.info(f"成功加载配置文件: {self.config_file}")
             return True
-        except json.JSONDecodeError as e:
+        except json.JSONDecodeError as e:  # orjson.JSONDecodeError也是其子类
             logging.error(f"配置文件格式错误: {e}")
             return False
         except Exception as e:
@@ -96,9 +108,10 @@ class Config:
             
             # 写入默认配置
             with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(default_config, f, indent=4)
+                json_compat.dump(default_config, f)
             
             self.config = default_config
+            self.version += 1
             self.last_modified = os.path.getmtime(self.config_file)
             logging.info(f"已创建默认配置文件: {self.config_file}")
             return True
@@ -107,7 +120,19 @@ class Config:
             return False
     
     def reload_if_modified(self):
-        """如果文件被修改则重新加载"""
+        """
+        如果文件被修改则重新加载
+        
+        距上次检查不足_min_check_interval秒时直接返回，不查询文件；
+        需要立即重新加载时调用load_config。
+        
+        Returns:
+            bool: 是否重新加载了配置
+        """
+        now = time.monotonic()
+        if now - self._last_check < self._min_check_interval:
+            return False
+        self._last_check = now
         return self.load_config()
     
     def get(self, key, default=None):
@@ -132,6 +157,19 @@ class Config:
             value: 配置项的值
         """
         self.config[key] = value
+        self.version += 1
+    
+    def snapshot(self):
+        """
+        获取当前配置的只读快照
+        
+        高频读取配置的循环可以先取快照并记下version，
+        之后只在version变化时重新获取。
+        
+        Returns:
+            MappingProxyType: 只读的配置映射
+        """
+        return MappingProxyType(self.config.copy())
     
     def save(self):
         """保存配置到文件"""
@@ -140,7 +178,7 @@ class Config:
             self.config_file.parent.mkdir(parents=True, exist_ok=True)
             
             with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=4)
+                json_compat.dump(self.config, f)
                 
             self.last_modified = os.path.getmtime(self.config_file)
             logging.info(f"成功保存配置到: {self.config_file}")
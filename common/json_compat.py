@@ -0,0 +1,69 @@
+"""JSON读写，安装了orjson时使用orjson加速，否则使用标准库json"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson为可选依赖，未安装时使用标准库json
+    orjson = None
+
+# 写入文件时的缩进，orjson只支持2个空格缩进，两种实现统一使用该格式
+INDENT = 2
+
+def loads(data):
+    """
+    解析JSON
+
+    Args:
+        data (str|bytes): JSON字符串或UTF-8字节
+
+    Returns:
+        解析后的对象
+
+    Raises:
+        json.JSONDecodeError: JSON格式错误（orjson.JSONDecodeError也是其子类）
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(obj):
+    """
+    将对象序列化为紧凑的JSON字符串
+
+    Args:
+        obj: 要序列化的对象
+
+    Returns:
+        str: JSON字符串
+    """
+    if orjson is not None:
+        return orjson.dumps(obj).decode('utf-8')
+    return json.dumps(obj)
+
+def dumps_bytes(obj):
+    """
+    将对象序列化为紧凑的UTF-8 JSON字节
+
+    Args:
+        obj: 要序列化的对象
+
+    Returns:
+        bytes: JSON字节
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+def dump(obj, f):
+    """
+    将对象以缩进格式写入文本文件
+
+    Args:
+        obj: 要序列化的对象
+        f: 以文本模式打开的文件对象
+    """
+    if orjson is not None:
+        f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8'))
+    else:
+        json.dump(obj, f, indent=INDENT)
@@ -1,10 +1,22 @@
 import os
 import json
+import time
+import queue
+import atexit
 import logging
 import logging.config
-from datetime import datetime
+import logging.handlers
 from pathlib import Path
 
+from common import json_compat
+
+# JSON日志中附加的审计字段，记录中存在时才输出
+_EXTRA_FIELDS = ('ip', 'user', 'operation', 'duration', 'status')
+_MISSING = object()
+
+# 审计日志后台写入线程，由setup_logging创建
+_audit_listener = None
+
 def setup_logging(config_path=None, default_level=logging.INFO, log_dir=None):
     """
     配置日志系统
@@ -77,7 +89,7 @@ def setup_logging(config_path=None, default_level=logging.INFO, log_dir=None):
                 'encoding': 'utf8'
             },
             'json_file': {
-                'class': 'logging.handlers.RotatingFileHandler',
+                '()': 'common.logger.FastRotatingBytesHandler',
                 'level': 'INFO',
                 'formatter': 'json',
                 'filename': str(log_dir / "ftp_audit_json.log"),
@@ -101,12 +113,59 @@ def setup_logging(config_path=None, default_level=logging.INFO, log_dir=None):
     }
     
     logging.config.dictConfig(logging_config)
+    _start_audit_listener()
     
     return logging.getLogger()
 
+def _start_audit_listener():
+    """
+    将审计日志的处理器移到后台线程，记录日志时只需放入内存队列，
+    JSON格式化和磁盘写入都不会阻塞FTP命令
+    """
+    global _audit_listener
+    _stop_audit_listener()
+    
+    audit = logging.getLogger('ftp.audit')
+    handlers = audit.handlers[:]
+    for handler in handlers:
+        audit.removeHandler(handler)
+    
+    log_queue = queue.Queue(-1)
+    audit.addHandler(logging.handlers.QueueHandler(log_queue))
+    _audit_listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _audit_listener.start()
+
+@atexit.register
+def _stop_audit_listener():
+    """停止审计日志后台线程，写完队列中剩余的记录"""
+    global _audit_listener
+    if _audit_listener is not None:
+        _audit_listener.stop()
+        _audit_listener = None
+
 class JsonFormatter(logging.Formatter):
     """JSON格式日志格式化器"""
     
+    # 最近一次格式化的整秒及其"年-月-日T时:分:秒"前缀，同一秒内的记录直接复用
+    _second_prefix = (None, '')
+    
+    def _timestamp(self, created):
+        """
+        将记录时间格式化为ISO 8601本地时间，精确到微秒
+        
+        Args:
+            created (float): 记录创建时间(time.time())
+            
+        Returns:
+            str: 时间字符串
+        """
+        seconds = int(created)
+        cached_second, prefix = self._second_prefix
+        if seconds != cached_second:
+            prefix = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(seconds))
+            self._second_prefix = (seconds, prefix)
+        return f"{prefix}.{int((created - seconds) * 1000000):06d}"
+    
     def format(self, record):
         """
         将日志记录格式化为JSON
@@ -117,8 +176,32 @@ class JsonFormatter(logging.Formatter):
         Returns:
             str: JSON格式的日志
         """
+        return json_compat.dumps(self._record_data(record))
+    
+    def format_bytes(self, record):
+        """
+        将日志记录格式化为UTF-8编码的JSON字节，供直接写字节的处理器使用
+        
+        Args:
+            record: 日志记录
+            
+        Returns:
+            bytes: JSON格式的日志
+        """
+        return json_compat.dumps_bytes(self._record_data(record))
+    
+    def _record_data(self, record):
+        """
+        提取日志记录中要输出的字段
+        
+        Args:
+            record: 日志记录
+            
+        Returns:
+            dict: 字段名到值的映射
+        """
         log_data = {
-            'timestamp': datetime.fromtimestamp(record.created).isoformat(),
+            'timestamp': self._timestamp(record.created),
             'level': record.levelname,
             'logger': record.name,
             'file': record.filename,
@@ -127,18 +210,88 @@ class JsonFormatter(logging.Formatter):
         }
         
         # 添加额外的字段
-        if hasattr(record, 'ip'):
-            log_data['ip'] = record.ip
-        if hasattr(record, 'user'):
-            log_data['user'] = record.user
-        if hasattr(record, 'operation'):
-            log_data['operation'] = record.operation
-        if hasattr(record, 'duration'):
-            log_data['duration'] = record.duration
-        if hasattr(record, 'status'):
-            log_data['status'] = record.status
+        for key in _EXTRA_FIELDS:
+            value = getattr(record, key, _MISSING)
+            if value is not _MISSING:
+                log_data[key] = value
+        return log_data
+
+class FastRotatingBytesHandler(logging.Handler):
+    """
+    按大小轮转的日志文件处理器，直接以字节追加写入
+    
+    不经过文本模式的编码层；已写入的字节数在内存中累计，轮转判断无需查询文件大小。
+    格式化器提供format_bytes时直接使用其返回的字节。
+    """
+    
+    def __init__(self, filename, maxBytes=0, backupCount=0, encoding='utf-8'):
+        """
+        初始化处理器
+        
+        Args:
+            filename (str): 日志文件路径
+            maxBytes (int): 单个文件的最大字节数，0表示不轮转
+            backupCount (int): 保留的备份文件数，0表示不轮转
+            encoding (str): 格式化结果为字符串时使用的编码
+        """
+        super().__init__()
+        self.baseFilename = os.path.abspath(os.fspath(filename))
+        self.maxBytes = maxBytes
+        self.backupCount = backupCount
+        self.encoding = encoding
+        self._fd = None
+        self._size = 0
+        self._open()
+    
+    def _open(self):
+        """以追加方式打开日志文件并读取当前大小"""
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, 'O_BINARY', 0)
+        self._fd = os.open(self.baseFilename, flags, 0o644)
+        self._size = os.fstat(self._fd).st_size
+    
+    def _rotate(self):
+        """关闭当前文件，依次重命名备份文件后重新打开"""
+        os.close(self._fd)
+        self._fd = None
+        for i in range(self.backupCount - 1, 0, -1):
+            source = f"{self.baseFilename}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.baseFilename}.{i + 1}")
+        os.replace(self.baseFilename, f"{self.baseFilename}.1")
+        self._open()
+    
+    def emit(self, record):
+        """
+        写入一条日志记录
+        
+        Args:
+            record: 日志记录
+        """
+        try:
+            formatter = self.formatter
+            if formatter is not None and hasattr(formatter, 'format_bytes'):
+                payload = formatter.format_bytes(record) + b'\n'
+            else:
+                payload = (self.format(record) + '\n').encode(self.encoding)
             
-        return json.dumps(log_data)
+            if (self.maxBytes > 0 and self.backupCount > 0 and self._size
+                    and self._size + len(payload) > self.maxBytes):
+                self._rotate()
+            os.write(self._fd, payload)
+            self._size += len(payload)
+        except Exception:
+            self.handleError(record)
+    
+    def close(self):
+        """关闭日志文件"""
+        self.acquire()
+        try:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+        finally:
+            self.release()
+        super().close()
 
 class AuditLogger:
     """审计日志记录器"""
@@ -172,7 +325,8 @@ class AuditLogger:
         
         record = logging.makeLogRecord({
             'name': self.logger.name,
-            'level': logging.INFO,
+            'levelno': logging.INFO,
+            'levelname': logging.getLevelName(logging.INFO),
             'msg': f"{user}@{ip} {operation} {status} in {duration:.3f}s"
         })
         
@@ -8,6 +8,12 @@ import ssl
 
 logger = logging.getLogger(__name__)
 
+# 每条FTP响应都会用到的正则，在导入时编译一次
+_PASV_RE = re.compile(r'(\d+),(\d+),(\d+),(\d+),(\d+),(\d+)')
+_UNIX_LIST_RE = re.compile(
+    r'^([d-])([rwxst-]{9})\s+(\d+)\s+(\w+)\s+(\w+)\s+(\d+)\s+(\w+\s+\d+\s+[\w:]+)\s+(.+)$'
+)
+
 class TransferMode(Enum):
     """传输模式枚举"""
     ASCII = 'A'
@@ -18,6 +24,19 @@ class ConnectionMode(Enum):
     ACTIVE = 'PORT'
     PASSIVE = 'PASV'
 
+def _mlsd_facts(facts_part):
+    """
+    解析MLSD行的facts部分，跳过空项和不含'='的项
+    
+    Args:
+        facts_part (str): 形如"type=file;size=10;"的字符串
+        
+    Returns:
+        dict: 小写的fact名到值的映射
+    """
+    return {key.lower(): value for key, value in
+            (fact.split('=', 1) for fact in facts_part.split(';') if '=' in fact)}
+
 def ftp_command(func):
     """
     FTP命令装饰器，处理异常和日志
@@ -52,10 +71,12 @@ class FTPProtocolMixin:
     
     # 常见FTP回复码
     COMMAND_OK = 200
+    SYSTEM_STATUS = 211
     READY_FOR_NEW_USER = 220
     LOGGED_IN = 230
     NEED_PASSWORD = 331
     LOGIN_FAILED = 530
+    FILE_UNAVAILABLE = 550
     FILE_STATUS_OK = 150
     TRANSFER_COMPLETE = 226
     PATH_CREATED = 257
@@ -84,19 +105,33 @@ class FTPProtocolMixin:
         解析PASV命令响应，提取IP和端口
         
         Args:
-            response (str): PASV响应字符串
+            response (str|bytes): PASV响应字符串
             
         Returns:
             tuple: (ip, port)
         """
-        pattern = r'(\d+),(\d+),(\d+),(\d+),(\d+),(\d+)'
-        match = re.search(pattern, response)
-        if not match:
+        if isinstance(response, bytes):
+            response = response.decode('ascii', errors='replace')
+        
+        # 常见格式为"227 Entering Passive Mode (h1,h2,h3,h4,p1,p2)"，直接切出括号内的部分
+        start = response.find('(')
+        end = response.find(')', start + 1)
+        if start >= 0 and end > start:
+            parts = response[start + 1:end].split(',')
+        else:
+            # 不带括号的响应按RFC 1123扫描数字
+            match = _PASV_RE.search(response)
+            parts = match.groups() if match else ()
+        
+        if len(parts) != 6:
             raise ValueError("无法解析PASV响应")
+        try:
+            numbers = list(map(int, parts))
+        except ValueError:
+            raise ValueError("无法解析PASV响应") from None
         
-        numbers = [int(n) for n in match.groups()]
-        ip = '.'.join(str(n) for n in numbers[:4])
-        port = (numbers[4] << 8) + numbers[5]
+        ip = '.'.join(map(str, numbers[:4]))
+        port = (numbers[4] << 8) | numbers[5]
         return ip, port
     
     def build_port_command(self, ip, port):
@@ -126,28 +161,55 @@ class FTPProtocolMixin:
             list: 文件和目录信息的列表
         """
         result = []
+        append = result.append
         for line in response_list:
-            if not line.strip():
+            line = line.strip()
+            if not line:
                 continue
-                
+            
             # MLSD格式: facts; filename
-            try:
-                facts_part, name = line.strip().split(' ', 1)
-                facts = {}
-                
-                # 解析facts部分
-                for fact in facts_part.split(';'):
-                    if not fact:
-                        continue
-                    key, value = fact.split('=', 1)
-                    facts[key.lower()] = value
-                
-                # 添加文件名
-                facts['name'] = name
-                result.append(facts)
-            except Exception as e:
-                logger.warning(f"解析MLSD行失败: {line}, 错误: {e}")
+            sep = line.find(' ')
+            if sep < 0:
+                logger.warning(f"解析MLSD行失败: {line}")
                 continue
+            
+            facts = _mlsd_facts(line[:sep])
+            
+            # 添加文件名
+            facts['name'] = line[sep + 1:]
+            append(facts)
+        
+        return result
+    
+    def parse_mlsd_response_bytes(self, data, encoding='utf-8'):
+        """
+        直接解析MLSD数据连接收到的原始字节，不预先解码整个列表
+        
+        facts部分只含ASCII字符，按ASCII解码；只有文件名按指定编码解码。
+        
+        Args:
+            data (bytes): MLSD数据连接收到的全部数据
+            encoding (str): 文件名编码
+            
+        Returns:
+            list: 文件和目录信息的列表
+        """
+        result = []
+        append = result.append
+        for line in data.splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            
+            # MLSD格式: facts; filename
+            sep = line.find(b' ')
+            if sep < 0:
+                logger.warning(f"解析MLSD行失败: {line!r}")
+                continue
+            
+            facts = _mlsd_facts(line[:sep].decode('ascii', errors='replace'))
+            facts['name'] = line[sep + 1:].decode(encoding, errors='replace')
+            append(facts)
         
         return result
     
@@ -162,32 +224,31 @@ class FTPProtocolMixin:
             list: 文件和目录信息的列表
         """
         result = []
-        unix_pattern = re.compile(
-            r'^([d-])([rwxst-]{9})\s+(\d+)\s+(\w+)\s+(\w+)\s+(\d+)\s+(\w+\s+\d+\s+[\w:]+)\s+(.+)$'
-        )
+        append = result.append
+        match_unix = _UNIX_LIST_RE.match
         
         for line in response_list:
-            if not line.strip():
+            stripped = line.strip()
+            if not stripped:
                 continue
-                
-            match = unix_pattern.match(line)
+            
+            match = match_unix(line)
             if match:
-                file_info = {
-                    'type': 'dir' if match.group(1) == 'd' else 'file',
-                    'permissions': match.group(2),
-                    'links': int(match.group(3)),
-                    'owner': match.group(4),
-                    'group': match.group(5),
-                    'size': int(match.group(6)),
-                    'date': match.group(7),
-                    'name': match.group(8)
-                }
-                result.append(file_info)
+                file_type, permissions, links, owner, group, size, date, name = match.groups()
+                append({
+                    'type': 'dir' if file_type == 'd' else 'file',
+                    'permissions': permissions,
+                    'links': int(links),
+                    'owner': owner,
+                    'group': group,
+                    'size': int(size),
+                    'date': date,
+                    'name': name
+                })
             else:
                 # 尝试处理非Unix格式的输出
                 logger.debug(f"无法解析为Unix格式: {line}")
-                if line.strip():
-                    result.append({'name': line.strip(), 'type': 'unknown'})
+                append({'name': stripped, 'type': 'unknown'})
         
         return result
     
@@ -10,38 +10,105 @@ import re
 from functools import wraps
 from pathlib import Path
 
+try:
+    import blake3 as _blake3
+except ImportError:  # blake3为可选依赖，未安装时校验和改用hashlib.blake2b
+    _blake3 = None
+
 logger = logging.getLogger(__name__)
 
-def get_file_md5(filepath, chunk_size=8192):
+def get_file_md5(filepath, chunk_size=1 << 20):
     """
     计算文件MD5值
     
+    Python 3.11起使用hashlib.file_digest在C层完成读取循环，
+    更早的版本按块读取。
+    
     Args:
         filepath (str): 文件路径
-        chunk_size (int): 每次读取的块大小
+        chunk_size (int): 旧版本Python每次读取的块大小
         
     Returns:
         str: 文件的MD5哈希值
     """
-    md5 = hashlib.md5()
     with open(filepath, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):
+            return hashlib.file_digest(f, 'md5').hexdigest()
+        
+        md5 = hashlib.md5()
         for chunk in iter(lambda: f.read(chunk_size), b''):
             md5.update(chunk)
     return md5.hexdigest()
 
-def get_file_crc32(filepath, chunk_size=8192):
+def get_file_blake3(filepath):
+    """
+    计算文件BLAKE3哈希值，需要安装blake3
+    
+    Args:
+        filepath (str): 文件路径
+        
+    Returns:
+        str: 文件的BLAKE3哈希值
+    """
+    if _blake3 is None:
+        raise ImportError("未安装blake3，无法计算BLAKE3哈希值")
+    # 由blake3自行映射文件并多线程计算
+    hasher = _blake3.blake3(max_threads=_blake3.blake3.AUTO)
+    hasher.update_mmap(filepath)
+    return hasher.hexdigest()
+
+def get_file_checksum(filepath, algorithm='blake3', chunk_size=1 << 20):
+    """
+    按指定算法计算文件校验值，用于传输完整性校验
+    
+    未安装blake3时，'blake3'自动退回到'blake2b'。
+    
+    Args:
+        filepath (str): 文件路径
+        algorithm (str): 算法名称，如'blake3'、'blake2b'、'md5'
+        chunk_size (int): 旧版本Python每次读取的块大小
+        
+    Returns:
+        tuple: (实际使用的算法, 十六进制校验值)
+    """
+    if algorithm == 'blake3':
+        if _blake3 is not None:
+            return 'blake3', get_file_blake3(filepath)
+        algorithm = 'blake2b'
+    
+    with open(filepath, 'rb') as f:
+        if hasattr(hashlib, 'file_digest'):
+            return algorithm, hashlib.file_digest(f, algorithm).hexdigest()
+        
+        hasher = hashlib.new(algorithm)
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return algorithm, hasher.hexdigest()
+
+def get_file_crc32(filepath, chunk_size=1 << 20):
     """
     计算文件CRC32校验值
     
+    优先将整个文件映射到内存后一次交给zlib计算，
+    空文件或无法映射时（如32位平台上的大文件）按块读取。
+    
     Args:
         filepath (str): 文件路径
-        chunk_size (int): 每次读取的块大小
+        chunk_size (int): 无法映射时每次读取的块大小
         
     Returns:
         int: 文件的CRC32校验值
     """
-    crc = 0
     with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0
+        try:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return zlib.crc32(mm) & 0xffffffff
+        except (ValueError, OSError, OverflowError):
+            pass
+        
+        crc = 0
         for chunk in iter(lambda: f.read(chunk_size), b''):
             crc = zlib.crc32(chunk, crc)
     return crc & 0xffffffff
@@ -58,6 +125,9 @@ def get_block_crc32(data):
     """
     return zlib.crc32(data) & 0xffffffff
 
+# 运行平台在进程内不会变化，导入时判断一次
+_IS_WINDOWS = platform.system() == 'Windows'
+
 def format_path(path):
     """
     跨平台路径格式化，确保路径格式符合当前操作系统
@@ -68,10 +138,26 @@ def format_path(path):
     Returns:
         str: 格式化后的路径
     """
-    if platform.system() == 'Windows':
+    if _IS_WINDOWS:
         return path.replace('/', '\\')
-    else:
-        return path.replace('\\', '/')
+    return path.replace('\\', '/')
+
+def remote_join(base, name):
+    """
+    拼接远程路径，FTP路径总是使用'/'分隔，与本地平台无关
+    
+    Args:
+        base (str): 远程目录
+        name (str): 目录下的文件或子目录名
+        
+    Returns:
+        str: 拼接后的远程路径
+    """
+    if not base or base.endswith('/'):
+        return base + name
+    return base + '/' + name
+
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
 
 def format_size(size, decimal_places=2):
     """
@@ -84,11 +170,9 @@ def format_size(size, decimal_places=2):
     Returns:
         str: 格式化后的大小字符串
     """
-    for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-        if size < 1024.0 or unit == 'TB':
-            break
-        size /= 1024.0
-    return f"{size:.{decimal_places}f} {unit}"
+    # 每个单位相差2^10，由整数部分的位数直接得到单位
+    index = min((int(size).bit_length() - 1) // 10, 4) if size >= 1024 else 0
+    return f"{size / (1 << (index * 10)):.{decimal_places}f} {_SIZE_UNITS[index]}"
 
 def calculate_transfer_speed(size, elapsed_time):
     """
@@ -126,9 +210,14 @@ def benchmark(func):
         return result
     return wrapper
 
+_monotonic_ns = time.monotonic_ns
+
 class TokenBucket:
     """令牌桶算法实现带宽限制"""
     
+    # 每个传输块都会调用consume，固定属性槽以减少属性访问开销
+    __slots__ = ('capacity', 'fill_rate', 'tokens', '_fill_rate_per_ns', '_last_ns')
+    
     def __init__(self, capacity, fill_rate):
         """
         初始化令牌桶
@@ -140,7 +229,9 @@ class TokenBucket:
         self.capacity = float(capacity)
         self.fill_rate = float(fill_rate)
         self.tokens = float(capacity)
-        self.last_time = time.time()
+        # 使用单调时钟的纳秒整数计时，不受系统时间调整影响
+        self._fill_rate_per_ns = self.fill_rate / 1e9
+        self._last_ns = time.monotonic_ns()
         
     def consume(self, tokens):
         """
@@ -152,21 +243,21 @@ class TokenBucket:
         Returns:
             float: 需要等待的时间(秒)
         """
-        # 更新令牌数量
-        now = time.time()
-        elapsed = now - self.last_time
-        self.tokens = min(self.capacity, self.tokens + elapsed * self.fill_rate)
-        self.last_time = now
+        # 更新令牌数量，在局部变量上计算后只写回一次
+        now = _monotonic_ns()
+        available = self.tokens + (now - self._last_ns) * self._fill_rate_per_ns
+        if available > self.capacity:
+            available = self.capacity
+        self._last_ns = now
         
         # 检查是否有足够的令牌
-        if tokens <= self.tokens:
-            self.tokens -= tokens
+        if tokens <= available:
+            self.tokens = available - tokens
             return 0.0
         else:
             # 计算需要等待的时间
-            wait_time = (tokens - self.tokens) / self.fill_rate
             self.tokens = 0
-            return wait_time
+            return (tokens - available) / self.fill_rate
 
 def memory_usage():
     """
@@ -180,6 +271,14 @@ def memory_usage():
     mem_info = process.memory_info()
     return mem_info.rss / 1024 / 1024  # 返回MB
 
+# 按文本模式传输的文件扩展名
+_TEXT_EXTENSIONS = frozenset({
+    '.txt', '.md', '.html', '.htm', '.css', '.js', '.json',
+    '.xml', '.csv', '.log', '.ini', '.conf', '.cfg',
+    '.py', '.java', '.c', '.cpp', '.h', '.sh', '.bat',
+    '.yaml', '.yml', '.toml'
+})
+
 def is_binary_file(filename):
     """
     判断文件是否为二进制文件
@@ -190,18 +289,7 @@ def is_binary_file(filename):
     Returns:
         bool: 如果是二进制文件返回True，否则返回False
     """
-    text_extensions = [
-        '.txt', '.md', '.html', '.htm', '.css', '.js', '.json', 
-        '.xml', '.csv', '.log', '.ini', '.conf', '.cfg', 
-        '.py', '.java', '.c', '.cpp', '.h', '.sh', '.bat',
-        '.yaml', '.yml', '.toml'
-    ]
-    
-    # 检查文件扩展名
-    _, ext = os.path.splitext(filename.lower())
-    if ext in text_extensions:
-        return False
-    return True
+    return os.path.splitext(filename)[1].lower() not in _TEXT_EXTENSIONS
 
 def generate_session_id():
     """
@@ -213,19 +301,24 @@ def generate_session_id():
     import uuid
     return str(uuid.uuid4())
 
-def parse_permissions(permission_str):
-    """
-    解析Unix风格的权限字符串
+def _build_permissions_str(mode):
+    """按数值权限逐位生成权限字符串，用于构建查找表"""
+    result = ""
     
-    Args:
-        permission_str (str): 权限字符串，如'rwxr-xr--'
-        
-    Returns:
-        int: 数值化的权限值(如0755)
-    """
-    if not permission_str or len(permission_str) != 9:
-        return None
+    # 解析为3组权限值
+    owner = (mode // 100) % 10
+    group = (mode // 10) % 10
+    other = mode % 10
+    
+    for m in [owner, group, other]:
+        result += 'r' if m & 4 else '-'
+        result += 'w' if m & 2 else '-'
+        result += 'x' if m & 1 else '-'
     
+    return result
+
+def _build_permissions_value(permission_str):
+    """按权限字符串逐位计算数值权限，用于构建查找表和处理特殊权限位"""
     # 将权限字符串转换为3组权限值
     modes = []
     for i in range(0, 9, 3):
@@ -241,6 +334,31 @@ def parse_permissions(permission_str):
     # 组合为权限值
     return (modes[0] * 100) + (modes[1] * 10) + modes[2]
 
+# 数值权限只取最后三位十进制数字，共1000种结果，导入时一次生成
+_PERM_TO_STR = tuple(_build_permissions_str(mode) for mode in range(1000))
+# 只含rwx-的512种标准权限字符串
+_STR_TO_PERM = {_PERM_TO_STR[mode]: mode for mode in range(1000)
+                if max(str(mode)) < '8'}
+
+def parse_permissions(permission_str):
+    """
+    解析Unix风格的权限字符串
+    
+    Args:
+        permission_str (str): 权限字符串，如'rwxr-xr--'
+        
+    Returns:
+        int: 数值化的权限值(如0755)
+    """
+    if not permission_str or len(permission_str) != 9:
+        return None
+    
+    mode = _STR_TO_PERM.get(permission_str)
+    if mode is None:
+        # 含s、t等特殊权限位时逐位计算
+        mode = _build_permissions_value(permission_str)
+    return mode
+
 def permissions_to_str(mode):
     """
     将数值权限转换为字符串表示
@@ -251,24 +369,49 @@ def permissions_to_str(mode):
     Returns:
         str: 权限字符串，如'rwxr-xr--'
     """
-    result = ""
+    return _PERM_TO_STR[mode % 1000]
+
+def sendfile_transfer(sock, file_obj, offset=0, count=None, chunk_size=None, on_progress=None):
+    """
+    将文件内容直接发送到套接字
     
-    # 解析为3组权限值
-    owner = (mode // 100) % 10
-    group = (mode // 10) % 10
-    other = mode % 10
+    socket.sendfile在支持的平台上使用os.sendfile，由内核完成复制，
+    不经过用户态缓冲区；不支持时（如Windows、TLS套接字）自动退回到普通send。
     
-    for m in [owner, group, other]:
-        result += 'r' if m & 4 else '-'
-        result += 'w' if m & 2 else '-'
-        result += 'x' if m & 1 else '-'
+    Args:
+        sock (socket): 目标套接字
+        file_obj: 以二进制模式打开的文件对象
+        offset (int): 文件起始偏移量
+        count (int): 要发送的字节数，None表示发送到文件末尾
+        chunk_size (int): 每次发送的最大字节数，None表示一次发送全部
+        on_progress (callable): 每段发送后调用，参数为累计已发送的字节数
+        
+    Returns:
+        int: 已发送的字节数
+    """
+    if count is None:
+        count = os.fstat(file_obj.fileno()).st_size - offset
+    if count <= 0:
+        return 0
+    if not chunk_size:
+        return sock.sendfile(file_obj, offset, count)
     
-    return result
+    bytes_sent = 0
+    while bytes_sent < count:
+        sent = sock.sendfile(file_obj, offset + bytes_sent, min(chunk_size, count - bytes_sent))
+        if not sent:
+            break
+        bytes_sent += sent
+        if on_progress:
+            on_progress(bytes_sent)
+    return bytes_sent
 
 def use_mmap_read(file_obj, size=-1, offset=0, access=mmap.ACCESS_READ):
     """
     使用mmap进行零拷贝文件读取
     
+    目标是套接字时应使用sendfile_transfer，避免从映射区再复制到套接字缓冲区。
+    
     Args:
         file_obj: 文件对象
         size (int): 映射的大小，-1表示整个文件
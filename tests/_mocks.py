@@ -0,0 +1,31 @@
+"""测试用的模拟对象"""
+
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+class MockSocket:
+    """模拟套接字类，用于测试"""
+    
+    def __init__(self, responses: Optional[Iterable[bytes]] = None):
+        # 每次recv返回下一条响应，全部返回后得到b''表示连接已关闭
+        self._resp_iter: Iterator[bytes] = iter(responses or ())
+        self.sent_data: List[bytes] = []  # 原始发送数据，检查时才解码
+        self.closed: bool = False
+        self._is_mock: bool = True  # 供tearDown识别模拟套接字
+        
+    @property
+    def sent_text(self) -> List[str]:
+        """已发送命令解码并去除行尾后的文本"""
+        return [data.decode('utf-8').strip() for data in self.sent_data]
+        
+    def sendall(self, data: bytes) -> None:
+        self.sent_data.append(bytes(data))
+        
+    def recv(self, buffer_size: int) -> bytes:
+        return next(self._resp_iter, b'')
+        
+    def close(self) -> None:
+        self.closed = True
+        
+    def getsockname(self) -> Tuple[str, int]:
+        return ('127.0.0.1', 12345)
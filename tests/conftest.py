@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 添加项目根目录到Python路径，pytest直接收集unittest.TestCase子类
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -1,32 +1,287 @@
-import unittest
+import importlib
+import json
 import os
+import re
+import subprocess
 import sys
+import unittest
+from pathlib import Path
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# 发现和加载测试用例
-test_loader = unittest.TestLoader()
 test_dir = os.path.dirname(os.path.abspath(__file__))
-test_suite = test_loader.discover(test_dir, pattern="test_*.py")
 
-# 创建测试运行器
-test_runner = unittest.TextTestRunner(verbosity=2)
+# 测试发现缓存，测试文件未变化时跳过发现过程
+CACHE_FILE = os.path.join(test_dir, '.discover_cache.json')
+
+def _run_pytest():
+    """
+    使用pytest-xdist多进程并行运行测试
+
+    Returns:
+        int: pytest退出码；未安装pytest或pytest-xdist时返回None
+    """
+    try:
+        import pytest
+        import xdist  # noqa: F401  仅用于检测插件是否可用
+    except ImportError:
+        return None
+
+    return int(pytest.main(["-n", "auto", "-q", test_dir]))
+
+def _test_files():
+    """
+    获取测试文件的签名，用于判断发现缓存是否仍然有效
+
+    Returns:
+        dict: {文件名: [st_mtime_ns, st_size]}
+    """
+    signature = {}
+    for path in sorted(Path(test_dir).glob("test_*.py")):
+        st = path.stat()
+        signature[path.name] = [st.st_mtime_ns, st.st_size]
+    return signature
+
+def _load_cache(signature):
+    """
+    读取发现缓存
+
+    Args:
+        signature: 当前测试文件签名
+
+    Returns:
+        list: 缓存的测试名称；缓存不存在或已失效时返回None
+    """
+    try:
+        with open(CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if cache.get("files") != signature:
+        return None
+    return cache.get("tests")
+
+def _save_cache(signature, names):
+    """
+    写入发现缓存，写入失败不影响测试运行
+
+    Args:
+        signature: 当前测试文件签名
+        names: 测试名称列表
+    """
+    try:
+        with open(CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({"files": signature, "tests": names}, f, indent=2)
+    except OSError:
+        pass
+
+def _iter_cases(suite):
+    """
+    遍历测试套件中的全部测试用例
+
+    Args:
+        suite: unittest.TestSuite
+
+    Yields:
+        unittest.TestCase: 测试用例
+    """
+    for test in suite:
+        if isinstance(test, unittest.TestSuite):
+            yield from _iter_cases(test)
+        else:
+            yield test
+
+def _iter_tests(suite):
+    """
+    遍历测试套件中的全部测试名称
+
+    Args:
+        suite: unittest.TestSuite
+
+    Yields:
+        str: 形如 module.Class.method 的测试名称
+    """
+    for test in _iter_cases(suite):
+        yield f"{type(test).__module__}.{type(test).__name__}.{test._testMethodName}"
+
+def _discover_names():
+    """
+    获取全部测试名称，测试文件未变化时直接使用缓存
+
+    Returns:
+        list: 测试名称；存在导入错误时返回None，交由unittest自行发现并报告
+    """
+    signature = _test_files()
+    names = _load_cache(signature)
+    if names is not None:
+        return names
+
+    # 只导入匹配的测试文件，不做discover的目录遍历和顶层目录推断
+    if test_dir not in sys.path:
+        sys.path.insert(0, test_dir)
+    try:
+        modules = [importlib.import_module(Path(name).stem) for name in signature]
+    except Exception:
+        return None
+
+    test_loader = unittest.TestLoader()
+    test_suite = unittest.TestSuite(test_loader.loadTestsFromModule(m) for m in modules)
+
+    names = list(_iter_tests(test_suite))
+    _save_cache(signature, names)
+    return names
+
+def _parse_summary(output):
+    """
+    从unittest的输出中解析运行、失败和错误的用例数
+
+    Args:
+        output (bytes): TextTestRunner的输出
+
+    Returns:
+        tuple: (运行数, 失败数, 错误数)；输出中没有结果行时返回None
+    """
+    ran = re.search(rb'^Ran (\d+) tests? in ', output, re.M)
+    if ran is None:
+        return None
+    # 结果行位于"Ran N tests"之后，只在该段中查找，避免匹配到测试自身的输出
+    tail = output[ran.end():]
+    failures = re.search(rb'failures=(\d+)', tail)
+    errors = re.search(rb'errors=(\d+)', tail)
+    return (int(ran.group(1)),
+            int(failures.group(1)) if failures else 0,
+            int(errors.group(1)) if errors else 0)
+
+def _print_summary(counts):
+    """
+    输出测试摘要
+
+    Args:
+        counts: (运行数, 失败数, 错误数)，为None时不输出
+    """
+    if counts is None:
+        return
+    run, failures, errors = counts
+    print("\n测试摘要:")
+    print(f"运行的测试用例: {run}")
+    print(f"通过: {run - failures - errors}")
+    print(f"失败: {failures}")
+    print(f"错误: {errors}")
+
+def _run_forked(names):
+    """
+    导入全部测试模块后按测试类分片，fork子进程并行运行
+
+    Args:
+        names: 测试名称列表
+
+    Returns:
+        tuple: (退出码, 各分片合计的(运行数, 失败数, 错误数))，有失败或错误时退出码为1；
+               平台不支持fork或只有一个分片时返回None
+    """
+    jobs = min(os.cpu_count() or 1, len({name.rsplit('.', 1)[0] for name in names}))
+    if not hasattr(os, 'fork') or jobs < 2:
+        return None
+
+    # 在fork之前导入全部测试模块，子进程通过写时复制共享已导入的模块
+    if test_dir not in sys.path:
+        sys.path.insert(0, test_dir)
+    try:
+        suite = unittest.TestLoader().loadTestsFromNames(names)
+    except Exception:
+        return None
+
+    # 按测试类分片，同一个类的setUpClass只在一个子进程中执行
+    classes = {}
+    for test in _iter_cases(suite):
+        classes.setdefault(type(test), []).append(test)
+    shards = [unittest.TestSuite() for _ in range(jobs)]
+    for i, tests in enumerate(classes.values()):
+        shards[i % jobs].addTests(tests)
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    children = []
+    for shard in shards:
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            exit_code = 1
+            try:
+                with os.fdopen(write_fd, 'w', encoding='utf-8') as stream:
+                    result = unittest.TextTestRunner(stream=stream, verbosity=2).run(shard)
+                    exit_code = 0 if result.wasSuccessful() else 1
+            finally:
+                os._exit(exit_code)
+        os.close(write_fd)
+        children.append((pid, read_fd))
+
+    # 依次读完每个子进程的输出再回收，子进程不会因管道写满而阻塞
+    exit_code = 0
+    totals = [0, 0, 0]
+    for pid, read_fd in children:
+        with os.fdopen(read_fd, 'rb') as f:
+            output = f.read()
+        sys.stderr.buffer.write(output)
+        counts = _parse_summary(output)
+        if counts is not None:
+            totals = [total + count for total, count in zip(totals, counts)]
+        _, status = os.waitpid(pid, 0)
+        if os.waitstatus_to_exitcode(status) != 0:
+            exit_code = 1
+    sys.stderr.flush()
+    return exit_code, tuple(totals)
+
+def _run_unittest():
+    """
+    使用unittest运行测试（未安装pytest-xdist时的回退方案）
+
+    支持fork且有多个CPU时按测试类分片，在fork出的子进程中并行运行；
+    否则（如Windows或单核机器）在子进程中通过unittest命令行串行运行。
+
+    Returns:
+        tuple: (退出码, (运行数, 失败数, 错误数))，有失败或错误时退出码非零；
+               无法解析结果时摘要为None
+    """
+    names = _discover_names()
+    if names:
+        forked = _run_forked(names)
+        if forked is not None:
+            return forked
+        args = names
+    else:
+        args = ["discover", "-s", test_dir, "-p", "test_*.py"]
+
+    command = [sys.executable, "-m", "unittest", "-v"] + args
+    sys.stdout.flush()
+
+    # 交互终端下边运行边输出；输出被管道收集（CI/tox）时先缓存在内存中，结束后一次写出
+    interactive = sys.stderr.isatty()
+    chunks = []
+    with subprocess.Popen(command, cwd=test_dir, stdout=subprocess.PIPE,
+                          stderr=subprocess.STDOUT) as process:
+        for chunk in iter(lambda: process.stdout.read1(65536), b''):
+            chunks.append(chunk)
+            if interactive:
+                sys.stderr.buffer.write(chunk)
+                sys.stderr.flush()
+
+    output = b''.join(chunks)
+    if not interactive:
+        sys.stderr.buffer.write(output)
+        sys.stderr.flush()
+    return process.returncode, _parse_summary(output)
 
 # 运行测试
 if __name__ == "__main__":
     print("======================================")
     print("正在运行FTP客户端单元测试")
     print("======================================")
-    test_result = test_runner.run(test_suite)
-    
-    # 输出摘要
-    print("\n测试摘要:")
-    print(f"运行的测试用例: {test_result.testsRun}")
-    print(f"通过: {test_result.testsRun - len(test_result.errors) - len(test_result.failures)}")
-    print(f"失败: {len(test_result.failures)}")
-    print(f"错误: {len(test_result.errors)}")
-    
-    # 如果有失败或错误，以非零退出
-    if test_result.failures or test_result.errors:
-        sys.exit(1)
+    exit_code = _run_pytest()
+    if exit_code is None:
+        print("未安装pytest-xdist，使用unittest运行（支持fork时按测试类并行）")
+        exit_code, counts = _run_unittest()
+        _print_summary(counts)
+    sys.exit(exit_code)
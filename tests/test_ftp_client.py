@@ -1,10 +1,15 @@
 import unittest
+import asyncio
 import os
+import re
 import sys
 import socket
+import tempfile
 import threading
 import time
-from unittest.mock import MagicMock, patch, Mock
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -15,165 +20,354 @@ from common.exceptions import (
     FTPError, AuthenticationError, ConnectionError,
     FileTransferError, CommandError, TimeoutError
 )
+from _mocks import MockSocket
 
-class MockSocket:
-    """模拟套接字类，用于测试"""
-    
-    def __init__(self, responses=None):
-        self.responses = responses or []
-        self.sent_data = []
-        self.closed = False
-        self.response_index = 0
-        
-    def sendall(self, data):
-        self.sent_data.append(data.decode('utf-8').strip())
-        
-    def recv(self, buffer_size):
-        if self.response_index >= len(self.responses):
-            return b''
-        response = self.responses[self.response_index]
-        self.response_index += 1
-        return response
-        
-    def close(self):
-        self.closed = True
-        
-    def getsockname(self):
-        return ('127.0.0.1', 12345)
+# 模拟服务器响应
+WELCOME = b'220 Welcome to FTP server\r\n'
+LOGIN_USER_OK = b'331 Username ok, need password\r\n'
+LOGIN_PASS_OK = b'230 Login successful\r\n'
+LOGIN = (WELCOME, LOGIN_USER_OK, LOGIN_PASS_OK)  # 连接并登录成功的响应前缀
+PWD_257 = b'257 "/home/user" is current directory\r\n'
+CWD_250 = b'250 Directory changed\r\n'
+LIST_START = b'150 Opening data connection\r\n'
+LIST_DATA = b'-rw-r--r-- 1 user group 123 Jan 1 12:34 file.txt\r\n'
+LIST_END = b'226 Transfer complete\r\n'
+
+# Unix格式LIST行：权限、大小、日期、文件名，用于独立校验解析结果
+_LIST_RE = re.compile(rb'^(\S+)\s+\d+\s+\S+\s+\S+\s+(\d+)\s+(\S+\s+\S+\s+\S+)\s+(.+)\r\n$')
 
 
 class TestFTPClient(unittest.TestCase):
     """FTPClient类单元测试"""
     
+    @classmethod
+    def setUpClass(cls):
+        """整个测试类共用的设置"""
+        # 整个测试类只启动一次socket.create_connection补丁
+        patcher = patch('socket.create_connection')
+        cls._mock_create_connection = patcher.start()
+        cls.addClassCleanup(patcher.stop)
+    
     def setUp(self):
         """测试前设置"""
-        # 创建测试对象
-        self.client = FTPClient('example.com', 21)
-        
-        # 准备模拟响应
-        self.welcome_response = b'220 Welcome to FTP server\r\n'
-        self.login_responses = [
-            b'331 Username ok, need password\r\n',
-            b'230 Login successful\r\n'
-        ]
-        self.pwd_response = b'257 "/home/user" is current directory\r\n'
-        self.cwd_response = b'250 Directory changed\r\n'
-        self.list_response_start = b'150 Opening data connection\r\n'
-        self.list_data = b'-rw-r--r-- 1 user group 123 Jan 1 12:34 file.txt\r\n'
-        self.list_response_end = b'226 Transfer complete\r\n'
+        self._reset_client()
         
     def tearDown(self):
         """测试后清理"""
-        if self.client.cmd_socket and not isinstance(self.client.cmd_socket, MockSocket):
+        sock = self.client.cmd_socket
+        if sock is not None and not getattr(sock, '_is_mock', False):
             self.client.quit()
     
-    @patch('socket.create_connection')
-    def test_connect(self, mock_create_connection):
-        """测试连接功能"""
-        # 配置模拟对象
-        mock_socket = MockSocket([self.welcome_response])
-        mock_create_connection.return_value = mock_socket
-        
-        # 执行连接
-        result = self.client.connect()
+    def _reset_client(self):
+        """创建一个全新的客户端，并清除连接补丁上的配置"""
+        self.client = FTPClient('example.com', 21)
         
-        # 验证结果
-        self.assertTrue(result)
-        self.assertEqual(self.client.cmd_socket, mock_socket)
-        mock_create_connection.assert_called_once_with(('example.com', 21), 30)
+        # 清除上一个测试配置的返回值和副作用
+        self.mock_create_connection = self._mock_create_connection
+        self.mock_create_connection.reset_mock(return_value=True, side_effect=True)
     
-    @patch('socket.create_connection')
-    def test_login(self, mock_create_connection):
-        """测试登录功能"""
-        # 配置模拟对象
-        mock_socket = MockSocket([self.welcome_response] + self.login_responses)
-        mock_create_connection.return_value = mock_socket
+    def test_commands(self):
+        """测试连接、登录及基本命令，各场景共用类级别的连接补丁"""
+        def login(client):
+            client.connect()
+            return client.login('user', 'password')
         
-        # 执行连接和登录
-        self.client.connect()
-        result = self.client.login('user', 'password')
+        def pwd(client):
+            login(client)
+            return client.pwd()
         
-        # 验证结果
-        self.assertTrue(result)
-        self.assertEqual(self.client.username, 'user')
-        self.assertTrue(self.client.logged_in)
-        self.assertEqual(mock_socket.sent_data[0], 'USER user')
-        self.assertEqual(mock_socket.sent_data[1], 'PASS password')
-    
-    @patch('socket.create_connection')
-    def test_pwd(self, mock_create_connection):
-        """测试PWD命令"""
-        # 配置模拟对象
-        mock_socket = MockSocket([self.welcome_response] + self.login_responses + [self.pwd_response])
-        mock_create_connection.return_value = mock_socket
-        
-        # 执行连接、登录、PWD命令
-        self.client.connect()
-        self.client.login('user', 'password')
-        pwd = self.client.pwd()
+        def cwd(client):
+            login(client)
+            return client.cwd('/home/user/docs')
         
-        # 验证结果
-        self.assertEqual(pwd, '/home/user')
-        self.assertEqual(self.client.working_directory, '/home/user')
-        self.assertEqual(mock_socket.sent_data[2], 'PWD')
-    
-    @patch('socket.create_connection')
-    def test_cwd(self, mock_create_connection):
-        """测试CWD命令"""
-        # 配置模拟对象
-        mock_socket = MockSocket([self.welcome_response] + self.login_responses + [self.cwd_response, self.pwd_response])
-        mock_create_connection.return_value = mock_socket
-        
-        # 执行连接、登录、CWD命令
-        self.client.connect()
-        self.client.login('user', 'password')
-        result = self.client.cwd('/home/user/docs')
+        def invalid_login(client):
+            client.connect()
+            # 验证登录失败
+            with self.assertRaises(AuthenticationError):
+                client.login('invalid', 'invalid')
         
-        # 验证结果
-        self.assertTrue(result)
-        self.assertEqual(mock_socket.sent_data[2], 'CWD /home/user/docs')
-    
-    @patch('socket.create_connection')
-    def test_error_handling(self, mock_create_connection):
-        """测试错误处理"""
-        # 配置模拟对象
-        mock_socket = MockSocket([self.welcome_response, b'530 Login incorrect\r\n'])
-        mock_create_connection.return_value = mock_socket
+        def check_connect(client, mock_socket, result):
+            self.assertTrue(result)
+            self.assertIs(client.cmd_socket, mock_socket)
+            self.mock_create_connection.assert_called_once_with(('example.com', 21), 30)
+        
+        def check_login(client, mock_socket, result):
+            self.assertTrue(result)
+            self.assertEqual(client.username, 'user')
+            self.assertTrue(client.logged_in)
+            self.assertEqual(mock_socket.sent_text[:2], ['USER user', 'PASS password'])
+        
+        def check_pwd(client, mock_socket, result):
+            self.assertEqual(result, '/home/user')
+            self.assertEqual(client.working_directory, '/home/user')
+            self.assertEqual(mock_socket.sent_text[:3], ['USER user', 'PASS password', 'PWD'])
         
-        # 执行连接和登录
-        self.client.connect()
+        def check_cwd(client, mock_socket, result):
+            self.assertTrue(result)
+            self.assertEqual(mock_socket.sent_text[:3], ['USER user', 'PASS password', 'CWD /home/user/docs'])
         
-        # 验证登录失败
-        with self.assertRaises(AuthenticationError):
-            self.client.login('invalid', 'invalid')
+        # (场景, 模拟响应, 执行的操作, 结果校验)
+        cases = [
+            ("connect", (WELCOME,), lambda client: client.connect(), check_connect),
+            ("login", LOGIN, login, check_login),
+            ("pwd", LOGIN + (PWD_257,), pwd, check_pwd),
+            ("cwd", LOGIN + (CWD_250, PWD_257), cwd, check_cwd),
+            ("error_handling", (WELCOME, b'530 Login incorrect\r\n'), invalid_login, None),
+        ]
+        
+        for name, responses, action, check in cases:
+            with self.subTest(name=name):
+                self._reset_client()
+                mock_socket = MockSocket(responses)
+                self.mock_create_connection.return_value = mock_socket
+                
+                result = action(self.client)
+                if check:
+                    check(self.client, mock_socket, result)
     
-    @patch('socket.create_connection')
-    def test_connection_timeout(self, mock_create_connection):
+    def test_connection_timeout(self):
         """测试连接超时"""
         # 配置模拟抛出超时异常
-        mock_create_connection.side_effect = socket.timeout('Connection timed out')
+        self.mock_create_connection.side_effect = socket.timeout('Connection timed out')
         
         # 验证连接超时异常
         with self.assertRaises(ConnectionError):
             self.client.connect()
+    
+    def test_size_cache(self):
+        """测试SIZE结果缓存"""
+        mock_socket = MockSocket([b'213 1234\r\n', b'250 File deleted\r\n', b'213 99\r\n'])
+        self.client.cmd_socket = mock_socket
+        self.client.connected = True
+        
+        # 第二次查询命中缓存，不再发送SIZE
+        self.assertEqual(self.client.size('/file.txt'), 1234)
+        self.assertEqual(self.client.size('/file.txt'), 1234)
+        self.assertEqual(mock_socket.sent_text, ['SIZE /file.txt'])
+        
+        # 删除文件后缓存失效
+        self.client.delete('/file.txt')
+        self.assertEqual(self.client.size('/file.txt'), 99)
+        self.assertEqual(mock_socket.sent_text[-1], 'SIZE /file.txt')
+    
+    def test_rename_pipelined(self):
+        """测试流水线发送RNFR/RNTO"""
+        # 两条响应在同一次recv中到达
+        mock_socket = MockSocket([b'350 Ready for RNTO\r\n250 Rename successful\r\n'])
+        self.client.cmd_socket = mock_socket
+        self.client.connected = True
+        self.client.pipelining_enabled = True
+        
+        self.assertTrue(self.client.rename('a.txt', 'b.txt'))
+        self.assertEqual(mock_socket.sent_text, ['RNFR a.txt\r\nRNTO b.txt'])
+        self.assertEqual(self.client.last_response_code, 250)
+    
+    def test_features_cached(self):
+        """测试FEAT结果解析与缓存"""
+        mock_socket = MockSocket([b'211-Features:\r\n MLSD\r\n REST STREAM\r\n SIZE\r\n211 End\r\n'])
+        self.client.cmd_socket = mock_socket
+        self.client.connected = True
+        
+        features = self.client.features()
+        self.assertIn('MLSD', features)
+        self.assertIn('REST STREAM', features)
+        self.assertIn('SIZE', features)
+        
+        # 第二次调用不再发送FEAT
+        self.client.features()
+        self.assertEqual(mock_socket.sent_text, ['FEAT'])
+    
+    def test_list_falls_back_from_mlsd(self):
+        """测试服务器声明MLSD但拒绝执行时回退到LIST"""
+        mock_socket = MockSocket([LIST_START, LIST_END])
+        self.client.cmd_socket = mock_socket
+        self.client.connected = True
+        self.client._features = {'MLSD'}
+        data_sock = MockSocket([LIST_DATA])
+        
+        with patch.object(self.client, 'mlsd', side_effect=CommandError("500 MLSD not allowed here")), \
+             patch.object(self.client, '_create_data_connection', return_value=data_sock):
+            entries = self.client.list('/pub')
+            
+        # 验证结果
+        self.assertEqual(mock_socket.sent_text, ['LIST /pub'])
+        self.assertEqual([entry['name'] for entry in entries], ['file.txt'])
+    
+    def test_upload_creates_missing_dir(self):
+        """测试上传目标目录不存在时创建目录后重试"""
+        self.client.connected = True
+        self.client.last_response_code = 550
+        
+        with patch.object(self.client, 'upload', side_effect=[FileTransferError("550"), (True, 3, 0.1)]) as mock_upload, \
+             patch.object(self.client, 'mkd') as mock_mkd:
+            result = self.client._upload_creating_dirs('local.txt', '/remote/dir/file.txt')
+            
+        self.assertEqual(result, (True, 3, 0.1))
+        mock_mkd.assert_called_once_with('/remote/dir')
+        self.assertEqual(mock_upload.call_count, 2)
+    
+    def test_parse_list_response(self):
+        """测试解析Unix格式的LIST输出"""
+        entries = self.client.parse_list_response(LIST_DATA.decode('utf-8').splitlines())
+        permissions, size, date, name = _LIST_RE.match(LIST_DATA).groups()
+        
+        # 验证结果
+        self.assertEqual(len(entries), 1)
+        entry = entries[0]
+        self.assertEqual(entry['type'], 'file')
+        self.assertEqual('-' + entry['permissions'], permissions.decode())
+        self.assertEqual(entry['size'], int(size))
+        self.assertEqual(entry['date'], date.decode())
+        self.assertEqual(entry['name'], name.decode())
+    
+    def test_open_transfer_rest(self):
+        """测试建立传输时先发送REST再发送传输命令"""
+        mock_socket = MockSocket([b'350 Restarting at 100\r\n', LIST_START])
+        self.client.cmd_socket = mock_socket
+        self.client.connected = True
+        data_sock = SimpleNamespace(close=lambda: None)
+        
+        with patch.object(self.client, '_create_data_connection', return_value=data_sock):
+            self.assertIs(self.client._open_transfer('RETR /file.txt', rest=100), data_sock)
+        self.assertEqual(mock_socket.sent_text, ['REST 100', 'RETR /file.txt'])
+    
+    def test_upload_chunk_size(self):
+        """测试传输块大小配置"""
+        # 默认块大小
+        self.assertEqual(self.client.upload_chunk_size, 65536)
+        
+        # 自定义块大小
+        client = FTPClient('example.com', 21, upload_chunk_size=32768)
+        self.assertEqual(client.upload_chunk_size, 32768)
+        
+        # 超出范围的块大小
+        with self.assertRaises(ValueError):
+            FTPClient('example.com', 21, upload_chunk_size=1024)
+        with self.assertRaises(ValueError):
+            FTPClient('example.com', 21, upload_chunk_size=8 * 1024 * 1024)
+
+
+class TestAsyncTransfer(unittest.IsolatedAsyncioTestCase):
+    """FTPClient异步传输单元测试，数据连接使用socketpair模拟"""
+    
+    def setUp(self):
+        """测试前设置"""
+        self.client = FTPClient('example.com', 21)
+        self.client.connected = True
+        self.client.logged_in = True
+        self.client.cmd_socket = MockSocket((LIST_END,))
+        
+        # data_sock交给被测协程，peer模拟服务器端
+        self.data_sock, self.peer = socket.socketpair()
+        self.peer.setblocking(False)
+        self.addCleanup(self.peer.close)
+        self.addCleanup(self.data_sock.close)
+        
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+        # 大于一个数据块，覆盖读取与发送重叠的路径
+        self.payload = os.urandom(self.client.upload_chunk_size * 3 + 123)
+    
+    async def test_async_upload(self):
+        """测试异步上传通过数据连接发送完整文件"""
+        local_path = os.path.join(self.tmp_dir, 'up.bin')
+        with open(local_path, 'wb') as f:
+            f.write(self.payload)
+        
+        async def receive_all():
+            loop = asyncio.get_running_loop()
+            chunks = []
+            while True:
+                chunk = await loop.sock_recv(self.peer, 65536)
+                if not chunk:
+                    return b''.join(chunks)
+                chunks.append(chunk)
+        
+        with patch.object(self.client, '_open_transfer', return_value=self.data_sock) as mock_open:
+            result, received = await asyncio.gather(
+                self.client.async_upload(local_path, '/up.bin', TransferMode.BINARY),
+                receive_all())
+        
+        # 验证结果
+        mock_open.assert_called_once_with('STOR /up.bin', TransferMode.BINARY)
+        self.assertEqual(result[:2], (True, len(self.payload)))
+        self.assertEqual(received, self.payload)
+        self.assertEqual(self.client.cmd_socket.sent_data, [])
+    
+    async def test_async_download(self):
+        """测试异步下载按顺序写入接收到的全部数据"""
+        local_path = os.path.join(self.tmp_dir, 'down.bin')
+        self.client._features = {'MDTM'}  # 不支持SIZE，跳过大小查询
+        
+        async def send_all():
+            await asyncio.get_running_loop().sock_sendall(self.peer, self.payload)
+            self.peer.close()
+        
+        with patch.object(self.client, '_open_transfer', return_value=self.data_sock) as mock_open:
+            result, _ = await asyncio.gather(
+                self.client.async_download('/down.bin', local_path, TransferMode.BINARY),
+                send_all())
+        
+        # 验证结果
+        mock_open.assert_called_once_with('RETR /down.bin', TransferMode.BINARY)
+        self.assertEqual(result[:2], (True, len(self.payload)))
+        with open(local_path, 'rb') as f:
+            self.assertEqual(f.read(), self.payload)
+    
+    async def test_async_upload_tls_fallback(self):
+        """测试TLS连接退回同步上传"""
+        self.client.enable_ssl = True
+        with patch.object(self.client, 'upload', return_value=(True, 3, 0.1)) as mock_upload:
+            result = await self.client.async_upload(__file__, '/a.py', TransferMode.BINARY)
+        
+        self.assertEqual(result, (True, 3, 0.1))
+        mock_upload.assert_called_once_with(__file__, '/a.py', TransferMode.BINARY)
+    
+    async def test_async_batch_transfer(self):
+        """测试批量传输分配到多条连接并统计失败任务"""
+        transferred = []
+        
+        async def fake_upload(src, dst):
+            if src == 'bad':
+                raise FileTransferError("550")
+            transferred.append(src)
+        
+        def spawn():
+            return SimpleNamespace(async_upload=fake_upload, quit=lambda: None)
+        
+        jobs = [('a', '/a'), ('bad', '/bad'), ('b', '/b'), ('c', '/c')]
+        with patch.object(self.client, '_spawn_worker_client', side_effect=spawn) as mock_spawn:
+            results = await self.client.async_batch_transfer(jobs, concurrency=2)
+        
+        # 验证结果
+        self.assertEqual(mock_spawn.call_count, 2)
+        self.assertEqual(sorted(transferred), ['a', 'b', 'c'])
+        self.assertEqual((results["total"], results["success"], results["failed"]), (4, 3, 1))
+        self.assertTrue(results["errors"][0].startswith('bad: '))
 
 
 class TestFTPConnectionPool(unittest.TestCase):
     """FTP连接池单元测试"""
     
+    @classmethod
+    def setUpClass(cls):
+        """整个测试类只启动一次FTPClient补丁，连接池创建连接时使用模拟客户端"""
+        cls._patcher = patch('client.ftp_client.FTPClient')
+        cls._mock_ctor = cls._patcher.start()
+        cls.addClassCleanup(cls._patcher.stop)
+    
     def setUp(self):
         """测试前设置"""
-        # 模拟FTPClient
-        self.mock_client = Mock()
-        self.mock_client.connected = True
-        self.mock_client.verify_connection.return_value = True
-        self.mock_client.host = 'example.com'
-        self.mock_client.port = 21
+        # 模拟FTPClient，只提供连接池用到的属性和方法
+        self.mock_client = SimpleNamespace(
+            connected=True, host='example.com', port=21,
+            connect=lambda: True, verify_connection=lambda: True, quit=lambda: None
+        )
         
         # 创建测试对象
-        with patch('client.ftp_client.FTPClient') as mock_ftp_client:
-            mock_ftp_client.return_value = self.mock_client
-            self.pool = FTPConnectionPool('example.com', 21, max_connections=2)
+        self._mock_ctor.return_value = self.mock_client
+        self.pool = FTPConnectionPool('example.com', 21, max_connections=2)
     
     def tearDown(self):
         """测试后清理"""
@@ -186,7 +380,7 @@ class TestFTPConnectionPool(unittest.TestCase):
         client = self.pool.get_connection()
         
         # 验证结果
-        self.assertEqual(client, self.mock_client)
+        self.assertIs(client, self.mock_client)
         self.assertEqual(self.pool.active_connections, 1)
         self.assertEqual(self.pool.total_connections_created, 1)
     
@@ -225,9 +419,141 @@ class TestFTPConnectionPool(unittest.TestCase):
         client2 = self.pool.get_connection()
         
         # 验证结果
-        self.assertEqual(client2, self.mock_client)
+        self.assertIs(client2, self.mock_client)
         self.assertEqual(self.pool.total_connections_created, 1)
         self.assertEqual(self.pool.total_connections_reused, 1)
+    
+    def test_add_connection(self):
+        """测试加入已有连接后被直接复用"""
+        existing = SimpleNamespace(connected=True, host='example.com', port=21,
+                                   quit=lambda: None)
+        self.pool.add_connection(existing)
+        
+        # 验证结果
+        self.assertIs(self.pool.get_connection(), existing)
+        self.assertEqual(self.pool.active_connections, 1)
+        self.assertEqual(self.pool.total_connections_reused, 1)
+    
+    def test_pool_concurrent_handoff(self):
+        """测试达到最大连接数时释放的连接直接移交给等待者"""
+        client1 = self.pool.get_connection()
+        self.pool.get_connection()
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(self.pool.get_connection, wait_timeout=5)
+            deadline = time.monotonic() + 5
+            while not self.pool.get_stats()["waiting_requests"] and time.monotonic() < deadline:
+                time.sleep(0.001)
+            self.pool.release_connection(client1)
+            
+            # 验证结果
+            self.assertIs(future.result(timeout=5), client1)
+        self.assertEqual(self.pool.active_connections, 2)
+        self.assertEqual(len(self.pool.pool), 0)
+        self.assertEqual(self.pool.total_connections_reused, 1)
+    
+    def test_pool_failed_connect_hands_off_slot(self):
+        """测试新建连接失败时空出的名额移交给等待者"""
+        self.pool.get_connection()
+        connecting = threading.Event()
+        refuse = threading.Event()
+        attempts = []
+        
+        def connect():
+            attempts.append(1)
+            if len(attempts) == 1:
+                # 第一次新建连接在等待者排队后失败
+                connecting.set()
+                refuse.wait(5)
+                raise ConnectionError("Connection refused")
+            return True
+        
+        self.mock_client.connect = connect
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            failing = executor.submit(self.pool.get_connection)
+            connecting.wait(5)
+            waiting = executor.submit(self.pool.get_connection, wait_timeout=5)
+            deadline = time.monotonic() + 5
+            while not self.pool.get_stats()["waiting_requests"] and time.monotonic() < deadline:
+                time.sleep(0.001)
+            refuse.set()
+            
+            # 验证结果：等待者立即得到名额并建立连接，而不是等到超时
+            with self.assertRaises(ConnectionError):
+                failing.result(timeout=5)
+            self.assertIs(waiting.result(timeout=1), self.mock_client)
+        self.assertEqual(self.pool.active_connections, 2)
+        self.assertEqual(self.pool.connection_failures, 1)
+    
+    def _parallel_client(self, login_error=None, fail_src=None):
+        """
+        创建执行并行传输的客户端，连接池中的连接由模拟工厂创建
+        
+        Args:
+            login_error: 登录时抛出的异常，None表示登录成功
+            fail_src: 下载该路径时抛出FileTransferError，连接保持打开
+            
+        Returns:
+            tuple: (FTPClient, 已创建的模拟连接列表)
+        """
+        created = []
+        
+        def factory(**kwargs):
+            def login(username, password):
+                if login_error:
+                    raise login_error
+                conn.logged_in = True
+            
+            def download(src, dst):
+                conn.transferred.append(src)
+                if src == fail_src:
+                    raise FileTransferError("426 Connection closed; transfer aborted")
+            
+            def quit():
+                conn.connected = False
+            
+            conn = SimpleNamespace(
+                connected=True, logged_in=False, host='example.com', port=21,
+                connect=lambda: True, login=login, download=download, quit=quit,
+                transferred=[]
+            )
+            created.append(conn)
+            return conn
+        
+        self._mock_ctor.side_effect = factory
+        self.addCleanup(setattr, self._mock_ctor, 'side_effect', None)
+        client = FTPClient('example.com', 21)
+        client.username, client._password = 'user', 'secret'
+        return client, created
+    
+    def test_parallel_login_failure_frees_slot(self):
+        """测试登录失败的连接被丢弃，后续任务仍得到真实的错误"""
+        client, created = self._parallel_client(login_error=AuthenticationError("530 Login incorrect"))
+        results = {"total": 0, "success": 0, "failed": 0, "errors": []}
+        jobs = [(f"/f{i}", f"f{i}") for i in range(4)]
+        
+        client._run_parallel_transfers("download", jobs, 2, results)
+        
+        # 验证结果
+        self.assertEqual(results["failed"], 4)
+        self.assertEqual(len(created), 4)
+        for error in results["errors"]:
+            self.assertIn("530", error)
+        self.assertTrue(all(not conn.connected for conn in created))
+    
+    def test_parallel_failed_transfer_not_reused(self):
+        """测试传输失败但仍连接的连接被丢弃，不交给下一个任务"""
+        client, created = self._parallel_client(fail_src="/a")
+        results = {"total": 0, "success": 0, "failed": 0, "errors": []}
+        
+        client._run_parallel_transfers("download", [("/a", "a"), ("/b", "b")], 1, results)
+        
+        # 验证结果
+        self.assertEqual((results["success"], results["failed"]), (1, 1))
+        self.assertEqual(len(created), 2)
+        self.assertEqual(created[0].transferred, ["/a"])
+        self.assertFalse(created[0].connected)
+        self.assertEqual(created[1].transferred, ["/b"])
 
 
 if __name__ == '__main__':
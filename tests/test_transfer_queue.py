@@ -0,0 +1,146 @@
+import unittest
+import os
+import sys
+import threading
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from client.transfer_queue import TransferQueue, TaskPriority, TaskStatus, TaskType
+
+
+class _FuncQueue(TransferQueue):
+    """任务的第一个参数即处理函数，便于在测试中控制任务行为"""
+
+    def _get_task_handler(self, task_type):
+        return lambda task: task.args[0](task)
+
+
+def _wait_for(predicate, timeout=5):
+    """轮询直到条件成立，超时返回False"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestTransferQueue(unittest.TestCase):
+    """传输队列测试"""
+
+    def setUp(self):
+        self.queue = _FuncQueue(max_concurrent_tasks=1)
+        self.gate = threading.Event()
+        self.order = []
+
+    def tearDown(self):
+        self.gate.set()
+        self.queue.shutdown(wait=False)
+
+    def _record(self, name):
+        """返回记录执行顺序的处理函数"""
+        def handler(task):
+            self.order.append(name)
+        return handler
+
+    def _block(self, task):
+        """阻塞唯一的工作线程，直到gate被设置"""
+        self.order.append('first')
+        self.gate.wait(5)
+
+    def test_priority_and_fifo_order(self):
+        """高优先级先执行，同优先级按入队顺序执行"""
+        self.queue.add_task(TaskType.UPLOAD, self._block)
+        self.queue.add_task(TaskType.UPLOAD, self._record('a'), priority=TaskPriority.LOW)
+        self.queue.add_task(TaskType.UPLOAD, self._record('b'), priority=TaskPriority.HIGH)
+        self.queue.add_task(TaskType.UPLOAD, self._record('c'), priority=TaskPriority.NORMAL)
+        self.queue.add_task(TaskType.UPLOAD, self._record('d'), priority=TaskPriority.HIGH)
+
+        self.gate.set()
+        self.queue.shutdown(wait=True)
+        self.assertEqual(self.order, ['first', 'b', 'd', 'c', 'a'])
+
+    def test_cancel_queued_task(self):
+        """取消排队中的任务后该任务不会执行"""
+        self.queue.add_task(TaskType.UPLOAD, self._block)
+        task_id = self.queue.add_task(TaskType.UPLOAD, self._record('canceled'))
+
+        self.assertTrue(self.queue.cancel_task(task_id))
+        self.assertEqual(self.queue.get_task_status(task_id).status, TaskStatus.CANCELED)
+        self.assertEqual(self.queue.queue_size, 0)
+
+        self.gate.set()
+        self.queue.shutdown(wait=True)
+        self.assertEqual(self.order, ['first'])
+
+    def test_cancel_retrying_task(self):
+        """取消等待重试的任务后shutdown无需等待重试定时器"""
+        def fail(task):
+            raise RuntimeError("boom")
+
+        task_id = self.queue.add_task(TaskType.UPLOAD, fail, retry_delay=60)
+        self.assertTrue(_wait_for(
+            lambda: self.queue.get_task_status(task_id).status == TaskStatus.RETRYING))
+
+        self.assertTrue(self.queue.cancel_task(task_id))
+        self.assertEqual(self.queue.get_task_status(task_id).status, TaskStatus.CANCELED)
+        self.assertEqual(self.queue.queue_size, 0)
+
+        start = time.monotonic()
+        self.queue.shutdown(wait=True)
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_retry_after_delay(self):
+        """失败任务在retry_delay之后重试"""
+        attempts = []
+
+        def flaky(task):
+            attempts.append(time.monotonic())
+            if len(attempts) == 1:
+                raise RuntimeError("first attempt fails")
+            return 'ok'
+
+        task_id = self.queue.add_task(TaskType.UPLOAD, flaky, retry_delay=0.2)
+        self.queue.shutdown(wait=True)
+
+        task = self.queue.get_task_status(task_id)
+        self.assertEqual(task.status, TaskStatus.COMPLETED)
+        self.assertEqual(task.result, 'ok')
+        self.assertEqual(task.retry_count, 1)
+        self.assertEqual(len(attempts), 2)
+        self.assertGreaterEqual(attempts[1] - attempts[0], 0.19)
+
+    def test_shutdown_waits_for_all_tasks(self):
+        """shutdown(wait=True)等待排队中的任务全部执行完"""
+        queue = _FuncQueue(max_concurrent_tasks=2)
+
+        def slow(task):
+            time.sleep(0.02)
+
+        task_ids = [queue.add_task(TaskType.UPLOAD, slow) for _ in range(5)]
+        queue.shutdown(wait=True)
+
+        self.assertEqual(queue.queue_size, 0)
+        self.assertEqual(queue.get_active_tasks(), [])
+        for task_id in task_ids:
+            self.assertEqual(queue.get_task_status(task_id).status, TaskStatus.COMPLETED)
+
+    def test_clear_completed_tasks(self):
+        """只清理早于期限的已完成任务，并保持剩余任务的顺序"""
+        task_ids = [self.queue.add_task(TaskType.UPLOAD, self._record(str(i))) for i in range(4)]
+        self.queue.shutdown(wait=True)
+
+        now = time.monotonic()
+        ages = [7200, 5000, 10, 0]
+        for task_id, age in zip(task_ids, ages):
+            self.queue.completed_tasks[task_id].end_time = now - age
+
+        self.assertEqual(self.queue.clear_completed_tasks(older_than=3600), 2)
+        self.assertEqual(list(self.queue.completed_tasks), task_ids[2:])
+        self.assertEqual([t.id for t in self.queue.get_completed_tasks()], task_ids[:1:-1])
+
+
+if __name__ == "__main__":
+    unittest.main()